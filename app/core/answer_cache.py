@@ -0,0 +1,181 @@
+from collections import OrderedDict
+import logging
+import os
+import pickle
+import tempfile
+import threading
+
+
+class AnswerCache:
+    """LRU-кэш готовых ответов по ключу (обработчик, лемма фокуса, второе понятие)
+
+    Кроме ответов хранится карта псевдонимов: нормализованный текст вопроса
+    -> ключ ответа, поэтому повторный вопрос обслуживается без анализа,
+    обращения к онтологии и морфологии. Каждая запись помечена тегами
+    (леммы понятий, URI сущностей); по тегу записи снимаются при обогащении.
+    """
+    MAX_SIZE = 5000
+    ALIASES_PER_ENTRY = 4  # Разных формулировок вопроса на один ответ
+    # Файл ответов, см. save и load. Версия 1 могла содержать ответы
+    # с незаполненными полями шаблона ({definition}...)
+    FORMAT_VERSION = 2
+
+    def __init__(self, max_size=None):
+        self.max_size = max_size or self.MAX_SIZE
+        self.logger = logging.getLogger(__name__)
+
+        self._answers = OrderedDict()  # ключ -> (ответ, теги)
+        self._aliases = OrderedDict()  # нормализованный вопрос -> ключ
+        self._tags = {}  # тег -> множество ключей
+        self._lock = threading.Lock()
+        self._counters = {
+            'question_hits': 0,
+            'key_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'invalidations': 0,
+        }
+
+    @staticmethod
+    def make_key(handler_data):
+        return (
+            handler_data['handler'],
+            handler_data['focus_lemma'],
+            handler_data.get('focus_secondary', '').lower(),
+        )
+
+    def get_by_question(self, question):
+        """Пара (ключ, ответ) по нормализованному тексту вопроса или None"""
+        with self._lock:
+            key = self._aliases.get(question)
+            entry = self._answers.get(key) if key is not None else None
+            if entry is None:
+                return None
+            self._aliases.move_to_end(question)
+            self._answers.move_to_end(key)
+            self._counters['question_hits'] += 1
+            return key, entry[0]
+
+    def get(self, key, question=None):
+        """Ответ по ключу; при попадании запоминает формулировку вопроса"""
+        with self._lock:
+            entry = self._answers.get(key)
+            if entry is None:
+                self._counters['misses'] += 1
+                return None
+            self._answers.move_to_end(key)
+            self._counters['key_hits'] += 1
+            if question is not None:
+                self._alias(question, key)
+            return entry[0]
+
+    def put(self, key, answer, tags=(), question=None):
+        with self._lock:
+            if key in self._answers:
+                self._untag(key, self._answers[key][1])
+            tags = frozenset(tag for tag in tags if tag)
+            self._answers[key] = (answer, tags)
+            self._answers.move_to_end(key)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            if question is not None:
+                self._alias(question, key)
+            self._counters['stores'] += 1
+
+            while len(self._answers) > self.max_size:
+                old_key, (_, old_tags) = self._answers.popitem(last=False)
+                self._untag(old_key, old_tags)
+                self._counters['evictions'] += 1
+
+    def invalidate(self, tags):
+        """Удаляет все ответы, помеченные любым из тегов"""
+        with self._lock:
+            keys = set()
+            for tag in tags:
+                keys.update(self._tags.get(tag, ()))
+            for key in keys:
+                if key in self._answers:
+                    _, key_tags = self._answers.pop(key)
+                    self._untag(key, key_tags)
+            self._counters['invalidations'] += len(keys)
+        if keys:
+            self.logger.info(f"Answer cache: {len(keys)} entries invalidated")
+        return len(keys)
+
+    def _alias(self, question, key):
+        self._aliases[question] = key
+        self._aliases.move_to_end(question)
+        # Псевдонимы на удаленные ответы вытесняются вместе с самыми старыми
+        while len(self._aliases) > self.max_size * self.ALIASES_PER_ENTRY:
+            self._aliases.popitem(last=False)
+
+    def _untag(self, key, tags):
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def entries(self):
+        """Записи (ключ, ответ, теги) от самой старой к самой новой"""
+        with self._lock:
+            return [(key, answer, tags) for key, (answer, tags) in self._answers.items()]
+
+    def save(self, path, header):
+        """Атомарно записывает ответы в файл; header - состояние онтологии для load"""
+        entries = self.entries()
+        directory = os.path.dirname(os.path.abspath(path))
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump({'version': self.FORMAT_VERSION, **header}, f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(entries, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            self.logger.info(f"Answer cache: {len(entries)} entries saved to {path}")
+        except Exception as e:
+            self.logger.warning(f"Failed to save answer cache: {str(e)}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def load(self, path, is_fresh):
+        """Загружает ответы из файла, если is_fresh(header) подтверждает их актуальность
+
+        Возвращает заголовок файла или None, если файла нет или он устарел.
+        """
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                header = pickle.load(f)
+                if header.get('version') != self.FORMAT_VERSION or not is_fresh(header):
+                    self.logger.info(f"Answer cache file {path} is stale, ignored")
+                    return None
+                entries = pickle.load(f)
+        except Exception as e:
+            self.logger.warning(f"Failed to load answer cache: {str(e)}")
+            return None
+        for key, answer, tags in entries:
+            self.put(key, answer, tags)
+        self.logger.info(f"Answer cache: {len(entries)} entries loaded from {path}")
+        return header
+
+    def clear(self):
+        with self._lock:
+            self._answers.clear()
+            self._aliases.clear()
+            self._tags.clear()
+
+    def stats(self):
+        with self._lock:
+            hits = self._counters['question_hits'] + self._counters['key_hits']
+            lookups = hits + self._counters['misses']
+            return {
+                'entries': len(self._answers),
+                'aliases': len(self._aliases),
+                'max_size': self.max_size,
+                'hit_rate': hits / lookups if lookups else 0.0,
+                **self._counters,
+            }
@@ -0,0 +1,79 @@
+import logging
+import threading
+import time
+
+
+class CircuitBreaker:
+    """Размыкатель цепи: отключает вызовы внешнего сервиса после серии сбоев"""
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    FAILURE_THRESHOLD = 5  # Подряд идущих сбоев до размыкания
+    RESET_TIMEOUT = 30.0  # Секунд до пробного запроса
+
+    def __init__(self, name, failure_threshold=None, reset_timeout=None):
+        self.name = name
+        self.failure_threshold = failure_threshold or self.FAILURE_THRESHOLD
+        self.reset_timeout = reset_timeout or self.RESET_TIMEOUT
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_started_at = None
+        self._counters = {'successes': 0, 'failures': 0, 'rejected': 0, 'trips': 0}
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def allow(self):
+        """Разрешает вызов; в полуоткрытом состоянии пропускает один пробный"""
+        now = time.monotonic()
+        with self._lock:
+            if self._state == self.OPEN and now - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                self._trial_started_at = None
+            if self._state == self.HALF_OPEN:
+                # Пробный вызов, не вернувший результата, не блокирует цепь навсегда
+                if self._trial_started_at is None or now - self._trial_started_at >= self.reset_timeout:
+                    self._trial_started_at = now
+                    return True
+            if self._state == self.CLOSED:
+                return True
+            self._counters['rejected'] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._counters['successes'] += 1
+            self._consecutive_failures = 0
+            if self._state != self.CLOSED:
+                self.logger.info(f"Circuit '{self.name}' closed")
+            self._state = self.CLOSED
+            self._trial_started_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._counters['failures'] += 1
+            self._consecutive_failures += 1
+            if self._state == self.HALF_OPEN or (
+                    self._state == self.CLOSED and self._consecutive_failures >= self.failure_threshold):
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_started_at = None
+                self._counters['trips'] += 1
+                self.logger.warning(
+                    f"Circuit '{self.name}' opened after {self._consecutive_failures} consecutive failures"
+                )
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self._state,
+                'consecutive_failures': self._consecutive_failures,
+                **self._counters,
+            }
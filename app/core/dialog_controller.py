@@ -1,10 +1,22 @@
 from .question_handler import QuestionHandler
 from .ontology_controller import OntologyController
-from .wikidata_connector import WikidataConnector
 from .response_builder import ResponseBuilder
 from .ontology_enrichment import OntologyEnrichment
+from .enrichment_queue import EnrichmentQueue
+from .query_cache import QueryCache
+from .circuit_breaker import CircuitBreaker
+from .morphology import get_morphology
+from .answer_cache import AnswerCache
+from .label_index import LabelIndex
+from .ontology_snapshot import OntologySnapshot
+from .metrics import QAMetrics, StageTimer
+from .profiler import NULL_SESSION, QuestionProfiler
+from concurrent.futures import TimeoutError as FutureTimeoutError, as_completed
+import asyncio
 import logging
+import os
 import threading
+import time
 
 
 class DialogController:
@@ -17,47 +29,840 @@ class DialogController:
         'get_applications': 'get_applications',
         'get_authors': 'get_authors',
         'get_complexity': 'get_complexity',
+        'get_ancestors': 'get_ancestors',
+        'get_descendants': 'get_descendants',
+        'is_subclass_of': 'is_subclass_of',
+        'get_common_ancestors': 'get_common_ancestors',
     }
 
-    def __init__(self, ontology_path, config_path):
+    WIKIDATA_CACHE_FILE = 'wikidata_cache.sqlite3'
+    ANSWER_CACHE_FILE = 'answer_cache.pickle'
+    PROFILE_DIR = 'profiles'
+    LATENCY_BUDGET = 3.0  # секунд на весь ответ, включая обращение к Wikidata
+
+    # Компоненты, создаваемые при первом обращении (см. _component)
+    COMPONENTS = ('ontology', 'morphology', 'question_handler', 'response_builder', 'enricher')
+    # Сервисы Wikidata и очередь обогащения: свои в каждом процессе (см. start_services)
+    SERVICES = ('wikidata_cache', 'wikidata_breaker', 'wikidata', 'enrichment_queue')
+
+    def __init__(self, ontology_path, config_path, settings=None, preload=False, lazy=False):
+        """Тяжелые компоненты - онтология, морфология, анализатор вопросов,
+        журнал обогащений, сервисы Wikidata - создаются при первом обращении
+
+        По умолчанию все они загружаются фоновым потоком (warm_up_async):
+        конструктор возвращается сразу, is_ready() становится истинным,
+        когда загружены компоненты и запущены сервисы; кэш морфологии и
+        вторичные индексы достраиваются после этого. Запрос, пришедший
+        раньше, дождется нужного ему компонента.
+
+        preload=True - подготовка в главном процессе перед fork воркеров:
+        онтология, индексы и кэш морфологии строятся сразу и достаются
+        воркерам через общие страницы памяти. Потоки, соединения и журнал
+        обогащений не переживают fork, поэтому каждый воркер запускает их
+        сам через start_services().
+
+        lazy=True - без прогрева: утилиты, которым нужна часть конвейера,
+        загружают только то, к чему обращаются.
+        """
+        self.settings = settings or {}
+        self.ontology_path = ontology_path
+        self.config_path = config_path
+        self.preload = preload
         self.logger = logging.getLogger(__name__)
-        self.ontology = OntologyController(ontology_path)
-        self.wikidata = WikidataConnector()
-        self.question_handler = QuestionHandler(config_path)
-        self.response_builder = ResponseBuilder()
-        self.enricher = OntologyEnrichment(ontology_path)
-        self.logger.info("DialogController initialized")
+        self.latency_budget = self.settings.get('latency_budget') or self.LATENCY_BUDGET
+        self._budget_lock = threading.Lock()
+        self._budget_counters = {'overruns': 0, 'exhausted_before_fallback': 0}
+        self.answer_cache = AnswerCache(self.settings.get('answer_cache_size'))
+        self.answer_cache_path = (self.settings.get('answer_cache_path')
+                                  or os.path.join(self._data_dir(), self.ANSWER_CACHE_FILE))
+        self.metrics = QAMetrics()
+        self.profiler = QuestionProfiler(
+            self.settings.get('profile_dir') or os.path.join(self._data_dir(), self.PROFILE_DIR),
+            sample_rate=self.settings.get('profile_sample_rate'),
+            slow_threshold=self.settings.get('profile_slow_threshold'),
+            max_captures=self.settings.get('profile_max_captures'),
+            interval=self.settings.get('profile_interval'),
+        )
+
+        # Созданные компоненты и время создания каждого, а также этапов прогрева
+        self._components = {}
+        self._components_lock = threading.RLock()
+        self._services_pid = None
+        self.load_timings = {}
+        self._warm_up_lock = threading.Lock()
+        self._warm_up_done = threading.Event()
+        self._warm_up_error = None
+        self._caches_warming = False
+        self._register_gauges()
+
+        if preload:
+            self.warm_up()
+            self.warm_caches()
+            self.logger.info("DialogController preloaded")
+        elif not lazy:
+            self.warm_up_async()
+            self.logger.info("DialogController initialized, warming up in background")
+
+    def _component(self, name, factory):
+        """Компонент по имени; factory вызывается один раз, при первом обращении"""
+        component = self._components.get(name)
+        if component is None:
+            with self._components_lock:
+                component = self._components.get(name)
+                if component is None:
+                    started = time.perf_counter()
+                    component = factory()
+                    self._components[name] = component
+                    self.load_timings[name] = time.perf_counter() - started
+        return component
+
+    def _loaded(self, name):
+        """Компонент, если он уже создан (сервис - в этом процессе), иначе None"""
+        if name in self.SERVICES and self._services_pid != os.getpid():
+            return None
+        return self._components.get(name)
+
+    @property
+    def ontology(self):
+        return self._component('ontology', self._load_ontology)
+
+    def _load_ontology(self):
+        ontology = OntologyController(
+            self.ontology_path, build_workers=self.settings.get('ontology_build_workers')
+        )
+        # Журнал обогащений воспроизводится вместе с загрузкой онтологии, до
+        # первого ответа по ней. Воркеры с общим журналом не сливают его с
+        # основным файлом
+        self._components['enricher'] = OntologyEnrichment(
+            self.ontology_path, ontology, auto_compact=not self.preload
+        )
+        # Кэшированных ответов по этой онтологии еще нет: слушатель - после воспроизведения
+        ontology.add_change_listener(self._on_ontology_change)
+        return ontology
+
+    @property
+    def morphology(self):
+        return self._component('morphology', get_morphology)
+
+    @property
+    def question_handler(self):
+        return self._component('question_handler', self._load_question_handler)
+
+    def _load_question_handler(self):
+        # Словари pymorphy2 - отдельный компонент со своим временем загрузки
+        self.morphology
+        return QuestionHandler(self.config_path)
+
+    @property
+    def response_builder(self):
+        return self._component('response_builder', ResponseBuilder)
+
+    @property
+    def enricher(self):
+        # Создается вместе с онтологией
+        self.ontology
+        return self._components['enricher']
+
+    @property
+    def wikidata_cache(self):
+        return self._service('wikidata_cache')
+
+    @property
+    def wikidata_breaker(self):
+        return self._service('wikidata_breaker')
+
+    @property
+    def wikidata(self):
+        return self._service('wikidata')
+
+    @property
+    def enrichment_queue(self):
+        return self._service('enrichment_queue')
+
+    def _service(self, name):
+        if self._services_pid != os.getpid():
+            self.start_services()
+        return self._components[name]
+
+    def start_services(self):
+        """Кэш Wikidata, коннектор и очередь обогащения: свои в каждом процессе
+
+        Воркер после fork вызывает его явно; иначе сервисы запускаются при
+        первом обращении к ним.
+        """
+        with self._components_lock:
+            if self._services_pid == os.getpid():
+                return
+            started = time.perf_counter()
+            # aiohttp импортируется только процессами, которые обращаются к Wikidata
+            from .wikidata_connector import WikidataConnector
+
+            wikidata_cache = QueryCache(os.path.join(self._data_dir(), self.WIKIDATA_CACHE_FILE))
+            wikidata_breaker = CircuitBreaker(
+                'wikidata',
+                failure_threshold=self.settings.get('breaker_failure_threshold'),
+                reset_timeout=self.settings.get('breaker_reset_timeout'),
+            )
+            self._components.update(
+                wikidata_cache=wikidata_cache,
+                wikidata_breaker=wikidata_breaker,
+                wikidata=WikidataConnector(
+                    cache=wikidata_cache,
+                    endpoint=self.settings.get('wikidata_endpoint'),
+                    timeout=self.settings.get('wikidata_timeout'),
+                    max_concurrency=self.settings.get('wikidata_max_concurrency'),
+                    batch_size=self.settings.get('wikidata_batch_size'),
+                    breaker=wikidata_breaker,
+                ),
+                enrichment_queue=EnrichmentQueue(self.enricher),
+            )
+            self._services_pid = os.getpid()
+            self.load_timings['services'] = time.perf_counter() - started
+        self.profiler.start()
+
+    def warm_up(self, services=False):
+        """Загружает компоненты заранее, а не на первых запросах
+
+        Онтология, морфология, анализатор вопросов, журнал обогащений и кэш
+        ответов из файла; services=True - еще и сервисы этого процесса.
+        После этого контроллер готов к трафику (is_ready). Повторный вызов
+        только запускает сервисы, если их еще нет.
+        """
+        with self._warm_up_lock:
+            if self._warm_up_done.is_set():
+                if services:
+                    self.start_services()
+                return
+            try:
+                for name in self.COMPONENTS:
+                    getattr(self, name)
+                self._timed('answer_cache', self._load_answer_cache)
+                if services:
+                    self.start_services()
+            except Exception as e:
+                self._warm_up_error = str(e)
+                raise
+            finally:
+                self._warm_up_done.set()
+
+    def warm_caches(self):
+        """Кэш морфологии по меткам онтологии и вторичные индексы онтологии
+
+        Без них ответы верны, но первые вопросы медленнее; запрос к иерархии
+        или поиск, пришедший во время сборки, дождется своего индекса.
+        """
+        self._caches_warming = True
+        try:
+            # Снимок меток: обогащение может пополнять индекс во время прогрева
+            self._timed('morphology_cache', self.morphology.warm_up, list(self.ontology.label_index.labels()))
+            self._timed('secondary_indexes', self.ontology.build_secondary_indexes)
+        finally:
+            self._caches_warming = False
+
+    def warm_up_async(self, services=True):
+        """warm_up и warm_caches в фоновом потоке; ошибка попадает в лог и readiness()"""
+        def run():
+            try:
+                self.warm_up(services)
+                self.warm_caches()
+            except Exception:
+                self.logger.exception("DialogController background warm-up failed")
+
+        thread = threading.Thread(target=run, name='controller-warm-up', daemon=True)
+        thread.start()
+        return thread
+
+    def _timed(self, stage, func, *args):
+        started = time.perf_counter()
+        func(*args)
+        self.load_timings[stage] = time.perf_counter() - started
+
+    def is_ready(self):
+        """Прогрев завершен без ошибок и сервисы запущены в этом процессе"""
+        return (self._warm_up_done.is_set() and self._warm_up_error is None
+                and self._services_pid == os.getpid())
+
+    def wait_ready(self, timeout=None):
+        """Ждет завершения прогрева не дольше timeout; возвращает is_ready()"""
+        self._warm_up_done.wait(timeout)
+        return self.is_ready()
+
+    def readiness(self):
+        """Состояние для балансировщика: готовность и загруженные компоненты"""
+        return {
+            'ready': self.is_ready(),
+            'pid': os.getpid(),
+            'warming_up': not self._warm_up_done.is_set(),
+            'warming_caches': self._caches_warming,
+            'error': self._warm_up_error,
+            'components': {name: self._loaded(name) is not None for name in self.COMPONENTS + self.SERVICES},
+            'load_ms': {stage: round(seconds * 1000, 1) for stage, seconds in self.load_timings.items()},
+        }
+
+    def _data_dir(self):
+        return os.path.dirname(os.path.abspath(self.ontology_path))
+
+    def _load_answer_cache(self):
+        """Ответы, сохраненные прогревом (app/prewarm.py) для той же версии онтологии
+
+        Файл годен, если RDF-файл не менялся; ответы о сущностях, которые
+        обогащены после сохранения, снимаются по журналу обогащений.
+        """
+        snapshot = OntologySnapshot(self.ontology_path)
+        header = self.answer_cache.load(self.answer_cache_path, lambda h: snapshot.matches(h['ontology']))
+        if header is None:
+            return
+        changed = self.enricher.subjects_since(header['delta'])
+        if changed is None:
+            self.logger.info("Enrichment log was compacted since the answer cache was saved, cache dropped")
+            self.answer_cache.clear()
+        elif changed:
+            self._on_ontology_change(changed)
+
+    def save_answer_cache(self):
+        """Сохраняет кэш ответов вместе с версией онтологии, по которой он построен
+
+        Ответы считаются построенными с учетом всего журнала обогащений на
+        момент сохранения.
+        """
+        header = {
+            'ontology': OntologySnapshot(self.ontology_path).source_signature(),
+            'delta': self.enricher.position(),
+        }
+        self.answer_cache.save(self.answer_cache_path, header)
 
     def process_question(self, question):
+        started = time.monotonic()
         self.logger.info(f"Processing question: {question}")
 
+        item = self._resolve_locally(question)
+        if item['answer'] is not None:
+            self._observe(item)
+            return item['answer']
+
+        # Запрос к Wikidata при отсутствии данных
+        handler_data = item['handler_data']
+        with item['timer'].stage('wikidata'):
+            wikidata_data = self._query_wikidata(handler_data, started)
+
+        # Фоновое обогащение онтологии
+        if wikidata_data:
+            self._enqueue_enrichment(item, wikidata_data)
+
+        answer = self._render(item)
+        self._observe(item)
+        return answer
+
+    def stream_question(self, question):
+        """События ответа: сразу локальный ответ, затем уточнение из Wikidata
+
+        Если в онтологии нет данных, первый ответ помечается pending, а
+        запрос к Wikidata ожидается не дольше таймаута коннектора (а не
+        бюджета времени ответа: пользователь уже получил ответ). Данные
+        Wikidata приходят отдельным событием update.
+        """
+        item = self._resolve_locally(question)
+        if item['answer'] is not None:
+            self._observe(item)
+            yield {'event': 'answer', 'response': item['answer'], 'pending': False}
+            yield {'event': 'done'}
+            return
+
+        handler_data = item['handler_data']
+        future = self.wikidata.submit(
+            self.wikidata.aquery(handler_data['handler'], handler_data['focus_lemma'])
+        )
+        yield {'event': 'answer', 'response': self._render(item), 'pending': True}
+
+        try:
+            with item['timer'].stage('wikidata'):
+                wikidata_data = future.result(self.wikidata.timeout)
+        except FutureTimeoutError:
+            self._count_budget('overruns')
+            future.add_done_callback(lambda f: self._enrich_late(handler_data, f))
+            wikidata_data = None
+        if wikidata_data:
+            self._enqueue_enrichment(item, wikidata_data)
+            yield {'event': 'update', 'response': self._render(item), 'pending': False}
+        self._observe(item)
+        yield {'event': 'done'}
+
+    def process_batch(self, questions):
+        """Ответы на список вопросов в исходном порядке"""
+        results = [None] * len(questions)
+        for index, result in self.iter_batch(questions):
+            results[index] = result
+        return results
+
+    def iter_batch(self, questions):
+        """Пары (номер вопроса, результат) по мере готовности
+
+        Одинаковые вопросы обрабатываются один раз. Ответы из кэша и
+        онтологии отдаются сразу; вопросы без данных группируются по
+        обработчику, и каждая группа уходит в Wikidata пакетными запросами
+        с VALUES. Группы выполняются параллельно в пределах одного бюджета
+        времени, ответы группы отдаются по ее завершении. Ошибка одного
+        вопроса не прерывает остальные.
+        """
+        started = time.monotonic()
+        positions, ready, misses = self._resolve_batch(questions)
+        yield from ready
+        submitted = time.perf_counter()
+        for by_lemma, results in self._query_wikidata_groups(misses, started):
+            yield from self._group_results(by_lemma, results, positions, submitted)
+
+    def _resolve_batch(self, questions):
+        """Локальные этапы пакета: позиции вопросов, готовые результаты и промахи"""
+        positions = {}
+        for index, question in enumerate(questions):
+            positions.setdefault(question, []).append(index)
+
+        # Промахи онтологии: обработчик -> лемма фокуса -> вопросы
+        ready = []
+        misses = {}
+        for question in positions:
+            try:
+                item = self._resolve_locally(question)
+            except Exception as e:
+                self.logger.error(f"Error processing question '{question}': {str(e)}")
+                item = {'answer': None, 'error': 'Internal server error'}
+            if item['answer'] is None and 'error' not in item:
+                handler_data = item['handler_data']
+                misses.setdefault(handler_data['handler'], {}).setdefault(
+                    handler_data['focus_lemma'], []).append((question, item))
+                continue
+            for index in positions[question]:
+                ready.append((index, self._batch_result(question, item)))
+            self._observe(item)
+        return positions, ready, misses
+
+    def _group_results(self, by_lemma, results, positions, submitted=None):
+        """Результаты вопросов группы после ответа Wikidata
+
+        submitted - момент отправки пакетных запросов (perf_counter), если
+        они отправлялись: ожидание учитывается как этап wikidata.
+        """
+        waited = time.perf_counter() - submitted if submitted is not None else None
+        group_results = []
+        for lemma, group in by_lemma.items():
+            data = results.get(lemma)
+            if data:
+                self._enqueue_enrichment(group[0][1], data)
+            for question, item in group:
+                if waited is not None:
+                    item['timer'].add('wikidata', waited)
+                if data:
+                    item['data'] = data
+                    item['source'] = 'wikidata'
+                for index in positions[question]:
+                    group_results.append((index, self._batch_result(question, item)))
+                self._observe(item)
+        return group_results
+
+    def _batch_result(self, question, item):
+        if 'error' not in item and item['answer'] is None:
+            try:
+                item['answer'] = self._render(item)
+            except Exception as e:
+                self.logger.error(f"Error building response for '{question}': {str(e)}")
+                item['error'] = 'Internal server error'
+        if 'error' in item:
+            return {'question': question, 'error': item['error']}
+        return {'question': question, 'response': item['answer']}
+
+    def _query_wikidata_groups(self, misses, started):
+        """Пакетные запросы по группам промахов: (группа, {лемма: данные}) по завершении
+
+        Группы, не успевшие в бюджет, отдаются без данных; их запоздавшие
+        результаты попадут в кэш и обогащение.
+        """
+        remaining = self.latency_budget - (time.monotonic() - started)
+        if remaining <= 0:
+            if misses:
+                self._count_budget('exhausted_before_fallback')
+            for by_lemma in misses.values():
+                yield by_lemma, {}
+            return
+
+        futures = {
+            self.wikidata.submit(self.wikidata.abatch_query(handler, list(by_lemma))): by_lemma
+            for handler, by_lemma in misses.items()
+        }
+        done = set()
+        try:
+            for future in as_completed(futures, timeout=remaining):
+                done.add(future)
+                if future.exception() is not None:
+                    self.logger.error(f"Batch Wikidata lookup failed: {str(future.exception())}")
+                    yield futures[future], {}
+                else:
+                    yield futures[future], future.result()
+        except FutureTimeoutError:
+            self._count_budget('overruns')
+            self.logger.warning(f"Latency budget exceeded for {len(futures) - len(done)} batch groups")
+            for future, by_lemma in futures.items():
+                if future not in done:
+                    future.add_done_callback(lambda f, by_lemma=by_lemma: self._enrich_late_group(by_lemma, f))
+                    yield by_lemma, {}
+
+    # Асинхронные варианты для сервера на asyncio: анализ, онтология и
+    # морфология выполняются в пуле executor, Wikidata ожидается без
+    # блокировки потока
+    async def aprocess_question(self, question, executor=None):
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        item = await loop.run_in_executor(executor, self._resolve_locally, question)
+        if item['answer'] is not None:
+            self._observe(item)
+            return item['answer']
+
+        handler_data = item['handler_data']
+        with item['timer'].stage('wikidata'):
+            wikidata_data = await self._aquery_wikidata(
+                handler_data, self.latency_budget - (time.monotonic() - started)
+            )
+        if wikidata_data:
+            self._enqueue_enrichment(item, wikidata_data)
+        answer = await loop.run_in_executor(executor, self._render, item)
+        self._observe(item)
+        return answer
+
+    async def astream_question(self, question, executor=None):
+        """Асинхронный вариант stream_question"""
+        loop = asyncio.get_running_loop()
+        item = await loop.run_in_executor(executor, self._resolve_locally, question)
+        if item['answer'] is not None:
+            self._observe(item)
+            yield {'event': 'answer', 'response': item['answer'], 'pending': False}
+            yield {'event': 'done'}
+            return
+
+        handler_data = item['handler_data']
+        task = asyncio.ensure_future(self._aquery_wikidata(handler_data, self.wikidata.timeout))
+        yield {'event': 'answer', 'response': await loop.run_in_executor(executor, self._render, item),
+               'pending': True}
+
+        with item['timer'].stage('wikidata'):
+            wikidata_data = await task
+        if wikidata_data:
+            self._enqueue_enrichment(item, wikidata_data)
+            yield {'event': 'update', 'response': await loop.run_in_executor(executor, self._render, item),
+                   'pending': False}
+        self._observe(item)
+        yield {'event': 'done'}
+
+    async def aiter_batch(self, questions, executor=None):
+        """Асинхронный вариант iter_batch"""
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        positions, ready, misses = await loop.run_in_executor(executor, self._resolve_batch, questions)
+        for result in ready:
+            yield result
+
+        remaining = self.latency_budget - (time.monotonic() - started)
+        if remaining <= 0:
+            if misses:
+                self._count_budget('exhausted_before_fallback')
+            for by_lemma in misses.values():
+                for result in await loop.run_in_executor(executor, self._group_results, by_lemma, {}, positions):
+                    yield result
+            return
+
+        submitted = time.perf_counter()
+        futures = {}
+        for handler, by_lemma in misses.items():
+            future = self.wikidata.submit(self.wikidata.abatch_query(handler, list(by_lemma)))
+            futures[asyncio.wrap_future(future)] = (future, by_lemma)
+
+        deadline = loop.time() + remaining
+        pending = set(futures)
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, timeout=max(0.0, deadline - loop.time()), return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                break
+            for task in done:
+                _, by_lemma = futures[task]
+                if task.exception() is not None:
+                    self.logger.error(f"Batch Wikidata lookup failed: {str(task.exception())}")
+                results = task.result() if task.exception() is None else {}
+                for result in await loop.run_in_executor(
+                        executor, self._group_results, by_lemma, results, positions, submitted):
+                    yield result
+
+        if pending:
+            self._count_budget('overruns')
+            self.logger.warning(f"Latency budget exceeded for {len(pending)} batch groups")
+        for task in pending:
+            future, by_lemma = futures[task]
+            future.add_done_callback(lambda f, by_lemma=by_lemma: self._enrich_late_group(by_lemma, f))
+            for result in await loop.run_in_executor(
+                    executor, self._group_results, by_lemma, {}, positions, submitted):
+                yield result
+
+    async def _aquery_wikidata(self, handler_data, timeout):
+        """Ожидание Wikidata не дольше timeout без блокировки потока"""
+        if timeout <= 0:
+            self._count_budget('exhausted_before_fallback')
+            return None
+
+        future = self.wikidata.submit(
+            self.wikidata.aquery(handler_data['handler'], handler_data['focus_lemma'])
+        )
+        try:
+            # shield: по таймауту запрос не отменяется, его результат нужен кэшу и обогащению
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+        except asyncio.TimeoutError:
+            self._count_budget('overruns')
+            self.logger.warning(f"Latency budget exceeded for '{handler_data['focus_original']}'")
+            future.add_done_callback(lambda f: self._enrich_late(handler_data, f))
+            return None
+
+    def prewarm(self, requests, timeout=None, use_wikidata=True):
+        """Ответы для данных анализа без текста вопроса: прогрев кэшей
+
+        requests - данные анализа (QuestionHandler.make_request). Промахи
+        онтологии запрашиваются в Wikidata пакетами по обработчику и
+        ожидаются до timeout без бюджета времени ответа: задача прогрева -
+        заполнить кэш ответов, кэш Wikidata и онтологию, а не ответить
+        быстро. Возвращает источник ответа для каждого запроса.
+        """
+        items = []
+        misses = {}
+        for handler_data in requests:
+            item = {'answer': None, 'timer': StageTimer(), 'profile': NULL_SESSION,
+                    'handler': handler_data['handler'], 'source': 'none'}
+            item = self._resolve_analyzed(item, handler_data, None)
+            items.append(item)
+            if item['answer'] is None:
+                misses.setdefault(handler_data['handler'], {}).setdefault(
+                    handler_data['focus_lemma'], []).append(item)
+
+        if use_wikidata:
+            futures = [
+                (self.wikidata.submit(self.wikidata.abatch_query(handler, list(by_lemma))), by_lemma)
+                for handler, by_lemma in misses.items()
+            ]
+            for future, by_lemma in futures:
+                try:
+                    results = future.result(timeout)
+                except Exception as e:
+                    self.logger.error(f"Prewarm Wikidata lookup failed: {str(e)}")
+                    continue
+                for lemma, group in by_lemma.items():
+                    if results.get(lemma):
+                        self._enqueue_enrichment(group[0], results[lemma])
+                        for item in group:
+                            item.update(data=results[lemma], source='wikidata')
+                            item['answer'] = self._render(item)
+        return [item['source'] for item in items]
+
+    def _resolve_locally(self, question):
+        """Этапы без сети: кэш ответов, анализ вопроса и поиск в онтологии
+
+        Возвращает элемент с готовым ответом (answer) либо с данными
+        анализа, ключом кэша и данными онтологии, если их достаточно.
+        Элемент несет StageTimer запроса (timer), обработчик (handler) и
+        источник ответа (source: ontology, wikidata, cache или none), а
+        также сессию профилировщика (profile).
+        """
+        timer = StageTimer()
+        profile = self.profiler.session(question)
+        with profile:
+            return self._resolve_stages(question, timer, profile)
+
+    def _resolve_stages(self, question, timer, profile):
+        # Готовый ответ на ту же формулировку: без анализа, онтологии и морфологии
+        with timer.stage('normalize'):
+            normalized = self.question_handler.normalize_question(question)
+        with timer.stage('cache'):
+            cached = self.answer_cache.get_by_question(normalized)
+        if cached is not None:
+            key, answer = cached
+            return {'answer': answer, 'timer': timer, 'profile': profile, 'handler': key[0], 'source': 'cache'}
+
         # Анализ вопроса
-        handler_data = self.question_handler.analyze_question(question)
+        handler_data = self.question_handler.analyze_question(question, timer, normalized)
         self.logger.info(f"Handler: {handler_data['handler']}, Focus: {handler_data['focus_original']}")
+        item = {'answer': None, 'timer': timer, 'profile': profile,
+                'handler': handler_data['handler'], 'source': 'none'}
 
         # Пропуск обработки для неизвестных вопросов
         if handler_data['handler'] == 'default':
-            return handler_data['response_templates']['default']
+            item['answer'] = handler_data['response_templates']['default']
+            return item
+
+        return self._resolve_analyzed(item, handler_data, normalized)
+
+    def _resolve_analyzed(self, item, handler_data, normalized):
+        """Кэш по ключу ответа и онтология для проанализированного вопроса"""
+        timer = item['timer']
+        # Тот же вопрос в другой формулировке
+        cache_key = AnswerCache.make_key(handler_data)
+        with timer.stage('cache'):
+            answer = self.answer_cache.get(cache_key, normalized)
+        if answer is not None:
+            item.update(answer=answer, source='cache')
+            return item
 
         # Поиск в локальной онтологии
-        ontology_method = getattr(self.ontology, self.HANDLER_MAP.get(handler_data['handler'], None))
-        ontology_data = ontology_method(handler_data['focus_original']) if ontology_method else None
+        method_name = self.HANDLER_MAP.get(handler_data['handler'])
+        ontology_method = getattr(self.ontology, method_name, None) if method_name else None
+        with timer.stage('ontology'):
+            ontology_data = self._call_ontology(ontology_method, handler_data) if ontology_method else None
 
-        # Запрос к Wikidata при отсутствии данных
-        wikidata_data = None
-        if not ontology_data:
-            wikidata_method = getattr(self.wikidata, handler_data['handler'], None)
-        if wikidata_method:
-            wikidata_data = wikidata_method(handler_data['focus_lemma'])
+        item.update(normalized=normalized, handler_data=handler_data, cache_key=cache_key, data=ontology_data)
+        # Ответ «нет» - тоже данные
+        if ontology_data or isinstance(ontology_data, bool):
+            item['source'] = 'ontology'
+            item['answer'] = self._render(item)
+        return item
 
-        # Асинхронное обогащение онтологии
-        if wikidata_data:
-            threading.Thread(
-                target=self.enricher.enrich,
-                args=(handler_data, wikidata_data)
-            ).start()
+    def _enqueue_enrichment(self, item, wikidata_data):
+        """Данные Wikidata - в ответ и в фоновое обогащение онтологии"""
+        with item['timer'].stage('enqueue'):
+            self.enrichment_queue.submit(item['handler_data'], wikidata_data)
+        item['data'] = wikidata_data
+        item['source'] = 'wikidata'
+
+    def _observe(self, item):
+        timer = item.get('timer')
+        if timer is not None:
+            self.metrics.observe_request(item['handler'], item['source'], timer)
+            self.profiler.finish(item['profile'], item['handler'], item['source'], timer)
+
+    def _render(self, item):
+        """Формирует ответ и кэширует его, если он построен по данным"""
+        handler_data, data = item['handler_data'], item['data']
+        with item['profile'], item['timer'].stage('render'):
+            answer, complete = self.response_builder.render(handler_data, data)
+
+        # Кэшируются только ответы с данными: ответ «не найдено» может
+        # устареть, как только придет запоздавший результат Wikidata.
+        # Ответ с незаполненными полями шаблона не кэшируется вовсе
+        if complete and (data or isinstance(data, bool)):
+            self.answer_cache.put(item['cache_key'], answer, self._answer_tags(handler_data), item['normalized'])
+        return answer
+
+    def _answer_tags(self, handler_data):
+        """Теги ответа: леммы понятий и URI найденных сущностей"""
+        tags = {handler_data['focus_lemma'], handler_data.get('focus_secondary', '').lower()}
+        for name in (handler_data['focus_original'], handler_data.get('focus_secondary')):
+            uri = self.ontology.label_index.find(name) if name else None
+            if uri is not None:
+                tags.add(str(uri))
+        return tags
+
+    def _on_ontology_change(self, uris):
+        """Снимает кэшированные ответы о сущностях, измененных обогащением"""
+        tags = set()
+        for uri in uris:
+            tags.add(str(uri))
+            for label in self.ontology.entity_labels(uri):
+                tags.add(self.morphology.lemmatize(LabelIndex.normalize(label)))
+        self.answer_cache.invalidate(tags)
+
+    @staticmethod
+    def _call_ontology(method, handler_data):
+        """Вызов метода онтологии: фокус, второе понятие (если есть) и опции шаблона"""
+        args = [handler_data['focus_original']]
+        if handler_data.get('focus_secondary'):
+            args.append(handler_data['focus_secondary'])
+        return method(*args, **handler_data.get('options', {}))
+
+    def _query_wikidata(self, handler_data, started):
+        """Запрос к Wikidata в пределах оставшегося бюджета времени ответа"""
+        remaining = self.latency_budget - (time.monotonic() - started)
+        if remaining <= 0:
+            self._count_budget('exhausted_before_fallback')
+            return None
+
+        future = self.wikidata.submit(
+            self.wikidata.aquery(handler_data['handler'], handler_data['focus_lemma'])
+        )
+        try:
+            return future.result(remaining)
+        except FutureTimeoutError:
+            # Ответ без Wikidata; запоздавший результат попадет в кэш и обогащение
+            self._count_budget('overruns')
+            self.logger.warning(f"Latency budget exceeded for '{handler_data['focus_original']}'")
+            future.add_done_callback(lambda f: self._enrich_late(handler_data, f))
+            return None
+
+    def _enrich_late_group(self, by_lemma, future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        for lemma, data in future.result().items():
+            if data:
+                self.enrichment_queue.submit(by_lemma[lemma][0][1]['handler_data'], data)
+
+    def _enrich_late(self, handler_data, future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        if future.result():
+            self.enrichment_queue.submit(handler_data, future.result())
+
+    def _count_budget(self, key):
+        with self._budget_lock:
+            self._budget_counters[key] += 1
+
+    def stats(self):
+        """Внутренние показатели компонентов для мониторинга
+
+        Показатели еще не загруженных компонентов не приводятся: сбор
+        статистики не должен запускать их загрузку.
+        """
+        result = {
+            'pid': os.getpid(),
+            'ready': self.is_ready(),
+            'warm_up': {stage: round(seconds, 3) for stage, seconds in self.load_timings.items()},
+        }
+        ontology = self._loaded('ontology')
+        if ontology is not None:
+            result['ontology_load'] = {stage: round(seconds, 3) for stage, seconds in ontology.load_timings.items()}
+        result['answer_cache'] = self.answer_cache.stats()
+        for key, name in (('enrichment_queue', 'enrichment_queue'), ('enrichment_log', 'enricher'),
+                          ('wikidata_cache', 'wikidata_cache'), ('morphology', 'morphology'),
+                          ('wikidata_breaker', 'wikidata_breaker')):
+            component = self._loaded(name)
+            if component is not None:
+                result[key] = component.stats()
+        result.update(
+            latency_budget={'budget': self.latency_budget, **self._budget_counters},
+            stages=self.metrics.stage_summary(),
+            profiler=self.profiler.stats(),
+        )
+        return result
+
+    def _register_gauges(self):
+        """Показатели компонентов в /metrics: читаются из stats() при сборе"""
+        gauge = self.metrics.gauge
+
+        def component_stat(name, key, default=0):
+            component = self._loaded(name)
+            return component.stats()[key] if component is not None else default
 
-        ontology_data = wikidata_data
+        gauge('qa_ready', 'Controller is warmed up and can serve traffic (1) or not (0)',
+              lambda: int(self.is_ready()))
+        gauge('qa_answer_cache_entries', 'Cached answers', lambda: self.answer_cache.stats()['entries'])
+        gauge('qa_enrichment_queue_depth', 'Enrichments waiting to be written',
+              lambda: component_stat('enrichment_queue', 'queue_depth'))
+        gauge('qa_wikidata_breaker_open', 'Wikidata circuit breaker is open (1) or not (0)',
+              lambda: int(component_stat('wikidata_breaker', 'state', None) == 'open'))
+        gauge('qa_latency_budget_events_total', 'Answers that hit the latency budget',
+              lambda: {(key,): value for key, value in self._budget_counters.items()},
+              ('event',), 'counter')
+        gauge('qa_profile_captures_total', 'Questions saved by the profiler',
+              lambda: {(reason,): self.profiler.stats()['captured_' + reason] for reason in ('sampled', 'slow')},
+              ('reason',), 'counter')
 
-        # Формирование ответа
-        return self.response_builder.build_response(handler_data, ontology_data)
\ No newline at end of file
+    def shutdown(self):
+        """Сбрасывает очередь обогащения перед остановкой процесса"""
+        enrichment_queue = self._loaded('enrichment_queue')
+        if enrichment_queue is not None:
+            enrichment_queue.shutdown()
+        self.profiler.stop()
+        if self._loaded('wikidata') is not None:
+            self.wikidata.close()
+            self.wikidata_cache.close()
@@ -0,0 +1,137 @@
+from collections import OrderedDict
+import logging
+import threading
+import time
+
+
+class EnrichmentQueue:
+    """Единственный фоновый писатель обогащений онтологии с пакетной записью"""
+    MAX_SIZE = 1000
+    BATCH_SIZE = 50
+    FLUSH_INTERVAL = 2.0  # секунд
+
+    def __init__(self, enricher, max_size=None, batch_size=None, flush_interval=None):
+        self.enricher = enricher
+        self.max_size = max_size or self.MAX_SIZE
+        self.batch_size = batch_size or self.BATCH_SIZE
+        self.flush_interval = flush_interval or self.FLUSH_INTERVAL
+        self.logger = logging.getLogger(__name__)
+
+        # (обработчик, лемма фокуса) -> последние данные для записи
+        self._pending = OrderedDict()
+        self._in_flight = 0
+        self._stopped = False
+        self._flush_requested = False
+        self._cond = threading.Condition()
+        self._counters = {
+            'enqueued': 0,
+            'coalesced': 0,
+            'dropped': 0,
+            'written': 0,
+            'batches': 0,
+            'failed': 0,
+        }
+
+        self._worker = threading.Thread(target=self._run, name='ontology-enrichment', daemon=True)
+        self._worker.start()
+
+    def submit(self, handler_data, data):
+        """Ставит обогащение в очередь; возвращает False, если элемент отброшен"""
+        key = (handler_data['handler'], handler_data['focus_lemma'])
+        with self._cond:
+            if self._stopped:
+                self._counters['dropped'] += 1
+                return False
+            if key in self._pending:
+                self._pending[key] = (handler_data, data)
+                self._counters['coalesced'] += 1
+                return True
+            if len(self._pending) >= self.max_size:
+                self._counters['dropped'] += 1
+                return False
+            self._pending[key] = (handler_data, data)
+            self._counters['enqueued'] += 1
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+        return True
+
+    def _take_batch(self):
+        batch = []
+        while self._pending and len(batch) < self.batch_size:
+            batch.append(self._pending.popitem(last=False)[1])
+        self._in_flight = len(batch)
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while (not self._stopped and not self._flush_requested
+                       and len(self._pending) < self.batch_size):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if not self._pending:
+                    self._flush_requested = False
+                    self._cond.notify_all()
+                    if self._stopped:
+                        return
+                    batch = None
+                else:
+                    batch = self._take_batch()
+
+            if batch is None:
+                # В простое - обогащения, записанные в общий журнал другими процессами
+                self._sync()
+                continue
+
+            try:
+                self.enricher.enrich_batch(batch)
+                written, failed = len(batch), 0
+            except Exception as e:
+                self.logger.error(f"Enrichment batch failed: {str(e)}")
+                written, failed = 0, len(batch)
+
+            with self._cond:
+                self._in_flight = 0
+                self._counters['written'] += written
+                self._counters['failed'] += failed
+                self._counters['batches'] += 1
+                self._cond.notify_all()
+
+    def _sync(self):
+        try:
+            self.enricher.sync()
+        except Exception as e:
+            self.logger.error(f"Enrichment log sync failed: {str(e)}")
+
+    def flush(self, timeout=None):
+        """Дожидается записи всех накопленных обогащений"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            while (self._pending or self._in_flight) and self._worker.is_alive():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def shutdown(self, timeout=10.0):
+        """Записывает остаток очереди и останавливает фоновый поток"""
+        self.flush(timeout)
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._worker.join(timeout)
+        self.logger.info("Enrichment queue stopped")
+
+    def stats(self):
+        with self._cond:
+            return {
+                'queue_depth': len(self._pending) + self._in_flight,
+                'max_size': self.max_size,
+                **self._counters,
+            }
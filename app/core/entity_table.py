@@ -0,0 +1,30 @@
+class EntityTable:
+    """Скомпилированные атрибуты сущностей онтологии по столбцам
+
+    Каждый столбец - словарь: номер сущности (из LabelIndex) -> значение,
+    уже отфильтрованное по языку и очищенное. Пустые значения не хранятся,
+    поэтому столбцы разреженные. Списки хранятся кортежами и при чтении
+    копируются, чтобы вызывающий код не мог изменить таблицу.
+    """
+
+    def __init__(self, fields):
+        self.columns = {field: {} for field in fields}
+
+    def __len__(self):
+        return len(set().union(*self.columns.values())) if self.columns else 0
+
+    def set_row(self, entity_id, row):
+        """Записывает строку: поле -> значение; пустые значения удаляются"""
+        for field, column in self.columns.items():
+            value = row.get(field)
+            if value is None or (isinstance(value, (list, tuple)) and not value):
+                column.pop(entity_id, None)
+            else:
+                column[entity_id] = tuple(value) if isinstance(value, list) else value
+
+    def get(self, field, entity_id, default=None):
+        value = self.columns[field].get(entity_id, default)
+        return list(value) if isinstance(value, tuple) else value
+
+    def stats(self):
+        return {field: len(column) for field, column in self.columns.items()}
@@ -0,0 +1,189 @@
+class HierarchyIndex:
+    """Транзитивное замыкание иерархии rdfs:subClassOf на битовых множествах
+
+    Узлы получают целочисленные номера, для каждого узла хранятся множества
+    предков и потомков в виде целых чисел (бит i - узел i). Проверка
+    «X - частный случай Y» сводится к одной битовой операции, общие предки -
+    к пересечению двух чисел. Для обхода с ограничением глубины сохранены
+    списки непосредственных родителей и детей.
+    """
+
+    def __init__(self, edges):
+        """edges - итерируемое из пар (подкласс, надкласс)"""
+        self.nodes = []  # номер -> URI
+        self._ids = {}  # URI -> номер
+        self.parents = []  # номер -> [номера непосредственных надклассов]
+        self.children = []  # номер -> [номера непосредственных подклассов]
+
+        for child, parent in edges:
+            if child == parent:
+                continue
+            c, p = self._node(child), self._node(parent)
+            if p not in self.parents[c]:
+                self.parents[c].append(p)
+                self.children[p].append(c)
+
+        self.ancestors, components = self._closure(self.parents)  # номер -> биты всех надклассов
+        self.descendants, _ = self._closure(self.children)  # номер -> биты всех подклассов
+        self.depth = self._depths(components)  # номер -> длина самого длинного пути от корня
+
+    def _node(self, uri):
+        node = self._ids.get(uri)
+        if node is None:
+            node = self._ids[uri] = len(self.nodes)
+            self.nodes.append(uri)
+            self.parents.append([])
+            self.children.append([])
+        return node
+
+    def _closure(self, edges):
+        """Биты достижимых узлов по edges и компоненты в порядке закрытия
+
+        Обход Тарьяна без рекурсии: компонента сильной связности закрывается
+        после всех достижимых из нее, и их множества к этому моменту готовы.
+        Узлы цикла (в онтологии он есть у корня иерархии) получают общее
+        множество - всю компоненту и то, что достижимо из нее, кроме самого
+        узла.
+        """
+        count = len(self.nodes)
+        closure = [0] * count
+        order = [None] * count  # номер узла в порядке входа
+        low = [0] * count
+        on_stack = [False] * count
+        stack = []
+        components = []
+        visited = 0
+        for start in range(count):
+            if order[start] is not None:
+                continue
+            order[start] = low[start] = visited
+            visited += 1
+            stack.append(start)
+            on_stack[start] = True
+            work = [(start, iter(edges[start]))]
+            while work:
+                node, neighbours = work[-1]
+                for next_node in neighbours:
+                    if order[next_node] is None:
+                        order[next_node] = low[next_node] = visited
+                        visited += 1
+                        stack.append(next_node)
+                        on_stack[next_node] = True
+                        work.append((next_node, iter(edges[next_node])))
+                        break
+                    if on_stack[next_node]:
+                        low[node] = min(low[node], order[next_node])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[node])
+                    if low[node] != order[node]:
+                        continue
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+                        if member == node:
+                            break
+                    bits = 0
+                    for member in component:
+                        for next_node in edges[member]:
+                            bits |= closure[next_node] | (1 << next_node)
+                    for member in component:
+                        closure[member] = bits & ~(1 << member)
+                    components.append(component)
+        return closure, components
+
+    def _depths(self, components):
+        """Глубина по компонентам иерархии: узлы одного цикла на одном уровне
+
+        components - компоненты в порядке закрытия по parents, то есть
+        надклассы компоненты обработаны раньше нее.
+        """
+        depth = [0] * len(self.nodes)
+        for component in components:
+            members = set(component)
+            level = max((depth[p] + 1 for node in component for p in self.parents[node] if p not in members),
+                        default=0)
+            for node in component:
+                depth[node] = level
+        return depth
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, uri):
+        return uri in self._ids
+
+    @staticmethod
+    def _members(bits):
+        while bits:
+            low = bits & -bits
+            yield low.bit_length() - 1
+            bits ^= low
+
+    def _walk(self, node, edges, max_depth):
+        """Узлы на расстоянии от 1 до max_depth в порядке обхода в ширину"""
+        seen = {node}
+        level = [node]
+        result = []
+        for _ in range(max_depth):
+            next_level = []
+            for current in level:
+                for n in edges[current]:
+                    if n not in seen:
+                        seen.add(n)
+                        next_level.append(n)
+            if not next_level:
+                break
+            result.extend(next_level)
+            level = next_level
+        return result
+
+    def _related(self, uri, closure, edges, max_depth, reverse):
+        node = self._ids.get(uri)
+        if node is None:
+            return []
+        if max_depth is not None:
+            return [self.nodes[n] for n in self._walk(node, edges, max_depth)]
+        members = sorted(self._members(closure[node]), key=lambda n: self.depth[n], reverse=reverse)
+        return [self.nodes[n] for n in members]
+
+    def get_ancestors(self, uri, max_depth=None):
+        """Все надклассы, от ближайших к корню иерархии"""
+        return self._related(uri, self.ancestors, self.parents, max_depth, reverse=True)
+
+    def get_descendants(self, uri, max_depth=None):
+        """Все подклассы, от ближайших к листьям"""
+        return self._related(uri, self.descendants, self.children, max_depth, reverse=False)
+
+    def is_a(self, uri, ancestor_uri):
+        """Является ли uri (возможно, косвенным) подклассом ancestor_uri"""
+        node, ancestor = self._ids.get(uri), self._ids.get(ancestor_uri)
+        if node is None or ancestor is None:
+            return False
+        return node == ancestor or bool(self.ancestors[node] >> ancestor & 1)
+
+    def lowest_common_ancestors(self, uri_a, uri_b):
+        """Общие надклассы, ни один подкласс которых не является общим
+
+        Узлы одного цикла - подклассы друг друга, поэтому в расчет идут
+        только подклассы вне своей компоненты (они не являются и надклассами
+        узла): нижний общий цикл возвращается целиком.
+        """
+        a, b = self._ids.get(uri_a), self._ids.get(uri_b)
+        if a is None or b is None:
+            return []
+        common = (self.ancestors[a] | 1 << a) & (self.ancestors[b] | 1 << b)
+        lowest = [n for n in self._members(common) if not self.descendants[n] & ~self.ancestors[n] & common]
+        return [self.nodes[n] for n in sorted(lowest, key=lambda n: -self.depth[n])]
+
+    def stats(self):
+        return {
+            'nodes': len(self.nodes),
+            'edges': sum(len(p) for p in self.parents),
+            'roots': sum(1 for p in self.parents if not p),
+            'max_depth': max(self.depth, default=0),
+        }
@@ -0,0 +1,145 @@
+from collections import Counter
+from difflib import SequenceMatcher
+
+
+class KeywordIndex:
+    """Инвертированный индекс ключевых слов -> шаблоны
+
+    Все ключевые слова собраны в автомат Ахо-Корасик, поэтому за один проход
+    по вопросу находятся все вхождения (как подстроки, что совпадает с
+    проверкой `kw in question`). Шаблон подходит, если найдены все его
+    ключевые слова; из подходящих выбирается первый по порядку.
+    """
+
+    def __init__(self, keyword_sets):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]  # состояние -> номера ключевых слов, оканчивающихся здесь
+        self._postings = []  # номер ключевого слова -> номера шаблонов
+        self._required = []  # номер шаблона -> число различных ключевых слов
+        self._always = []  # шаблоны без ключевых слов подходят к любому вопросу
+
+        keyword_ids = {}
+        for pattern_id, keywords in enumerate(keyword_sets):
+            distinct = {kw for kw in keywords if kw}
+            self._required.append(len(distinct))
+            if not distinct:
+                self._always.append(pattern_id)
+            for kw in distinct:
+                if kw not in keyword_ids:
+                    keyword_ids[kw] = len(self._postings)
+                    self._postings.append([])
+                    self._insert(kw, keyword_ids[kw])
+                self._postings[keyword_ids[kw]].append(pattern_id)
+        self._build_failure_links()
+
+    def _insert(self, keyword, keyword_id):
+        state = 0
+        for ch in keyword:
+            if ch not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][ch] = len(self._goto) - 1
+            state = self._goto[state][ch]
+        self._output[state].append(keyword_id)
+
+    def _build_failure_links(self):
+        # Обход в ширину: у состояний первого уровня ссылка ведет в корень
+        queue = [0]
+        for state in queue:
+            for ch, child in self._goto[state].items():
+                queue.append(child)
+                if state == 0:
+                    continue
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(ch, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def find_keywords(self, text):
+        """Номера ключевых слов, входящих в текст"""
+        found = set()
+        state = 0
+        for ch in text:
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            found.update(self._output[state])
+        return found
+
+    def first_match(self, text):
+        """Номер первого шаблона, все ключевые слова которого есть в тексте"""
+        hits = Counter()
+        for keyword_id in self.find_keywords(text):
+            for pattern_id in self._postings[keyword_id]:
+                hits[pattern_id] += 1
+        matched = [pid for pid, count in hits.items() if count == self._required[pid]]
+        matched.extend(self._always)
+        return min(matched) if matched else None
+
+
+class FuzzyIndex:
+    """Триграммный индекс для нечеткого сравнения вопроса со строками шаблонов
+
+    Результат совпадает с перебором get_close_matches(text, [candidate],
+    cutoff=cutoff) по порядку строк. К каждой строке применяются те же
+    проверки: оценки по длинам и по общим символам, затем
+    SequenceMatcher.ratio() с разобранным один раз вопросом. Сначала
+    проверяются строки, имеющие с вопросом общую символьную триграмму
+    (и короткие строки без триграмм), - обычно совпадение среди них. Но
+    порога может достичь и строка без общих триграмм (совпадения по одному-
+    два символа), поэтому остальные строки с меньшим номером, а если
+    совпадения нет - все остальные, проверяются следом.
+    """
+    GRAM = 3
+
+    def __init__(self, candidates, cutoff=0.6):
+        self.candidates = list(candidates)
+        self.cutoff = cutoff
+        self._counts = [Counter(c) for c in self.candidates]
+        self._postings = {}  # триграмма -> номера кандидатов
+        self._short = []  # кандидаты короче триграммы
+        for i, candidate in enumerate(self.candidates):
+            grams = self._grams(candidate)
+            if not grams:
+                self._short.append(i)
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(i)
+
+    @classmethod
+    def _grams(cls, text):
+        return {text[i:i + cls.GRAM] for i in range(len(text) - cls.GRAM + 1)}
+
+    def _passes_bounds(self, text, text_counts, i):
+        """Верхние оценки real_quick_ratio и quick_ratio из difflib"""
+        total = len(text) + len(self.candidates[i])
+        if 2.0 * min(len(text), len(self.candidates[i])) / total < self.cutoff:
+            return False
+        common = sum(min(count, text_counts[ch]) for ch, count in self._counts[i].items())
+        return 2.0 * common / total >= self.cutoff
+
+    def first_match(self, text):
+        """Номер первого кандидата с коэффициентом сходства не ниже порога"""
+        if not text:
+            # Сходство двух пустых строк равно 1
+            return next((i for i, c in enumerate(self.candidates) if not c), None)
+
+        candidates = set(self._short)
+        for gram in self._grams(text):
+            candidates.update(self._postings.get(gram, ()))
+
+        text_counts = Counter(text)
+        matcher = SequenceMatcher()
+        matcher.set_seq2(text)
+
+        def matches(i):
+            if not self._passes_bounds(text, text_counts, i):
+                return False
+            matcher.set_seq1(self.candidates[i])
+            return matcher.ratio() >= self.cutoff
+
+        found = next((i for i in sorted(candidates) if matches(i)), None)
+        limit = len(self.candidates) if found is None else found
+        return next((i for i in range(limit) if i not in candidates and matches(i)), found)
@@ -0,0 +1,104 @@
+import re
+
+from .morphology import get_morphology
+
+
+class LabelIndex:
+    """Индекс русскоязычных меток: поверхностная форма и лемма -> сущности
+
+    Сущности хранятся под компактными целочисленными идентификаторами.
+    Каждая метка попадает в индекс дважды: в нормализованном виде и в виде
+    леммы, поэтому «квадратные матрицы» и «квадратная матрица» находят одну
+    сущность. Коллизии разрешаются при построении: по каждому ключу хранится
+    кортеж идентификаторов, где точные совпадения идут раньше лемматических.
+    """
+
+    def __init__(self):
+        self.uris = []  # идентификатор -> URI
+        self._ids = {}  # URI -> идентификатор
+        self._surface = {}  # нормализованная метка -> [идентификаторы]
+        self._lemma = {}  # лемма метки -> [идентификаторы]
+        self._keys = {}  # ключ -> кортеж идентификаторов, точные первыми
+
+    @staticmethod
+    def normalize(label):
+        """Нормализует метку для поиска"""
+        return re.sub(r'[^\w\s]', '', label.lower()).strip()
+
+    def __len__(self):
+        return len(self.uris)
+
+    def _entity_id(self, uri):
+        entity_id = self._ids.get(uri)
+        if entity_id is None:
+            entity_id = self._ids[uri] = len(self.uris)
+            self.uris.append(uri)
+        return entity_id
+
+    @classmethod
+    def keys(cls, label):
+        """Ключи метки в индексе: (нормализованная форма, лемма)"""
+        surface = cls.normalize(label)
+        return surface, get_morphology().lemmatize(surface)
+
+    def add(self, uri, label):
+        """Добавляет метку сущности под поверхностным и лемматическим ключами"""
+        self.add_keys(uri, *self.keys(label))
+
+    def add_keys(self, uri, surface, lemma):
+        """Добавляет метку с готовыми ключами: лемматизация выполнена заранее"""
+        entity_id = self._entity_id(uri)
+        for table, key in ((self._surface, surface), (self._lemma, lemma)):
+            ids = table.setdefault(key, [])
+            if entity_id not in ids:
+                ids.append(entity_id)
+        self._merge(surface)
+        self._merge(lemma)
+
+    def _merge(self, key):
+        ids = list(self._surface.get(key, ()))
+        ids.extend(i for i in self._lemma.get(key, ()) if i not in ids)
+        self._keys[key] = tuple(ids)
+
+    def lookup(self, text):
+        """Идентификаторы сущностей для текста; лемматизация только при промахе"""
+        key = self.normalize(text)
+        ids = self._keys.get(key)
+        if ids is None:
+            ids = self._keys.get(get_morphology().lemmatize(key), ())
+        return ids
+
+    def find_id(self, text):
+        """Идентификатор наиболее подходящей сущности или None"""
+        ids = self.lookup(text)
+        return ids[0] if ids else None
+
+    def id_of(self, uri):
+        return self._ids.get(uri)
+
+    def find(self, text):
+        """URI наиболее подходящей сущности или None"""
+        ids = self.lookup(text)
+        return self.uris[ids[0]] if ids else None
+
+    def labels(self):
+        """Нормализованные поверхностные формы меток"""
+        return self._surface.keys()
+
+    def items(self):
+        """Пары (нормализованная метка, [URI])"""
+        for key, ids in self._surface.items():
+            yield key, [self.uris[i] for i in ids]
+
+    def collisions(self):
+        """Ключи, под которыми записано больше одной сущности"""
+        return {key: ids for key, ids in self._keys.items() if len(ids) > 1}
+
+    def stats(self):
+        return {
+            'entities': len(self.uris),
+            'surface_keys': len(self._surface),
+            'lemma_keys': len(self._lemma),
+            'keys': len(self._keys),
+            'collisions': sum(1 for ids in self._keys.values() if len(ids) > 1),
+        }
@@ -0,0 +1,257 @@
+from bisect import bisect_left
+import threading
+import time
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Счетчик с метками в формате Prometheus"""
+    TYPE = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+
+class Histogram:
+    """Гистограмма с накопительными корзинами в формате Prometheus"""
+    TYPE = 'histogram'
+    # Секунды: от 100 мкс (этапы без сети) до 10 с (Wikidata за пределами бюджета)
+    DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                       0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, name, documentation, labelnames=(), buckets=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets or self.DEFAULT_BUCKETS) + (float('inf'),)
+        # метки -> [счетчики по корзинам (не накопительные), сумма, число]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            items = sorted((labels, (list(s[0]), s[1], s[2])) for labels, s in self._series.items())
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = _format_labels(self.labelnames, labels, [('le', _format_value(bound))])
+                yield self.name + '_bucket', le, cumulative
+            yield self.name + '_sum', _format_labels(self.labelnames, labels), total
+            yield self.name + '_count', _format_labels(self.labelnames, labels), count
+
+    def quantile(self, q, match=None):
+        """Оценка квантиля по корзинам (как histogram_quantile в Prometheus)
+
+        match - функция от кортежа меток: какие ряды суммировать.
+        """
+        with self._lock:
+            counts = [0] * len(self.buckets)
+            for labels, series in self._series.items():
+                if match is None or match(labels):
+                    counts = [a + b for a, b in zip(counts, series[0])]
+        total = sum(counts)
+        if not total:
+            return None
+        rank = q * total
+        cumulative = 0
+        for i, bucket_count in enumerate(counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i]
+                if upper == float('inf'):
+                    return lower
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.buckets[-2]
+
+    def count(self, match=None):
+        with self._lock:
+            return sum(s[2] for labels, s in self._series.items() if match is None or match(labels))
+
+
+class Gauge:
+    """Значение, вычисляемое при каждом сборе метрик
+
+    callback возвращает число либо словарь {кортеж меток: число}.
+    """
+    TYPE = 'gauge'
+
+    def __init__(self, name, documentation, callback, labelnames=(), metric_type=None):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.labelnames = tuple(labelnames)
+        self.TYPE = metric_type or self.TYPE
+
+    def samples(self):
+        value = self.callback()
+        items = sorted(value.items()) if isinstance(value, dict) else [((), value)]
+        for labels, number in items:
+            yield self.name, _format_labels(self.labelnames, labels), number
+
+
+class MetricsRegistry:
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Текстовый формат экспозиции Prometheus"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.TYPE}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{labels} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+class StageTimer:
+    """Время этапов одного запроса; этапы не вкладываются друг в друга
+
+    Повторный этап (например, нормализация до и во время анализа)
+    суммируется.
+    """
+    __slots__ = ('started', 'stages', '_name', '_start')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self._name = None
+        self._start = 0.0
+
+    def stage(self, name):
+        self._name = name
+        return self
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.add(self._name, time.perf_counter() - self._start)
+        return False
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+class _NullTimer:
+    """Заглушка StageTimer для вызовов вне конвейера"""
+
+    def stage(self, name):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def add(self, name, seconds):
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+class QAMetrics:
+    """Метрики конвейера: запросы по обработчику и источнику ответа, время этапов"""
+    STAGES = ('normalize', 'match', 'lemmatize', 'cache', 'ontology', 'wikidata', 'enqueue', 'render')
+    SOURCES = ('ontology', 'wikidata', 'cache', 'none')
+
+    def __init__(self):
+        self.registry = MetricsRegistry()
+        self.requests = self.registry.register(Counter(
+            'qa_requests_total', 'Answered questions by handler and answer source',
+            ('handler', 'source'),
+        ))
+        self.request_duration = self.registry.register(Histogram(
+            'qa_request_duration_seconds', 'Time to answer a question',
+            ('handler', 'source'),
+        ))
+        self.stage_duration = self.registry.register(Histogram(
+            'qa_stage_duration_seconds', 'Time spent in a pipeline stage per question',
+            ('stage', 'handler'),
+        ))
+
+    def gauge(self, name, documentation, callback, labelnames=(), metric_type=None):
+        """Показатель компонента, читаемый при сборе метрик"""
+        return self.registry.register(Gauge(name, documentation, callback, labelnames, metric_type))
+
+    def observe_request(self, handler, source, timer):
+        self.requests.inc(handler, source)
+        self.request_duration.observe(timer.elapsed(), handler, source)
+        for stage, seconds in timer.stages.items():
+            self.stage_duration.observe(seconds, stage, handler)
+
+    def render(self):
+        return self.registry.render()
+
+    def stage_summary(self):
+        """p50/p99 этапов по всем обработчикам, мс - для /stats"""
+        summary = {}
+        for stage in self.STAGES:
+            def match(labels, stage=stage):
+                return labels[0] == stage
+            count = self.stage_duration.count(match)
+            if not count:
+                continue
+            summary[stage] = {
+                'count': count,
+                'p50_ms': round(self.stage_duration.quantile(0.5, match) * 1000, 3),
+                'p99_ms': round(self.stage_duration.quantile(0.99, match) * 1000, 3),
+            }
+        return summary
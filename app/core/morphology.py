@@ -0,0 +1,82 @@
+from functools import lru_cache
+import logging
+import threading
+
+import pymorphy2
+
+
+class MorphologyService:
+    """Общий морфологический анализатор с кэшем разборов и падежных форм"""
+    PARSE_CACHE_SIZE = 20000
+    FORMS_CACHE_SIZE = 10000
+    CASES = ('nomn', 'gent', 'datv', 'accs', 'ablt', 'loct')
+
+    def __init__(self, parse_cache_size=None, forms_cache_size=None):
+        self.logger = logging.getLogger(__name__)
+        self.morph = pymorphy2.MorphAnalyzer()
+        self._parse = lru_cache(maxsize=parse_cache_size or self.PARSE_CACHE_SIZE)(self._parse_word)
+        self._forms = lru_cache(maxsize=forms_cache_size or self.FORMS_CACHE_SIZE)(self._inflect_phrase)
+        self.logger.info("MorphologyService initialized")
+
+    def _parse_word(self, word):
+        return self.morph.parse(word)[0]
+
+    def _inflect_phrase(self, phrase):
+        # Фраза разбирается целиком, как одно слово; каждая форма строится один раз
+        parsed = self._parse(phrase)
+        forms = {}
+        for case in self.CASES:
+            inflected = parsed.inflect({case})
+            forms[case] = inflected.word if inflected else phrase
+        return forms
+
+    def parse(self, word):
+        """Наиболее вероятный разбор слова"""
+        return self._parse(word)
+
+    def normal_form(self, word):
+        return self._parse(word).normal_form
+
+    def lemmatize(self, phrase):
+        """Лемматизация фразы с сохранением порядка слов"""
+        return ' '.join(self.normal_form(t) for t in phrase.split())
+
+    def case_forms(self, phrase):
+        """Падежные формы фразы: {'nomn': ..., 'gent': ..., ...}"""
+        return dict(self._forms(phrase))
+
+    def warm_up(self, labels):
+        """Заполняет кэши разборами слов меток и их падежными формами"""
+        count = 0
+        for label in labels:
+            self.lemmatize(label)
+            self._forms(label)
+            count += 1
+        self.logger.info(f"Morphology cache warmed with {count} labels")
+
+    def stats(self):
+        result = {}
+        for name, cached in (('parse', self._parse), ('forms', self._forms)):
+            info = cached.cache_info()
+            lookups = info.hits + info.misses
+            result[name] = {
+                'hits': info.hits,
+                'misses': info.misses,
+                'size': info.currsize,
+                'max_size': info.maxsize,
+                'hit_rate': info.hits / lookups if lookups else 0.0,
+            }
+        return result
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_morphology():
+    """Единственный на процесс экземпляр MorphologyService"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = MorphologyService()
+        return _shared
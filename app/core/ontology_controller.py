@@ -1,7 +1,39 @@
 from rdflib import Graph, Literal, URIRef, Namespace
 from rdflib.namespace import RDFS, DCTERMS, RDF, OWL, XSD
+from concurrent.futures import ProcessPoolExecutor
 import logging
+import multiprocessing
+import os
 import re
+import threading
+import time
+
+from .hierarchy_index import HierarchyIndex
+from .entity_table import EntityTable
+from .label_index import LabelIndex
+from .morphology import get_morphology
+from .ontology_snapshot import OntologySnapshot
+from .search_index import SearchIndex
+
+# Состояние параллельной сборки: задается до fork и читается воркерами пула
+# (контроллер с разобранным графом, метки и URI сущностей в порядке индекса)
+_build_state = None
+
+
+def _label_keys(start, stop):
+    """Поверхностные ключи и леммы меток [start, stop)"""
+    morphology = get_morphology()
+    keys = []
+    for _, label in _build_state[1][start:stop]:
+        surface = LabelIndex.normalize(label)
+        keys.append((surface, morphology.lemmatize(surface)))
+    return keys
+
+
+def _entity_rows(start, stop):
+    """Скомпилированные строки атрибутов сущностей с номерами [start, stop)"""
+    controller, _, uris = _build_state
+    return [controller._compile_entity(uri) for uri in uris[start:stop]]
 
 
 class OntologyController:
@@ -28,46 +60,144 @@ class OntologyController:
         'superclass': RDFS.subClassOf  # Обратное отношение
     }
 
-    def __init__(self, ontology_path):
-        self.graph = Graph()
-        self.ns = self.graph.namespace_manager
-        self.ns.bind('omp2', self.NS_OMP)
-        self.ns.bind('dcterms', DCTERMS)
-        self.ns.bind('owl', OWL)
+    # Предикаты, которые нужны методам доступа; только они попадают в снимок
+    SNAPSHOT_PREDICATES = set(PREDICATES.values()) | {
+        RDFS.comment, RDF.type, NS_OMP.hasImageDescription
+    }
+
+    # Столбцы скомпилированной таблицы атрибутов сущностей
+    ENTITY_FIELDS = (
+        'labels', 'subclasses', 'superclasses', 'definition', 'steps', 'applications', 'authors',
+        'complexity', 'formula', 'notation', 'tex', 'etymology', 'value', 'examples', 'history',
+        'optimizations', 'limitations', 'image', 'image_description',
+    )
+
+    BUILD_CHUNK = 250  # Меток или сущностей в одной задаче параллельной сборки
+
+    def __init__(self, ontology_path, use_snapshot=True, build_workers=None):
+        """build_workers - процессов для сборки индексов без снимка (1 - без пула)"""
+        self.ontology_path = ontology_path
+        self.snapshot = OntologySnapshot(ontology_path) if use_snapshot else None
+        self.build_workers = build_workers or min(8, os.cpu_count() or 1)
+        self.load_timings = {}
 
         # Кэш для ускорения поиска
-        self.label_index = {}
+        self.label_index = LabelIndex()
+        self.entities = EntityTable(self.ENTITY_FIELDS)
         self.entity_cache = {}
+        # Вторичные индексы строятся при первом обращении или build_secondary_indexes()
+        self._search_index = None
+        self._hierarchy = None
+        # Граф, индекс меток и таблица меняются только под этой блокировкой (add_triples);
+        # обходы этих структур (сборка вторичных индексов, get_all_classes) идут под ней же
+        self._index_lock = threading.RLock()
+        self._change_listeners = []
 
         try:
-            self.graph.parse(ontology_path)
-            self._build_label_index()
+            started = time.perf_counter()
+            if self._load_snapshot():
+                self.load_timings['snapshot'] = time.perf_counter() - started
+            else:
+                self.graph = Graph()
+                self.graph.parse(ontology_path)
+                self.load_timings['parse'] = time.perf_counter() - started
+                started = time.perf_counter()
+                if self.build_workers > 1 and 'fork' in multiprocessing.get_all_start_methods():
+                    self._build_parallel()
+                else:
+                    self._build_label_index()
+                    self._build_entity_table()
+                self.load_timings['indexes'] = time.perf_counter() - started
+                started = time.perf_counter()
+                self._save_snapshot()
+                self.load_timings['save_snapshot'] = time.perf_counter() - started
+            self._bind_namespaces()
             logging.info(f"Loaded ontology with {len(self.graph)} triples")
         except Exception as e:
             logging.error(f"Error loading ontology: {str(e)}")
             raise
 
+    def _bind_namespaces(self):
+        self.ns = self.graph.namespace_manager
+        self.ns.bind('omp2', self.NS_OMP)
+        self.ns.bind('dcterms', DCTERMS)
+        self.ns.bind('owl', OWL)
+
+    def _load_snapshot(self):
+        """Загружает граф и индекс меток из бинарного снимка"""
+        if not self.snapshot:
+            return False
+        payload = self.snapshot.load()
+        if payload is None:
+            return False
+        self.graph = payload['graph']
+        self.label_index = payload['label_index']
+        self.entities = payload['entities']
+        return True
+
+    def _save_snapshot(self):
+        """Сохраняет в снимок только используемые триплеты, индекс меток и таблицу атрибутов"""
+        if not self.snapshot:
+            return
+        graph = Graph()
+        for triple in self.graph:
+            if triple[1] in self.SNAPSHOT_PREDICATES:
+                graph.add(triple)
+        self.snapshot.save({'graph': graph, 'label_index': self.label_index, 'entities': self.entities})
+
     def _build_label_index(self):
-        """Создает индекс русскоязычных меток для быстрого поиска"""
-        for s in self.graph.subjects(RDFS.label, None):
-            labels = list(self.graph.objects(s, RDFS.label))
-            ru_labels = [str(l) for l in labels
-                         if isinstance(l, Literal) and l.language == 'ru']
-
-            for label in ru_labels:
-                norm_label = self._normalize_label(label)
-                if norm_label not in self.label_index:
-                    self.label_index[norm_label] = []
-                self.label_index[norm_label].append(s)
+        """Создает индекс русскоязычных меток и их лемм для быстрого поиска"""
+        for s, label in self.graph.subject_objects(RDFS.label):
+            if isinstance(label, Literal) and label.language == 'ru':
+                self.label_index.add(s, str(label))
+        logging.info(f"Label index built: {self.label_index.stats()}")
+
+    def add_triples(self, triples):
+        """Добавляет триплеты в загруженный граф и обновляет индексы и таблицу атрибутов
+
+        Пакет применяется целиком под блокировкой индексов: обходы графа и
+        индекса меток в других потоках видят состояние до или после пакета.
+        """
+        touched = set()
+        with self._index_lock:
+            for s, p, o in triples:
+                if (s, p, o) in self.graph:
+                    continue
+                self.graph.add((s, p, o))
+                touched.add(s)
+                if p == RDFS.label and isinstance(o, Literal) and o.language == 'ru':
+                    self.label_index.add(s, str(o))
+                    self._search_index = None
+                elif p == RDFS.subClassOf:
+                    touched.add(o)
+                    self._hierarchy = None
+
+            # Перекомпиляция строк затронутых сущностей
+            for uri in touched:
+                entity_id = self.label_index.id_of(uri)
+                if entity_id is not None:
+                    self.entities.set_row(entity_id, self._compile_entity(uri))
+
+        if touched:
+            for listener in self._change_listeners:
+                listener(touched)
+
+    def add_change_listener(self, callback):
+        """Регистрирует callback(uris), вызываемый после изменения сущностей"""
+        self._change_listeners.append(callback)
+
+    def entity_labels(self, uri):
+        """Русскоязычные метки сущности из таблицы атрибутов"""
+        entity_id = self.label_index.id_of(uri)
+        return self.entities.get('labels', entity_id, []) if entity_id is not None else []
 
     def _normalize_label(self, label):
         """Нормализует метку для поиска"""
-        return re.sub(r'[^\w\s]', '', label.lower()).strip()
+        return LabelIndex.normalize(label)
 
     def _find_uri_by_label(self, label_text):
-        """Находит URI по русскоязычной метке с использованием индекса"""
-        norm_label = self._normalize_label(label_text)
-        return self.label_index.get(norm_label, [None])[0]
+        """Находит URI по русскоязычной метке или ее лемме с использованием индекса"""
+        return self.label_index.find(label_text)
 
     def _get_ru_literals(self, subject, predicate):
         """Возвращает все русскоязычные литералы для предиката"""
@@ -77,182 +207,219 @@ class OntologyController:
         ]
 
     # Основные методы доступа к данным
-    def get_subclasses(self, class_name):
-        class_uri = self._find_uri_by_label(class_name)
-        if not class_uri:
-            return []
+    def _entity_field(self, entity_name, field, default=None):
+        """Значение из скомпилированной таблицы атрибутов по метке сущности"""
+        entity_id = self.label_index.find_id(entity_name)
+        if entity_id is None:
+            return default
+        return self.entities.get(field, entity_id, default)
 
-        subclasses = []
-        for s in self.graph.subjects(RDFS.subClassOf, class_uri):
-            label = self._get_ru_label(s)
-            if label:
-                subclasses.append(label)
-        return subclasses
+    def get_subclasses(self, class_name):
+        return self._entity_field(class_name, 'subclasses', [])
 
     def get_superclasses(self, class_name):
+        return self._entity_field(class_name, 'superclasses', [])
+
+    @property
+    def hierarchy(self):
+        """Замыкание иерархии классов; перестраивается после изменения subClassOf"""
+        hierarchy = self._hierarchy
+        if hierarchy is None:
+            with self._index_lock:
+                if self._hierarchy is None:
+                    self._hierarchy = HierarchyIndex(
+                        (s, o) for s, o in self.graph.subject_objects(RDFS.subClassOf) if isinstance(o, URIRef)
+                    )
+                    logging.info(f"Hierarchy index built: {self._hierarchy.stats()}")
+                hierarchy = self._hierarchy
+        return hierarchy
+
+    def _labels_of(self, uris):
+        labels = (self._get_ru_label(uri) for uri in uris)
+        return [label for label in labels if label]
+
+    def get_ancestors(self, class_name, max_depth=None):
         class_uri = self._find_uri_by_label(class_name)
         if not class_uri:
             return []
+        return self._labels_of(self.hierarchy.get_ancestors(class_uri, max_depth))
 
-        superclasses = []
-        for o in self.graph.objects(class_uri, RDFS.subClassOf):
-            label = self._get_ru_label(o)
-            if label:
-                superclasses.append(label)
-        return superclasses
-
-    def get_synonyms(self, term):
-        term_uri = self._find_uri_by_label(term)
-        if not term_uri:
+    def get_descendants(self, class_name, max_depth=None):
+        class_uri = self._find_uri_by_label(class_name)
+        if not class_uri:
             return []
+        return self._labels_of(self.hierarchy.get_descendants(class_uri, max_depth))
 
-        synonyms = []
-        for label in self.graph.objects(term_uri, RDFS.label):
-            if (isinstance(label, Literal) and label.language == 'ru' and
-                    self._normalize_label(str(label)) != self._normalize_label(term)):
-                synonyms.append(str(label))
-        return synonyms
-
-    def get_definition(self, entity_name):
-        uri = self._find_uri_by_label(entity_name)
-        if not uri:
+    def is_subclass_of(self, class_name, ancestor_name):
+        """True/False, если оба понятия есть в онтологии, иначе None"""
+        class_uri = self._find_uri_by_label(class_name)
+        ancestor_uri = self._find_uri_by_label(ancestor_name)
+        if not class_uri or not ancestor_uri:
             return None
+        return self.hierarchy.is_a(class_uri, ancestor_uri)
 
-        definitions = self._get_ru_literals(uri, self.PREDICATES['definition'])
-        if definitions:
-            return definitions[0]
+    def get_common_ancestors(self, first_name, second_name):
+        first_uri = self._find_uri_by_label(first_name)
+        second_uri = self._find_uri_by_label(second_name)
+        if not first_uri or not second_uri:
+            return []
+        return self._labels_of(self.hierarchy.lowest_common_ancestors(first_uri, second_uri))
 
+    def get_synonyms(self, term):
+        """Метки сущности, кроме совпадающих с запросом по ключу индекса меток
 
-        comment = self._get_ru_comment(uri)
-        if comment:
-            return re.split(r'[.!?]', comment)[0].strip()
+        Запрос и метка сравниваются и по нормализованной форме, и по лемме:
+        для словоформы «матрицы» метка «Матрица» - не синоним.
+        """
+        term_keys = set(LabelIndex.keys(term))
+        return [
+            label for label in self._entity_field(term, 'labels', [])
+            if term_keys.isdisjoint(LabelIndex.keys(label))
+        ]
 
-        return None
+    def get_definition(self, entity_name):
+        return self._entity_field(entity_name, 'definition')
 
     def get_algorithm_steps(self, method_name):
-        uri = self._find_uri_by_label(method_name)
-        if not uri:
-            return []
-
-        steps = []
-        for step in self._get_ru_literals(uri, self.PREDICATES['algorithm']):
-            clean_step = re.sub(r'<!\[CDATA\[(.*?)\]\]>', r'\1', step, flags=re.DOTALL)
-            clean_step = re.sub(r'<[^>]+>', '', clean_step)
-            steps.append(clean_step.strip())
-        return steps
+        return self._entity_field(method_name, 'steps', [])
 
     def get_applications(self, entity_name):
-        uri = self._find_uri_by_label(entity_name)
-        if not uri:
-            return []
-
-        return self._get_ru_literals(uri, self.PREDICATES['application'])
+        return self._entity_field(entity_name, 'applications', [])
 
     def get_authors(self, method_name):
-        uri = self._find_uri_by_label(method_name)
-        if not uri:
-            return []
-
-        return self._get_ru_literals(uri, self.PREDICATES['author'])
+        return self._entity_field(method_name, 'authors', [])
 
     def get_complexity(self, method_name):
-        uri = self._find_uri_by_label(method_name)
-        if not uri:
-            return None
-
-        complexities = self._get_ru_literals(uri, self.PREDICATES['complexity'])
-        return complexities[0] if complexities else None
+        return self._entity_field(method_name, 'complexity')
 
     def get_formula(self, entity_name):
-        uri = self._find_uri_by_label(entity_name)
-        if not uri:
-            return None
-
-        formulas = self._get_ru_literals(uri, self.PREDICATES['formula'])
-        return formulas[0] if formulas else None
+        return self._entity_field(entity_name, 'formula')
 
     def get_notation(self, entity_name):
-        uri = self._find_uri_by_label(entity_name)
-        if not uri:
-            return None
-
-        notations = self._get_ru_literals(uri, self.PREDICATES['notation'])
-        return notations[0] if notations else None
+        return self._entity_field(entity_name, 'notation')
 
     def get_tex_command(self, entity_name):
-        uri = self._find_uri_by_label(entity_name)
-        if not uri:
-            return None
-
-        commands = self._get_ru_literals(uri, self.PREDICATES['tex'])
-        return commands[0] if commands else None
+        return self._entity_field(entity_name, 'tex')
 
     def get_etymology(self, entity_name):
-        uri = self._find_uri_by_label(entity_name)
-        if not uri:
-            return None
-
-        etymologies = self._get_ru_literals(uri, self.PREDICATES['etymology'])
-        return etymologies[0] if etymologies else None
+        return self._entity_field(entity_name, 'etymology')
 
     def get_numeric_value(self, entity_name):
-        uri = self._find_uri_by_label(entity_name)
-        if not uri:
-            return None
-
-        values = [
-            str(lit) for lit in self.graph.objects(uri, self.PREDICATES['value'])
-            if isinstance(lit, Literal) and lit.datatype in (XSD.decimal, XSD.float, XSD.double)
-        ]
-        return values[0] if values else None
+        return self._entity_field(entity_name, 'value')
 
     def get_examples(self, entity_name):
-        uri = self._find_uri_by_label(entity_name)
-        if not uri:
-            return []
-
-        return self._get_ru_literals(uri, self.PREDICATES['example'])
+        return self._entity_field(entity_name, 'examples', [])
 
     def get_history(self, entity_name):
-        uri = self._find_uri_by_label(entity_name)
-        if not uri:
-            return None
-
-        histories = self._get_ru_literals(uri, self.PREDICATES['history'])
-        return histories[0] if histories else None
+        return self._entity_field(entity_name, 'history')
 
     def get_optimizations(self, method_name):
-        uri = self._find_uri_by_label(method_name)
-        if not uri:
-            return []
-
-        return self._get_ru_literals(uri, self.PREDICATES['optimization'])
+        return self._entity_field(method_name, 'optimizations', [])
 
     def get_limitations(self, method_name):
-        uri = self._find_uri_by_label(method_name)
-        if not uri:
-            return []
-
-        return self._get_ru_literals(uri, self.PREDICATES['limitation'])
+        return self._entity_field(method_name, 'limitations', [])
 
     def get_visualization(self, entity_name):
-        uri = self._find_uri_by_label(entity_name)
-        if not uri:
+        image = self._entity_field(entity_name, 'image')
+        if not image:
             return None, None
+        return image, self._entity_field(entity_name, 'image_description', "")
+
+    def _build_parallel(self):
+        """Индекс меток и таблица атрибутов в пуле процессов по пачкам
+
+        Воркеры порождаются через fork после разбора RDF и читают граф и
+        словари морфологии из общих страниц. Лемматизация меток и компиляция
+        строк сущностей идут одновременно; результаты сливаются в порядке
+        обхода графа, поэтому номера сущностей те же, что при
+        последовательной сборке.
+        """
+        global _build_state
+        labels = [
+            (s, str(label)) for s, label in self.graph.subject_objects(RDFS.label)
+            if isinstance(label, Literal) and label.language == 'ru'
+        ]
+        # Номер сущности - порядок первой метки, как в LabelIndex
+        uris = list(dict.fromkeys(s for s, _ in labels))
+        get_morphology()  # словари загружаются один раз, до fork
+        chunk = self.BUILD_CHUNK
+        _build_state = (self, labels, uris)
+        try:
+            context = multiprocessing.get_context('fork')
+            with ProcessPoolExecutor(self.build_workers, mp_context=context) as pool:
+                label_chunks = [(start, pool.submit(_label_keys, start, start + chunk))
+                                for start in range(0, len(labels), chunk)]
+                row_chunks = [(start, pool.submit(_entity_rows, start, start + chunk))
+                              for start in range(0, len(uris), chunk)]
+                for start, future in label_chunks:
+                    for (uri, _), (surface, lemma) in zip(labels[start:start + chunk], future.result()):
+                        self.label_index.add_keys(uri, surface, lemma)
+                self.entities = EntityTable(self.ENTITY_FIELDS)
+                for start, future in row_chunks:
+                    for entity_id, row in enumerate(future.result(), start):
+                        self.entities.set_row(entity_id, row)
+        finally:
+            _build_state = None
+        logging.info(f"Label index and entity table built by {self.build_workers} processes: "
+                     f"{self.label_index.stats()}")
+
+    # Компиляция атрибутов сущностей из графа
+    def _build_entity_table(self):
+        """Компилирует атрибуты всех сущностей с метками в таблицу"""
+        self.entities = EntityTable(self.ENTITY_FIELDS)
+        for entity_id, uri in enumerate(self.label_index.uris):
+            self.entities.set_row(entity_id, self._compile_entity(uri))
+        logging.info(f"Entity table built: {len(self.entities)} entities")
+
+    def _compile_entity(self, uri):
+        """Атрибуты сущности из графа: фильтр по языку, очистка, первые значения"""
+        def first(key):
+            literals = self._get_ru_literals(uri, self.PREDICATES[key])
+            return literals[0] if literals else None
+
+        definition = first('definition')
+        if not definition:
+            comment = self._get_ru_comment(uri)
+            if comment:
+                definition = re.split(r'[.!?]', comment)[0].strip() or None
+
+        steps = []
+        for step in self._get_ru_literals(uri, self.PREDICATES['algorithm']):
+            clean_step = re.sub(r'<!\[CDATA\[(.*?)\]\]>', r'\1', step, flags=re.DOTALL)
+            clean_step = re.sub(r'<[^>]+>', '', clean_step)
+            steps.append(clean_step.strip())
 
+        values = [
+            str(lit) for lit in self.graph.objects(uri, self.PREDICATES['value'])
+            if isinstance(lit, Literal) and lit.datatype in (XSD.decimal, XSD.float, XSD.double)
+        ]
         images = [
             str(lit) for lit in self.graph.objects(uri, self.PREDICATES['image'])
             if isinstance(lit, Literal) and lit.datatype == XSD.anyURI
         ]
-        if not images:
-            return None, None
-
-        description = next((
-            str(lit) for lit in self.graph.objects(uri, self.NS_OMP.hasImageDescription)
-            if isinstance(lit, Literal) and lit.language == 'ru'
-        ), "")
-
-        return images[0], description
+        descriptions = self._get_ru_literals(uri, self.NS_OMP.hasImageDescription) if images else []
+
+        return {
+            'labels': self._get_ru_literals(uri, RDFS.label),
+            'subclasses': self._labels_of(self.graph.subjects(RDFS.subClassOf, uri)),
+            'superclasses': self._labels_of(self.graph.objects(uri, RDFS.subClassOf)),
+            'definition': definition,
+            'steps': steps,
+            'applications': self._get_ru_literals(uri, self.PREDICATES['application']),
+            'authors': self._get_ru_literals(uri, self.PREDICATES['author']),
+            'complexity': first('complexity'),
+            'formula': first('formula'),
+            'notation': first('notation'),
+            'tex': first('tex'),
+            'etymology': first('etymology'),
+            'value': values[0] if values else None,
+            'examples': self._get_ru_literals(uri, self.PREDICATES['example']),
+            'history': first('history'),
+            'optimizations': self._get_ru_literals(uri, self.PREDICATES['optimization']),
+            'limitations': self._get_ru_literals(uri, self.PREDICATES['limitation']),
+            'image': images[0] if images else None,
+            'image_description': descriptions[0] if descriptions else None,
+        }
 
     def _get_ru_label(self, uri):
         labels = list(self.graph.objects(uri, RDFS.label))
@@ -263,25 +430,45 @@ class OntologyController:
         return next((str(c) for c in comments if isinstance(c, Literal) and c.language == 'ru'), None)
 
     def get_all_classes(self):
-        return [{
-            'uri': str(s),
-            'label': self._get_ru_label(s),
-            'comment': self._get_ru_comment(s)
-        } for s in self.graph.subjects(RDF.type, OWL.Class) if self._get_ru_label(s)]
-
-    def search_entities(self, search_term):
-        search_term = search_term.lower()
-        results = []
+        with self._index_lock:
+            return [{
+                'uri': str(s),
+                'label': self._get_ru_label(s),
+                'comment': self._get_ru_comment(s)
+            } for s in self.graph.subjects(RDF.type, OWL.Class) if self._get_ru_label(s)]
+
+    @property
+    def search_index(self):
+        """Поисковый индекс меток; строится при первом обращении"""
+        search_index = self._search_index
+        if search_index is None:
+            with self._index_lock:
+                if self._search_index is None:
+                    self._search_index = SearchIndex(self._search_entries())
+                search_index = self._search_index
+        return search_index
+
+    def build_secondary_indexes(self):
+        """Строит иерархию и поисковый индекс заранее, а не на первом запросе
+
+        Основные методы доступа работают и без них, поэтому сервер может
+        принимать запросы, пока они строятся в фоне.
+        """
+        started = time.perf_counter()
+        self.hierarchy
+        self.load_timings['hierarchy'] = time.perf_counter() - started
+        started = time.perf_counter()
+        self.search_index
+        self.load_timings['search_index'] = time.perf_counter() - started
+
+    def _search_entries(self):
         for norm_label, uris in self.label_index.items():
-            if search_term in norm_label:
-                for uri in uris:
-                    label = self._get_ru_label(uri)
-                    if label:
-                        results.append({
-                            'uri': str(uri),
-                            'label': label,
-                            'type': 'Class' if (uri, RDF.type, OWL.Class) in self.graph else 'Property'
-                        })
-        return results
-
-
+            for uri in uris:
+                label = self._get_ru_label(uri)
+                if label:
+                    entity_type = 'Class' if (uri, RDF.type, OWL.Class) in self.graph else 'Property'
+                    yield norm_label, str(uri), label, entity_type
+
+    def search_entities(self, search_term, limit=None, prefix=False):
+        """Поиск сущностей по подстроке метки или, в режиме prefix, по началу слова"""
+        return self.search_index.search(self._normalize_label(search_term), limit, prefix)
@@ -1,40 +1,288 @@
 # ontology_enrichment.py
 from rdflib import Graph, URIRef, Literal, RDFS, RDF, Namespace
+from contextlib import contextmanager
 import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: журнал пишет только один процесс
+    fcntl = None
+
+from .ontology_controller import OntologyController
 
 
 class OntologyEnrichment:
     NS_OMP = Namespace("http://ontomathpro.org/omp2#")
     NS_RDFS = RDFS
 
-    def __init__(self, ontology_path):
+    # Обработчик -> ключ OntologyController.PREDICATES для литеральных ответов
+    HANDLER_PREDICATES = {
+        'get_definition': 'definition',
+        'get_algorithm_steps': 'algorithm',
+        'get_applications': 'application',
+        'get_authors': 'author',
+        'get_complexity': 'complexity',
+        'get_formula': 'formula',
+        'get_notation': 'notation',
+        'get_tex_command': 'tex',
+        'get_etymology': 'etymology',
+        'get_examples': 'example',
+        'get_history': 'history',
+        'get_optimizations': 'optimization',
+        'get_limitations': 'limitation',
+        'get_synonyms': 'synonym',
+    }
+    DELTA_SUFFIX = '.delta.nt'
+    # Символы, недопустимые в URI: с ними N-Triples не сериализуется и теряется весь пакет
+    URI_UNSAFE = re.compile(r'[\s<>"{}|\\^`]')
+    COMPACT_THRESHOLD = 500  # Триплетов в журнале до слияния с основным файлом
+
+    def __init__(self, ontology_path, ontology=None, compact_threshold=None, auto_compact=True):
         self.ontology_path = ontology_path
+        self.delta_path = ontology_path + self.DELTA_SUFFIX
+        self.ontology = ontology
+        self.compact_threshold = compact_threshold or self.COMPACT_THRESHOLD
+        # Процессы с общим журналом не сливают его сами: слияние делает главный процесс
+        self.auto_compact = auto_compact
         self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._delta_size = 0
+        # Прочитанная часть журнала: другие процессы дописывают его после этой позиции
+        self._delta_offset = 0
+        self._delta_inode = None
+        self._synced = 0
+
+        # Восстановление изменений, не попавших в основной файл
+        delta = self._read_new()
+        if delta and self.ontology is not None:
+            self.ontology.add_triples(delta)
+            self.logger.info(f"Replayed {len(delta)} enrichment triples from {self.delta_path}")
+
+    def find_subject(self, handler_data):
+        """URI сущности онтологии, о которой вопрос, или None, если ее нет"""
+        if self.ontology is None:
+            return None
+        for text in (handler_data['focus_original'], handler_data['focus_lemma']):
+            uri = self.ontology.label_index.find(text)
+            if uri is not None:
+                return uri
+        return None
+
+    def build_triples(self, handler_data, data):
+        """Формирует триплеты обогащения для ответа Wikidata
+
+        Данные записываются к существующей сущности, если фокус вопроса
+        находится в индексе меток, иначе - к новой сущности omp:<лемма> с
+        меткой из вопроса.
+        """
+        entity_uri = self.find_subject(handler_data)
+        if entity_uri is not None:
+            triples = []
+        else:
+            entity_uri = self.NS_OMP[self.URI_UNSAFE.sub("_", handler_data['focus_lemma'])]
+            triples = [(entity_uri, RDFS.label, Literal(handler_data['focus_original'], "ru"))]
+
+        predicate_key = self.HANDLER_PREDICATES.get(handler_data['handler'])
+        if not predicate_key:
+            return triples
+        predicate = OntologyController.PREDICATES[predicate_key]
+        values = data if isinstance(data, list) else [data]
+        for value in values:
+            if isinstance(value, str) and value:
+                triples.append((entity_uri, predicate, Literal(value, "ru")))
+        return triples
 
     def enrich(self, handler_data, data):
         try:
-            graph = Graph()
-            graph.parse(self.ontology_path, format="xml")
-            graph.bind("omp", self.NS_OMP)
+            self.enrich_batch([(handler_data, data)])
+        except Exception as e:
+            self.logger.error(f"Ontology enrichment failed: {str(e)}")
+
+    def enrich_batch(self, items):
+        """Записывает пакет обогащений одной операцией над журналом"""
+        triples = []
+        for handler_data, data in items:
+            triples.extend(self.build_triples(handler_data, data))
+        foreign = self._append_delta(triples)
 
-            # Создание URI для новой сущности
-            focus_norm = handler_data['focus_lemma'].replace(" ", "_")
-            entity_uri = self.NS_OMP[focus_norm]
+        # Новые данные (и записанные другими процессами) сразу доступны в загруженной онтологии
+        if self.ontology is not None:
+            self.ontology.add_triples(foreign + triples)
+        self.logger.info(
+            f"Ontology enriched for {', '.join(h['focus_original'] for h, _ in items)}"
+        )
 
-            # Добавление метки
-            graph.add((entity_uri, RDFS.label, Literal(handler_data['focus_original'], "ru")))
+        if self.auto_compact and self._delta_size >= self.compact_threshold:
+            self.compact()
 
-            # Добавление данных в зависимости от типа
-            handler_type = handler_data['handler']
-            if handler_type == 'get_definition':
-                graph.add((entity_uri, self.NS_OMP.hasDefinition, Literal(data, "ru")))
-            elif handler_type == 'get_authors' and isinstance(data, list):
-                for author in data:
-                    graph.add((entity_uri, self.NS_OMP.hasAuthor, Literal(author, "ru")))
+    def sync(self):
+        """Применяет обогащения, дописанные в журнал другими процессами
 
+        Возвращает число новых триплетов.
+        """
+        if not os.path.exists(self.delta_path):
+            return 0
+        triples = self._read_new()
+        if triples and self.ontology is not None:
+            self.ontology.add_triples(triples)
+        return len(triples)
+
+    @contextmanager
+    def _open_delta(self, mode, exclusive=False):
+        """Журнал под блокировкой: дописывание целыми пакетами, чтение только целых строк"""
+        while True:
+            f = open(self.delta_path, mode)
+            if fcntl is None:
+                break
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            # Пока ждали блокировку, журнал могли слить и удалить
+            try:
+                if os.stat(self.delta_path).st_ino == os.fstat(f.fileno()).st_ino:
+                    break
+            except FileNotFoundError:
+                if 'a' not in mode:
+                    break
+            f.close()
+        try:
+            yield f
+        finally:
+            f.close()
 
-            # Сохранение обновленной онтологии
-            graph.serialize(destination=self.ontology_path, format="xml")
-            self.logger.info(f"Ontology enriched for {handler_data['focus_original']}")
+    def _read_tail(self, f):
+        """Триплеты после прочитанной позиции; вызывается под блокировкой журнала"""
+        stat = os.fstat(f.fileno())
+        if stat.st_ino != self._delta_inode or stat.st_size < self._delta_offset:
+            # Журнал слит с основным файлом и начат заново
+            self._delta_inode = stat.st_ino
+            self._delta_offset = 0
+            self._delta_size = 0
+        if stat.st_size == self._delta_offset:
+            return []
+
+        f.seek(self._delta_offset)
+        data = f.read()
+        self._delta_offset += len(data)
+        graph = Graph()
+        try:
+            graph.parse(data=data.decode('utf-8'), format="nt")
         except Exception as e:
-            self.logger.error(f"Ontology enrichment failed: {str(e)}")
\ No newline at end of file
+            self.logger.error(f"Failed to read enrichment log: {str(e)}")
+            return []
+        self._delta_size += len(graph)
+        self._synced += len(graph)
+        return list(graph)
+
+    def _read_new(self):
+        if not os.path.exists(self.delta_path):
+            return []
+        with self._lock, self._open_delta('rb') as f:
+            return self._read_tail(f)
+
+    def _append_delta(self, triples):
+        """Дописывает триплеты в журнал в формате N-Triples
+
+        Возвращает триплеты, дописанные другими процессами с прошлого чтения.
+        """
+        graph = Graph()
+        for triple in triples:
+            graph.add(triple)
+        data = graph.serialize(format="nt").encode('utf-8')
+        with self._lock, self._open_delta('a+b', exclusive=True) as f:
+            foreign = self._read_tail(f)
+            f.seek(0, os.SEEK_END)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+            self._delta_offset = f.tell()
+            self._delta_size += len(graph)
+        return foreign
+
+    def _read_delta(self):
+        if not os.path.exists(self.delta_path):
+            return []
+        graph = Graph()
+        try:
+            graph.parse(self.delta_path, format="nt")
+        except Exception as e:
+            self.logger.error(f"Failed to read enrichment log: {str(e)}")
+            return []
+        return list(graph)
+
+    def position(self):
+        """Текущий конец журнала: (inode, размер); (None, 0) - журнала нет"""
+        if not os.path.exists(self.delta_path):
+            return None, 0
+        with self._open_delta('rb') as f:
+            stat = os.fstat(f.fileno())
+        return stat.st_ino, stat.st_size
+
+    def subjects_since(self, position):
+        """URI сущностей, измененных в журнале после position
+
+        None - журнал с тех пор слит с основным файлом или начат заново,
+        и изменения по нему не восстановить.
+        """
+        inode, offset = position
+        if not os.path.exists(self.delta_path):
+            return set() if inode is None else None
+        with self._open_delta('rb') as f:
+            stat = os.fstat(f.fileno())
+            if inode is not None and (stat.st_ino != inode or stat.st_size < offset):
+                return None
+            f.seek(offset if inode is not None else 0)
+            data = f.read()
+        graph = Graph()
+        try:
+            graph.parse(data=data.decode('utf-8'), format="nt")
+        except Exception as e:
+            self.logger.error(f"Failed to read enrichment log: {str(e)}")
+            return None
+        return set(graph.subjects())
+
+    def needs_compaction(self):
+        return self._delta_size >= self.compact_threshold
+
+    def stats(self):
+        return {
+            'delta_triples': self._delta_size,
+            'delta_bytes': self._delta_offset,
+            'synced_triples': self._synced,
+            'auto_compact': self.auto_compact,
+        }
+
+    def compact(self):
+        """Переносит накопленные изменения в основной файл онтологии"""
+        if not os.path.exists(self.delta_path):
+            return
+        with self._lock, self._open_delta('rb', exclusive=True):
+            delta = self._read_delta()
+            if not delta:
+                return
+            tmp_path = None
+            try:
+                graph = Graph()
+                graph.parse(self.ontology_path, format="xml")
+                graph.bind("omp", self.NS_OMP)
+                for triple in delta:
+                    graph.add(triple)
+
+                directory = os.path.dirname(os.path.abspath(self.ontology_path))
+                fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+                os.close(fd)
+                shutil.copymode(self.ontology_path, tmp_path)
+                graph.serialize(destination=tmp_path, format="xml")
+                os.replace(tmp_path, self.ontology_path)
+                os.remove(self.delta_path)
+                self._delta_size = 0
+                self._delta_offset = 0
+                self._delta_inode = None
+                self.logger.info(f"Compacted {len(delta)} enrichment triples into {self.ontology_path}")
+            except Exception as e:
+                self.logger.error(f"Ontology compaction failed: {str(e)}")
+                if tmp_path and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
@@ -0,0 +1,78 @@
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+
+
+class OntologySnapshot:
+    """Бинарный снимок онтологии для быстрого холодного старта"""
+    FORMAT_VERSION = 3
+    SUFFIX = '.snapshot'
+
+    def __init__(self, ontology_path, snapshot_path=None):
+        self.ontology_path = ontology_path
+        self.snapshot_path = snapshot_path or ontology_path + self.SUFFIX
+        self.logger = logging.getLogger(__name__)
+
+    def _source_stat(self):
+        stat = os.stat(self.ontology_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _source_hash(self):
+        digest = hashlib.sha1()
+        with open(self.ontology_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def source_signature(self):
+        """Версия RDF-файла: время изменения, размер и SHA-1 содержимого"""
+        mtime_ns, size = self._source_stat()
+        return {'mtime_ns': mtime_ns, 'size': size, 'sha1': self._source_hash()}
+
+    def matches(self, signature):
+        """Проверяет, что signature снята с текущей версии RDF-файла"""
+        mtime_ns, size = self._source_stat()
+        if signature.get('size') != size:
+            return False
+        if signature.get('mtime_ns') == mtime_ns:
+            return True
+        # mtime мог измениться без изменения содержимого (checkout, копирование)
+        return signature.get('sha1') == self._source_hash()
+
+    def _is_fresh(self, header):
+        """Проверяет, что снимок построен из текущей версии RDF-файла"""
+        return header.get('version') == self.FORMAT_VERSION and self.matches(header)
+
+    def load(self):
+        """Возвращает данные снимка или None, если снимок отсутствует или устарел"""
+        if not os.path.exists(self.snapshot_path):
+            return None
+        try:
+            with open(self.snapshot_path, 'rb') as f:
+                header = pickle.load(f)
+                if not self._is_fresh(header):
+                    self.logger.info("Ontology snapshot is stale, rebuilding")
+                    return None
+                return pickle.load(f)
+        except Exception as e:
+            self.logger.warning(f"Failed to load ontology snapshot: {str(e)}")
+            return None
+
+    def save(self, payload):
+        """Атомарно записывает снимок рядом с RDF-файлом"""
+        header = {'version': self.FORMAT_VERSION, **self.source_signature()}
+        directory = os.path.dirname(os.path.abspath(self.snapshot_path))
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.snapshot_path)
+            self.logger.info(f"Ontology snapshot saved to {self.snapshot_path}")
+        except Exception as e:
+            self.logger.warning(f"Failed to save ontology snapshot: {str(e)}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
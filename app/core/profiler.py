@@ -0,0 +1,238 @@
+"""Профилирование отдельных вопросов конвейера
+
+Два режима, включаются независимо:
+- доля случайных вопросов (sample_rate) профилируется cProfile: точные
+  вызовы и время, но заметные накладные расходы на профилируемый вопрос;
+- вопросы дольше порога (slow_threshold) сохраняются со стеками,
+  собранными семплирующим профилировщиком. Заранее неизвестно, какой
+  вопрос окажется медленным, поэтому семплируются все: фоновый поток раз
+  в interval снимает стеки потоков, занятых этапами вопросов.
+
+Профилируется работа конвейера в потоках, где она выполняется (анализ,
+кэш, онтология, формирование ответа); ожидание Wikidata видно по
+времени этапа wikidata. Снимки пишет фоновый поток в каталог, где хранятся
+последние max_captures снимков: JSON с вопросом, временем этапов и
+стеками, для cProfile - еще файл .prof рядом. Сводку по каталогу строит
+app/profile_report.py.
+"""
+from collections import Counter
+import cProfile
+import json
+import logging
+import os
+import pstats
+import queue
+import random
+import sys
+import threading
+import time
+
+
+def frame_key(code):
+    """Функция в формате pstats: файл:строка(имя)"""
+    return f'{code.co_filename}:{code.co_firstlineno}({code.co_name})'
+
+
+class ProfileSession:
+    """Профиль одного вопроса; этапы могут выполняться в разных потоках, но по очереди"""
+    __slots__ = ('profiler', 'question', 'profile', 'samples', '_depth')
+
+    def __init__(self, profiler, question, profile=None):
+        self.profiler = profiler
+        self.question = question
+        self.profile = profile
+        self.samples = Counter()
+        self._depth = 0
+
+    def __enter__(self):
+        # Вложенный вход (формирование ответа внутри поиска) не перезапускает профиль
+        self._depth += 1
+        if self._depth == 1:
+            if self.profile is not None:
+                self.profile.enable()
+            else:
+                self.profiler._attach(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._depth -= 1
+        if self._depth == 0:
+            if self.profile is not None:
+                self.profile.disable()
+            else:
+                self.profiler._detach()
+        return False
+
+
+class _NullSession:
+    """Сессия для вопросов, которые не профилируются"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_SESSION = _NullSession()
+
+
+class QuestionProfiler:
+    MAX_CAPTURES = 200
+    INTERVAL = 0.005  # секунд между снимками стеков
+    QUEUE_SIZE = 100
+    MAX_DEPTH = 64
+
+    def __init__(self, directory, sample_rate=None, slow_threshold=None, max_captures=None, interval=None):
+        self.directory = directory
+        self.sample_rate = sample_rate or 0.0
+        self.slow_threshold = slow_threshold
+        self.max_captures = max_captures or self.MAX_CAPTURES
+        self.interval = interval or self.INTERVAL
+        self.enabled = self.sample_rate > 0 or self.slow_threshold is not None
+        self.logger = logging.getLogger(__name__)
+
+        self._random = random.Random()
+        # Идентификатор потока -> сессия, этап которой в нем выполняется
+        self._active = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(self.QUEUE_SIZE)
+        self._stop = threading.Event()
+        self._threads = []
+        self._seq = 0
+        self._counters = {'profiled': 0, 'captured_sampled': 0, 'captured_slow': 0, 'dropped': 0}
+
+    def start(self):
+        """Фоновые потоки; запускаются в каждом процессе после fork"""
+        if not self.enabled or self._threads:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._threads.append(threading.Thread(target=self._write_loop, name='profile-writer', daemon=True))
+        if self.slow_threshold is not None:
+            self._threads.append(threading.Thread(target=self._sample_loop, name='profile-sampler', daemon=True))
+        for thread in self._threads:
+            thread.start()
+        self.logger.info(
+            f"Question profiler: sample rate {self.sample_rate}, slow threshold {self.slow_threshold}, "
+            f"captures in {self.directory}"
+        )
+
+    def session(self, question):
+        """Сессия вопроса: cProfile для доли sample_rate, иначе семплирование стеков"""
+        if not self.enabled:
+            return NULL_SESSION
+        if self.sample_rate and self._random.random() < self.sample_rate:
+            self._counters['profiled'] += 1
+            return ProfileSession(self, question, cProfile.Profile())
+        if self.slow_threshold is not None:
+            return ProfileSession(self, question)
+        return NULL_SESSION
+
+    def finish(self, session, handler, source, timer):
+        """Сохраняет снимок вопроса, если он профилировался или оказался медленным"""
+        if session is NULL_SESSION or session is None:
+            return
+        elapsed = timer.elapsed()
+        if session.profile is not None:
+            reason = 'sampled'
+        elif elapsed >= self.slow_threshold:
+            reason = 'slow'
+        else:
+            return
+        with self._lock:
+            samples = dict(session.samples)
+        capture = {
+            'question': session.question,
+            'handler': handler,
+            'source': source,
+            'reason': reason,
+            'pid': os.getpid(),
+            'time': time.time(),
+            'elapsed_ms': round(elapsed * 1000, 3),
+            'stages_ms': {stage: round(seconds * 1000, 3) for stage, seconds in timer.stages.items()},
+            'interval': self.interval,
+            'samples': {';'.join(stack): count for stack, count in samples.items()},
+        }
+        try:
+            self._queue.put_nowait((capture, session.profile))
+        except queue.Full:
+            self._counters['dropped'] += 1
+
+    # Запись в словарь атомарна под GIL; семплер обходит его копию под блокировкой
+    def _attach(self, session):
+        self._active[threading.get_ident()] = session
+
+    def _detach(self):
+        self._active.pop(threading.get_ident(), None)
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            if not self._active:
+                continue
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, session in list(self._active.items()):
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        session.samples[self._stack(frame)] += 1
+
+    def _stack(self, frame):
+        """Стек от внешнего вызова к текущему, не глубже MAX_DEPTH"""
+        stack = []
+        while frame is not None and len(stack) < self.MAX_DEPTH:
+            stack.append(frame_key(frame.f_code))
+            frame = frame.f_back
+        return tuple(reversed(stack))
+
+    def _write_loop(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return
+                continue
+            try:
+                self._write(*item)
+            except OSError as e:
+                self.logger.error(f"Failed to write profile capture: {str(e)}")
+
+    def _write(self, capture, profile):
+        self._seq += 1
+        name = time.strftime('%Y%m%d-%H%M%S', time.localtime(capture['time']))
+        name = f"{name}-{capture['pid']}-{self._seq:06d}"
+        if profile is not None:
+            capture['profile'] = name + '.prof'
+            pstats.Stats(profile).dump_stats(os.path.join(self.directory, capture['profile']))
+        path = os.path.join(self.directory, name + '.json')
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(capture, f, ensure_ascii=False)
+        os.replace(path + '.tmp', path)
+        self._counters['captured_' + capture['reason']] += 1
+        self._rotate()
+
+    def _rotate(self):
+        """Оставляет последние max_captures снимков (общий каталог для всех воркеров)"""
+        captures = sorted(name for name in os.listdir(self.directory) if name.endswith('.json'))
+        for name in captures[:-self.max_captures]:
+            for path in (name, name[:-len('.json')] + '.prof'):
+                try:
+                    os.remove(os.path.join(self.directory, path))
+                except FileNotFoundError:
+                    pass
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'sample_rate': self.sample_rate,
+            'slow_threshold': self.slow_threshold,
+            'directory': self.directory if self.enabled else None,
+            'pending': self._queue.qsize(),
+            **self._counters,
+        }
+
+    def stop(self):
+        """Дописывает накопленные снимки и останавливает потоки"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(5.0)
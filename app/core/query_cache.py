@@ -0,0 +1,145 @@
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+
+class QueryCache:
+    """Двухуровневый кэш результатов SPARQL: LRU в памяти и SQLite на диске"""
+    MEMORY_SIZE = 2048
+    DISK_SIZE = 100000
+    POSITIVE_TTL = 7 * 24 * 3600  # секунд
+    NEGATIVE_TTL = 24 * 3600
+    EVICT_EVERY = 500  # Проверка размера диска раз в N записей
+
+    def __init__(self, db_path=None, memory_size=None, disk_size=None,
+                 positive_ttl=None, negative_ttl=None):
+        self.db_path = db_path
+        self.memory_size = memory_size or self.MEMORY_SIZE
+        self.disk_size = disk_size or self.DISK_SIZE
+        self.positive_ttl = positive_ttl or self.POSITIVE_TTL
+        self.negative_ttl = negative_ttl or self.NEGATIVE_TTL
+        self.logger = logging.getLogger(__name__)
+
+        self._memory = OrderedDict()  # ключ -> (срок годности, bindings)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+        self._db = None
+        if db_path:
+            try:
+                self._db = sqlite3.connect(db_path, timeout=5.0, check_same_thread=False,
+                                           isolation_level=None)
+                self._db.execute('PRAGMA journal_mode=WAL')
+                self._db.execute(
+                    'CREATE TABLE IF NOT EXISTS sparql_cache ('
+                    'key TEXT PRIMARY KEY, bindings TEXT NOT NULL, expires_at REAL NOT NULL)'
+                )
+                self._db.execute(
+                    'CREATE INDEX IF NOT EXISTS sparql_cache_expires ON sparql_cache (expires_at)'
+                )
+            except sqlite3.Error as e:
+                self.logger.error(f"Query cache disabled on disk: {str(e)}")
+                self._db = None
+
+    @staticmethod
+    def make_key(query):
+        """Ключ кэша по тексту запроса без учета форматирования"""
+        normalized = ' '.join(query.split())
+        return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+    def get(self, query):
+        """Возвращает сохраненные bindings или None при промахе"""
+        key = self.make_key(query)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[0] > now:
+                self._memory.move_to_end(key)
+                self._counters['memory_hits'] += 1
+                return entry[1]
+            if entry:
+                del self._memory[key]
+
+            row = self._db_get(key, now)
+            if row is None:
+                self._counters['misses'] += 1
+                return None
+            expires_at, bindings = row
+            self._remember(key, expires_at, bindings)
+            self._counters['disk_hits'] += 1
+            return bindings
+
+    def set(self, query, bindings):
+        """Сохраняет результат; пустой результат хранится с отдельным TTL"""
+        key = self.make_key(query)
+        ttl = self.positive_ttl if bindings else self.negative_ttl
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._remember(key, expires_at, bindings)
+            self._counters['stores'] += 1
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO sparql_cache (key, bindings, expires_at) VALUES (?, ?, ?)',
+                    (key, json.dumps(bindings, ensure_ascii=False), expires_at)
+                )
+                self._writes += 1
+                if self._writes % self.EVICT_EVERY == 0:
+                    self._evict_disk()
+            except sqlite3.Error as e:
+                self.logger.warning(f"Query cache write failed: {str(e)}")
+
+    def _remember(self, key, expires_at, bindings):
+        self._memory[key] = (expires_at, bindings)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+            self._counters['evictions'] += 1
+
+    def _db_get(self, key, now):
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute(
+                'SELECT expires_at, bindings FROM sparql_cache WHERE key = ?', (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            self.logger.warning(f"Query cache read failed: {str(e)}")
+            return None
+        if row is None or row[0] <= now:
+            return None
+        return row[0], json.loads(row[1])
+
+    def _evict_disk(self):
+        """Удаляет просроченные записи и ближайшие к истечению сверх лимита"""
+        self._db.execute('DELETE FROM sparql_cache WHERE expires_at <= ?', (time.time(),))
+        count = self._db.execute('SELECT COUNT(*) FROM sparql_cache').fetchone()[0]
+        if count > self.disk_size:
+            self._db.execute(
+                'DELETE FROM sparql_cache WHERE key IN ('
+                'SELECT key FROM sparql_cache ORDER BY expires_at LIMIT ?)',
+                (count - self.disk_size,)
+            )
+            self._counters['evictions'] += count - self.disk_size
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counters['memory_hits'] + self._counters['disk_hits'] + self._counters['misses']
+            hits = lookups - self._counters['misses']
+            return {
+                'memory_entries': len(self._memory),
+                'hit_rate': hits / lookups if lookups else 0.0,
+                **self._counters,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -1,15 +1,26 @@
 import re
 import json
 from pathlib import Path
-from difflib import get_close_matches
-import pymorphy2
+
+from .keyword_index import KeywordIndex, FuzzyIndex
+from .metrics import NULL_TIMER
+from .morphology import get_morphology
 
 
 class QuestionHandler:
+    FALLBACK_RESPONSE = "Извините, я не понял вопрос. Попробуйте переформулировать."
+    FUZZY_CUTOFF = 0.6
+
     def __init__(self, config_path):
         self.config = self._load_config(config_path)
         self.patterns = self._compile_patterns()
-        self.morph = pymorphy2.MorphAnalyzer()
+        self.matchers, self.default_matcher = self._compile_matcher()
+        self.keyword_patterns = [p for p in self.patterns if p['mode'] == 'keywords']
+        self.keyword_index = KeywordIndex([p['keywords'] for p in self.keyword_patterns])
+        self.fuzzy_index = FuzzyIndex(
+            [" ".join(p['keywords']) for p in self.keyword_patterns], self.FUZZY_CUTOFF
+        )
+        self.morphology = get_morphology()
         self.stop_words = self._load_stop_words()
 
     def _load_config(self, config_path):
@@ -17,7 +28,8 @@ class QuestionHandler:
             return json.load(f)
 
     def _load_stop_words(self):
-        return {'как', 'найти', 'для', 'от', 'в', 'с', 'по', 'о', 'и', 'у', 'к', 'не', 'на', 'за', 'из', 'со', 'то',
+        # «и» не входит: это разделитель в шаблонах с двумя понятиями
+        return {'как', 'найти', 'для', 'от', 'в', 'с', 'по', 'о', 'у', 'к', 'не', 'на', 'за', 'из', 'со', 'то',
                 'же'}
 
     def _normalize_text(self, text):
@@ -26,21 +38,35 @@ class QuestionHandler:
         tokens = re.findall(r'\b\w+\b', text)  # Токенизация с учетом сложных слов
         return ' '.join([t for t in tokens if t not in self.stop_words])
 
+    def normalize_question(self, question):
+        """Ключ вопроса для кэша ответов: нормализация без морфологии"""
+        return self._normalize_text(question)
+
     def _lemmatize_focus(self, phrase):
         """Лемматизация фразы с сохранением структуры"""
-        tokens = phrase.split()
-        lemmas = [self.morph.parse(t)[0].normal_form for t in tokens]
-        return ' '.join(lemmas)
+        return self.morphology.lemmatize(phrase)
+
+    def _question_patterns(self):
+        # Конфигурация может быть списком шаблонов или словарем с question_patterns
+        if isinstance(self.config, dict):
+            return self.config['question_patterns']
+        return self.config
+
+    def _fallback_response(self):
+        if isinstance(self.config, dict):
+            return self.config.get('system_settings', {}).get('fallback_response', self.FALLBACK_RESPONSE)
+        return self.FALLBACK_RESPONSE
 
     def _compile_patterns(self):
         compiled = []
-        for pattern in self.config['question_patterns']:
+        for pattern in self._question_patterns():
             for p in pattern.get('patterns', []):
                 compiled.append({
                     'type': pattern['type'],
                     'regex': re.compile(p, re.IGNORECASE),
                     'response': pattern['response_templates'],
                     'handler': pattern['handler'],
+                    'options': pattern.get('options', {}),
                     'mode': 'regex'
                 })
             for kws in pattern.get('keywords', []):
@@ -49,58 +75,132 @@ class QuestionHandler:
                     'keywords': [kw.lower() for kw in kws],
                     'response': pattern['response_templates'],
                     'handler': pattern['handler'],
+                    'options': pattern.get('options', {}),
                     'mode': 'keywords'
                 })
         return compiled
 
-    def analyze_question(self, question):
-        # Нормализация: нижний регистр + удаление стоп-слов
-        normalized = self._normalize_text(question)
+    def _compile_matcher(self):
+        """Объединяет regex-шаблоны в альтернативы, разложенные по первому слову
 
-        # Поиск по regex-шаблонам
-        for pattern in self.patterns:
-            if pattern['mode'] == 'regex':
-                match = pattern['regex'].match(normalized)
-                if match:
-                    focus = match.group(1).strip()
-                    return {
-                        'type': pattern['type'],
-                        'focus': self._lemmatize_focus(focus),  # Лемматизация фокуса
-                        'handler': pattern['handler'],
-                        'response_templates': pattern['response'],
-                        'raw_focus': focus  # Оригинал для морфологии ответа
-                    }
-
-        # Поиск по ключевым словам
-        for pattern in self.patterns:
-            if pattern['mode'] == 'keywords':
-                if all(kw in normalized for kw in pattern['keywords']):
-                    focus = self._extract_focus(normalized, pattern['keywords'])
-                    return {
-                        'type': pattern['type'],
-                        'focus': self._lemmatize_focus(focus),
-                        'handler': pattern['handler'],
-                        'response_templates': pattern['response'],
-                        'raw_focus': focus
-                    }
-
-        # Нечеткий поиск
+        Шаблон, начинающийся с литерального слова и пробела, может совпасть
+        только с вопросом, у которого это первое слово, поэтому попадает лишь
+        в ветку своего слова; остальные шаблоны входят во все ветки. Внутри
+        ветки сохраняется порядок конфигурации, так что первая совпавшая
+        альтернатива совпадает с результатом последовательного перебора.
+        Возвращает словарь: первое слово -> (выражение, группы) и набор
+        для вопросов с прочими первыми словами.
+        """
+        regex_patterns = [p for p in self.patterns if p['mode'] == 'regex']
+        leading = [self._leading_word(p['regex'].pattern) for p in regex_patterns]
+
+        matchers = {}
+        for word in set(w for w in leading if w):
+            matchers[word] = self._build_alternation(
+                [p for p, w in zip(regex_patterns, leading) if w in (None, word)]
+            )
+        default = self._build_alternation([p for p, w in zip(regex_patterns, leading) if w is None])
+        return matchers, default
+
+    @staticmethod
+    def _leading_word(source):
+        match = re.match(r'(\w+) ', source)
+        return match.group(1).lower() if match else None
+
+    @staticmethod
+    def _build_alternation(patterns):
+        """Одно выражение из шаблонов; группы: имя ветви -> (шаблон, номер группы фокуса)"""
+        branches = []
+        groups = {}
+        group_index = 0
+        for pattern in patterns:
+            name = f"p{len(branches)}"
+            branches.append(f"(?P<{name}>{pattern['regex'].pattern})")
+            groups[name] = (pattern, group_index + 2)
+            group_index += 1 + pattern['regex'].groups
+        if not branches:
+            return None, groups
+        return re.compile('|'.join(branches), re.IGNORECASE), groups
+
+    def _match_pattern(self, normalized):
+        """Находит первый по порядку конфигурации regex-шаблон, фокус и второе понятие"""
+        first_word = normalized.split(' ', 1)[0]
+        regex, groups = self.matchers.get(first_word, self.default_matcher)
+        if regex is None:
+            return None
+        match = regex.match(normalized)
+        if not match:
+            return None
+        pattern, focus_group = groups[match.lastgroup]
+        secondary = match.group(focus_group + 1) if pattern['regex'].groups > 1 else ''
+        return pattern, match.group(focus_group), secondary
+
+    def _make_result(self, pattern, focus, secondary='', timer=NULL_TIMER):
+        focus = focus.strip()
+        with timer.stage('lemmatize'):
+            lemma = self._lemmatize_focus(focus)  # Лемматизация фокуса
+        return {
+            'type': pattern['type'],
+            'focus': lemma,
+            'handler': pattern['handler'],
+            'response_templates': pattern['response'],
+            'options': pattern['options'],
+            'raw_focus': focus,  # Оригинал для морфологии ответа
+            'focus_original': focus,
+            'focus_lemma': lemma,
+            'focus_secondary': (secondary or '').strip(),  # Второе понятие в вопросах о двух понятиях
+        }
+
+    def handlers(self, concepts=1):
+        """Обработчики вопросов о concepts понятиях в порядке конфигурации"""
+        arity = {}
         for pattern in self.patterns:
-            if pattern['mode'] == 'keywords':
-                joined_kw = " ".join(pattern['keywords'])
-                if get_close_matches(normalized, [joined_kw], n=1, cutoff=0.6):
-                    focus = self._extract_focus(normalized, pattern['keywords'])
-                    return {
-                        'type': pattern['type'],
-                        'focus': self._lemmatize_focus(focus),
-                        'handler': pattern['handler'],
-                        'response_templates': pattern['response'],
-                        'raw_focus': focus
-                    }
+            groups = pattern['regex'].groups if pattern['mode'] == 'regex' else 1
+            arity[pattern['handler']] = max(arity.get(pattern['handler'], 1), min(groups, 2))
+        return [handler for handler, count in arity.items() if count == concepts]
+
+    def make_request(self, handler, focus, secondary=''):
+        """Данные анализа для обработчика и понятия без текста вопроса (прогрев кэшей)"""
+        pattern = next(p for p in self.patterns if p['handler'] == handler)
+        return self._make_result(pattern, focus, secondary)
+
+    def analyze_question(self, question, timer=NULL_TIMER, normalized=None):
+        """timer - StageTimer запроса: время нормализации, поиска шаблона и лемматизации
+
+        normalized - результат normalize_question для этого вопроса, если он
+        уже вычислен (ключ кэша ответов): вопрос не нормализуется повторно.
+        """
+        # Нормализация: нижний регистр + удаление стоп-слов
+        if normalized is None:
+            with timer.stage('normalize'):
+                normalized = self._normalize_text(question)
+
+        # Поиск по regex-шаблонам: один проход выражения для первого слова
+        with timer.stage('match'):
+            found = self._match_pattern(normalized)
+        if found:
+            return self._make_result(*found, timer=timer)
+
+        # Поиск по ключевым словам через инвертированный индекс
+        # с последующим нечетким поиском только среди правдоподобных кандидатов
+        with timer.stage('match'):
+            index = self.keyword_index.first_match(normalized)
+            if index is None:
+                index = self.fuzzy_index.first_match(normalized)
+        if index is not None:
+            pattern = self.keyword_patterns[index]
+            focus = self._extract_focus(normalized, pattern['keywords'])
+            return self._make_result(pattern, focus, timer=timer)
 
+        fallback = self._fallback_response()
         return {
             'type': 'unknown',
-            'response': self.config['system_settings']['fallback_response']
+            'handler': 'default',
+            'response_templates': {'default': fallback},
+            'response': fallback,
+            'focus_original': '',
+            'focus_lemma': '',
+            'focus_secondary': '',
         }
 
     def _extract_focus(self, question, keywords):
@@ -1,28 +1,45 @@
 import logging
-import pymorphy2
+import re
+
+from .morphology import get_morphology
 
 
 class ResponseBuilder:
+    NOT_FOUND = "Информация не найдена"
+    PLACEHOLDER = re.compile(r'\{(\w+)\}')
+    FOCUS_FIELDS = ('focus', 'focus_nomn', 'focus_gent', 'focus_gen', 'focus_datv',
+                    'focus_accs', 'focus_ablt', 'focus_loct')
+    # Порядок значений в кортеже ответа (get_visualization)
+    TUPLE_FIELDS = ('image_url', 'description')
+
     def __init__(self):
         self.logger = logging.getLogger(__name__)
-        self.morph = pymorphy2.MorphAnalyzer()
+        self.morphology = get_morphology()
         self.logger.info("ResponseBuilder initialized")
 
     def build_response(self, handler_data, ontology_data):
-        # Обработка случая, когда данные не найдены
-        if ontology_data is None or (isinstance(ontology_data, list) and not ontology_data):
-            default_template = handler_data['response_templates'].get('default')
-        if default_template:
-            return self._apply_morphology(default_template, handler_data)
-        return "Информация не найдена"
+        return self.render(handler_data, ontology_data)[0]
 
-        # Определение шаблона ответа
+    def render(self, handler_data, ontology_data):
+        """Формирует ответ и сообщает, заполнены ли все поля шаблона.
+
+        Неполный ответ (поле шаблона осталось без значения) заменяется
+        запасным и не должен попадать в кэш.
+        """
         templates = handler_data['response_templates']
-        response_template = templates.get('default', "{result}")
 
+        # Изображение без адреса - то же, что отсутствие данных
+        if isinstance(ontology_data, tuple) and not ontology_data[0]:
+            ontology_data = None
 
-        handler_type = handler_data['handler']
+        # Обработка случая, когда данные не найдены
+        if ontology_data is None or (isinstance(ontology_data, list) and not ontology_data):
+            default_template = templates.get('default')
+            if default_template and not self._missing_fields(default_template, handler_data):
+                return self._apply_morphology(default_template, handler_data), True
+            return self.NOT_FOUND, False
 
+        handler_type = handler_data['handler']
 
         if handler_type == 'get_algorithm_steps' and isinstance(ontology_data, list):
             if 'steps' in templates:
@@ -31,61 +48,70 @@ class ResponseBuilder:
                     templates['steps'],
                     handler_data,
                     {'steps': steps}
-                )
+                ), True
 
+        # Определение шаблона ответа
+        response_template = templates.get('default', "{result}")
 
-        if isinstance(ontology_data, list):
+        if isinstance(ontology_data, bool):
+            response_template = templates.get('yes' if ontology_data else 'no', response_template)
+        elif isinstance(ontology_data, list):
+            # Шаблон default у списков - ответ «не найдено», для найденных
+            # значений берется single или multiple
             if len(ontology_data) == 1 and 'single' in templates:
                 response_template = templates['single']
-                ontology_data = ontology_data[0]
-            elif len(ontology_data) > 1 and 'multiple' in templates:
+            elif 'multiple' in templates:
                 response_template = templates['multiple']
-                ontology_data = ", ".join(ontology_data)
+            ontology_data = ", ".join(map(str, ontology_data))
+        elif 'default' not in templates and 'single' in templates:
+            response_template = templates['single']
 
         # Сборка данных для подстановки
+        data = {'result': ontology_data, 'items': ontology_data}
+        if isinstance(ontology_data, tuple):
+            data['result'] = data['items'] = ontology_data[0]
+            data.update(zip(self.TUPLE_FIELDS, (value or '' for value in ontology_data)))
+        # Единственное поле данных шаблона называется по смыслу вопроса
+        # ({definition}, {authors}, {formula}...) и получает найденное значение
+        missing = self._missing_fields(response_template, handler_data, data)
+        if len(missing) == 1:
+            data[missing.pop()] = data['result']
+        if missing:
+            self.logger.warning(f"Unfilled template fields {sorted(missing)} for {handler_type}")
+            return str(data['result']), False
+        return self._apply_morphology(response_template, handler_data, data), True
+
+    def _missing_fields(self, template, handler_data, extra_data=None):
+        """Поля шаблона, для которых нет значения при подстановке"""
+        known = set(self.FOCUS_FIELDS) | set(handler_data) | set(extra_data or ())
+        return {field for field in self.PLACEHOLDER.findall(template) if field not in known}
+
+    def _apply_morphology(self, template, handler_data, extra_data=None):
+        """Применяет морфологическое согласование к шаблону ответа"""
+        focus = handler_data.get('focus_original', '')
+
+        # Генерация форм слова для фокуса (кэшируется общим сервисом морфологии)
+        forms = self.morphology.case_forms(focus) if focus else {}
+
+        # Сбор всех данных для подстановки
         data = {
-            'result': ontology_data,
-            'items': ", ".join(ontology_data) if isinstance(ontology_data, list) else ontology_data
+            'focus': focus,
+            'focus_nomn': forms.get('nomn', focus),
+            'focus_gent': forms.get('gent', focus),
+            'focus_gen': forms.get('gent', focus),  # Сокращение, используемое в конфигурации шаблонов
+            'focus_datv': forms.get('datv', focus),
+            'focus_accs': forms.get('accs', focus),
+            'focus_ablt': forms.get('ablt', focus),
+            'focus_loct': forms.get('loct', focus),
+            **handler_data,
+            **(extra_data or {})
         }
 
-        return self._apply_morphology(response_template, handler_data, data)
-
-
-def _apply_morphology(self, template, handler_data, extra_data=None):
-    """Применяет морфологическое согласование к шаблону ответа"""
-    focus = handler_data.get('focus_original', '')
-
-    # Генерация форм слова для фокуса
-    forms = {}
-    if focus:
-        parsed = self.morph.parse(focus)[0]
-        forms = {
-            'nomn': parsed.inflect({'nomn'}).word if parsed.inflect({'nomn'}) else focus,
-            'gent': parsed.inflect({'gent'}).word if parsed.inflect({'gent'}) else focus,
-            'datv': parsed.inflect({'datv'}).word if parsed.inflect({'datv'}) else focus,
-            'accs': parsed.inflect({'accs'}).word if parsed.inflect({'accs'}) else focus,
-            'ablt': parsed.inflect({'ablt'}).word if parsed.inflect({'ablt'}) else focus,
-            'loct': parsed.inflect({'loct'}).word if parsed.inflect({'loct'}) else focus,
-        }
+        # Замена плейсхолдеров
+        response = template
+        for key, value in data.items():
+            placeholder = f'{{{key}}}'
+            if placeholder in response:
+                response = response.replace(placeholder, str(value))
 
-    # Сбор всех данных для подстановки
-    data = {
-        'focus': focus,
-        'focus_nomn': forms.get('nomn', focus),
-        'focus_gent': forms.get('gent', focus),
-        'focus_datv': forms.get('datv', focus),
-        'focus_accs': forms.get('accs', focus),
-        'focus_ablt': forms.get('ablt', focus),
-        'focus_loct': forms.get('loct', focus),
-        **handler_data,
-        **(extra_data or {})
-    }
-
-    # Замена плейсхолдеров
-    response = template
-    for key, value in data.items():
-        placeholder = f'{{{key}}}'
-        if placeholder in response:
-            response = response.replace(placeholder, str(value))
-
-    return response
\ No newline at end of file
+        return response
\ No newline at end of file
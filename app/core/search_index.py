@@ -0,0 +1,106 @@
+from bisect import bisect_left
+
+
+class SearchIndex:
+    """Поисковый индекс по нормализованным меткам онтологии
+
+    Подстрочный поиск идет по инвертированному индексу n-грамм (n = 1..3):
+    кандидаты - пересечение списков для n-грамм запроса, затем точная
+    проверка вхождения. Префиксный поиск (для автодополнения) - бинарный
+    поиск в отсортированном списке суффиксов, начинающихся с начала слова.
+    Тип сущности и отображаемая метка вычисляются при построении.
+    """
+    GRAM = 3
+    SHORT_TERM = 2  # Ранжирование для запросов такой длины запоминается
+
+    def __init__(self, entries):
+        """entries - итерируемое из (нормализованная метка, uri, метка, тип)"""
+        self._labels = []  # номер записи -> нормализованная метка
+        self._records = []  # номер записи -> {'uri', 'label', 'type'}
+        self._postings = {}  # n-грамма -> номера записей по возрастанию
+        self._word_starts = []  # (суффикс с начала слова, номер записи), отсортирован
+        self._ranked = {}  # (короткий запрос, prefix) -> номера записей по релевантности
+
+        # Записи нумеруются по (длине, метке), поэтому номер записи служит
+        # готовым ключом сортировки внутри одного уровня релевантности
+        for norm_label, uri, label, entity_type in sorted(entries, key=lambda e: (len(e[0]), e[0])):
+            entry_id = len(self._labels)
+            self._labels.append(norm_label)
+            self._records.append({'uri': uri, 'label': label, 'type': entity_type})
+            for gram in self._grams(norm_label):
+                self._postings.setdefault(gram, []).append(entry_id)
+            offset = 0
+            for word in norm_label.split(' '):
+                if word:
+                    self._word_starts.append((norm_label[offset:], entry_id))
+                offset += len(word) + 1
+        self._word_starts.sort()
+
+    @classmethod
+    def _grams(cls, text, sizes=None):
+        grams = set()
+        for n in sizes or range(1, cls.GRAM + 1):
+            grams.update(text[i:i + n] for i in range(len(text) - n + 1))
+        return grams
+
+    def __len__(self):
+        return len(self._labels)
+
+    def _substring_matches(self, term):
+        if not term:
+            return range(len(self._labels))
+        postings = sorted(
+            (self._postings.get(gram, ()) for gram in self._grams(term, (min(len(term), self.GRAM),))),
+            key=len
+        )
+        candidates = set(postings[0])
+        for other in postings[1:]:
+            candidates.intersection_update(other)
+            if not candidates:
+                return ()
+        if len(term) <= self.GRAM:
+            return candidates
+        return [i for i in candidates if term in self._labels[i]]
+
+    def _prefix_matches(self, term):
+        matches = set()
+        position = bisect_left(self._word_starts, (term,))
+        while position < len(self._word_starts):
+            suffix, entry_id = self._word_starts[position]
+            if not suffix.startswith(term):
+                break
+            matches.add(entry_id)
+            position += 1
+        return matches
+
+    def _rank(self, term, prefix):
+        matches = self._prefix_matches(term) if prefix else self._substring_matches(term)
+        # Точное совпадение, затем совпадение с начала метки, затем по номеру записи
+        labels = self._labels
+        return sorted(matches, key=lambda i: (labels[i] != term, not labels[i].startswith(term), i))
+
+    def search(self, term, limit=None, prefix=False):
+        """Записи, метки которых содержат term (или его слово начинается с term)
+
+        Результаты упорядочены по релевантности, по одной записи на сущность.
+        """
+        if len(term) <= self.SHORT_TERM:
+            # Короткие запросы совпадают с тысячами меток; их порядок считается один раз
+            key = (term, prefix)
+            ranked = self._ranked.get(key)
+            if ranked is None:
+                ranked = self._ranked[key] = self._rank(term, prefix)
+        else:
+            ranked = self._rank(term, prefix)
+
+        results = []
+        seen = set()
+        for entry_id in ranked:
+            record = self._records[entry_id]
+            if record['uri'] in seen:
+                continue
+            seen.add(record['uri'])
+            results.append(dict(record))
+            if limit is not None and len(results) >= limit:
+                break
+        return results
@@ -1,5 +1,9 @@
-from SPARQLWrapper import SPARQLWrapper, JSON
+import asyncio
 import logging
+import threading
+from urllib.parse import quote_plus
+
+import aiohttp
 
 
 class WikidataConnector:
@@ -32,277 +36,385 @@ class WikidataConnector:
         'category': 'wdt:P279'
     }
 
-    def __init__(self):
-        self.sparql = SPARQLWrapper(self.WIKIDATA_ENDPOINT)
+    LABEL_SERVICE = 'SERVICE wikibase:label {{ bd:serviceParam wikibase:language "ru". {} }}'
+
+    # Запросы обработчиков: переменные SELECT, условия на ?item и извлекаемое поле.
+    # 'many' - список значений, 'limit' - число строк для одиночного запроса
+    QUERIES = {
+        'get_definition': {
+            'select': '?item ?description',
+            'where': 'OPTIONAL { ?item schema:description ?description. FILTER(LANG(?description) = "ru") }',
+            'label_service': '',
+            'field': 'description',
+            'limit': 1,
+        },
+        'get_subclasses': {
+            'select': '?subclass ?subclassLabel',
+            'where': '?subclass wdt:P279 ?item.',
+            'label_service': '?subclass rdfs:label ?subclassLabel.',
+            'field': 'subclassLabel',
+            'many': True,
+        },
+        'get_superclasses': {
+            'select': '?superclass ?superclassLabel',
+            'where': '?item wdt:P279 ?superclass.',
+            'label_service': '?superclass rdfs:label ?superclassLabel.',
+            'field': 'superclassLabel',
+            'many': True,
+        },
+        'get_synonyms': {
+            'select': '?altLabel',
+            'where': '?item skos:altLabel ?altLabel.\n  FILTER(LANG(?altLabel) = "ru")',
+            'field': 'altLabel',
+            'many': True,
+        },
+        'get_formula': {
+            'select': '?formula',
+            'where': 'OPTIONAL { ?item wdt:P2534 ?formula. }',
+            'label_service': '',
+            'field': 'formula',
+            'limit': 1,
+        },
+        'get_applications': {
+            'select': '?application ?applicationLabel',
+            'where': '{ ?item wdt:P1535 ?application. } UNION { ?item wdt:P2820 ?application. }',
+            'label_service': '?application rdfs:label ?applicationLabel.',
+            'field': 'applicationLabel',
+            'many': True,
+        },
+        'get_authors': {
+            # Автор или режиссер
+            'select': '?author ?authorLabel',
+            'where': '{ ?item wdt:P61 ?author. } UNION { ?item wdt:P57 ?author. }',
+            'label_service': '?author rdfs:label ?authorLabel.',
+            'field': 'authorLabel',
+            'many': True,
+        },
+        'get_complexity': {
+            'select': '?complexity ?complexityLabel',
+            'where': 'OPTIONAL { ?item wdt:P6802 ?complexity. }',
+            'label_service': '?complexity rdfs:label ?complexityLabel.',
+            'field': 'complexityLabel',
+            'limit': 1,
+        },
+        'get_visualization': {
+            'select': '?image ?imageDescription',
+            'where': ('?item wdt:P18 ?image.\n'
+                      '  OPTIONAL { ?item wdt:P2093 ?imageDescription. FILTER(LANG(?imageDescription) = "ru") }'),
+            'label_service': '',
+            'fields': ('image', 'imageDescription'),
+            'limit': 1,
+        },
+        'get_disciplines': {
+            'select': '?discipline ?disciplineLabel',
+            'where': '{ ?item wdt:P2579 ?discipline. } UNION { ?item wdt:P2578 ?discipline. }',
+            'label_service': '?discipline rdfs:label ?disciplineLabel.',
+            'field': 'disciplineLabel',
+            'many': True,
+        },
+        'get_notation': {
+            'select': '?notation',
+            'where': 'OPTIONAL { ?item wdt:P1552 ?notation. }',
+            'label_service': '',
+            'field': 'notation',
+            'limit': 1,
+        },
+        'get_etymology': {
+            'select': '?namedAfter ?namedAfterLabel',
+            'where': '?item wdt:P138 ?namedAfter.',
+            'label_service': '?namedAfter rdfs:label ?namedAfterLabel.',
+            'field': 'namedAfterLabel',
+            'limit': 1,
+        },
+        'get_numeric_value': {
+            'select': '?value',
+            'where': '?item wdt:P1181 ?value.',
+            'field': 'value',
+            'limit': 1,
+        },
+        'get_examples': {
+            'select': '?example ?exampleLabel',
+            'where': '?item wdt:P828 ?example.',
+            'label_service': '?example rdfs:label ?exampleLabel.',
+            'field': 'exampleLabel',
+            'many': True,
+        },
+        'get_history': {
+            'select': '?inception',
+            'where': '?item wdt:P580 ?inception.',
+            'field': 'inception',
+            'limit': 1,
+        },
+        'get_optimizations': {
+            'select': '?optimization ?optimizationLabel',
+            'where': '?item wdt:P8864 ?optimization.',
+            'label_service': '?optimization rdfs:label ?optimizationLabel.',
+            'field': 'optimizationLabel',
+            'many': True,
+        },
+        'get_limitations': {
+            # Используем свойство "отличительный признак" для ограничений
+            'select': '?limitation ?limitationLabel',
+            'where': '?item wdt:P1552 ?limitation.',
+            'label_service': '?limitation rdfs:label ?limitationLabel.',
+            'field': 'limitationLabel',
+            'many': True,
+        },
+        'get_properties': {
+            'select': '?property ?propertyLabel',
+            'where': '?item wdt:P1552 ?property.',
+            'label_service': '?property rdfs:label ?propertyLabel.',
+            'field': 'propertyLabel',
+            'many': True,
+        },
+    }
+    QUERY_ALIASES = {
+        'get_algorithm_steps': 'get_definition',  # Для алгоритмов используем описание
+        'get_tex_command': 'get_notation',  # Часто совпадает с обозначением
+    }
+
+    TIMEOUT = 10.0  # Дедлайн одного запроса, секунд
+    MAX_CONCURRENCY = 8
+    POOL_SIZE = 16
+    KEEPALIVE_TIMEOUT = 30.0
+    BATCH_SIZE = 50  # Меток в одном запросе с VALUES
+    # Запросы длиннее (в URL-кодировке) - POST: строка GET-запроса с пачкой
+    # длинных меток превышает ограничения серверов (8 КБ у aiohttp и прокси)
+    MAX_GET_QUERY = 4000
+
+    def __init__(self, cache=None, endpoint=None, timeout=None, max_concurrency=None,
+                 batch_size=None, breaker=None):
+        self.endpoint = endpoint or self.WIKIDATA_ENDPOINT
+        self.timeout = timeout or self.TIMEOUT
+        self.max_concurrency = max_concurrency or self.MAX_CONCURRENCY
+        self.batch_size = batch_size or self.BATCH_SIZE
+        self.cache = cache
+        self.breaker = breaker
         self.logger = logging.getLogger(__name__)
-        self.logger.info("WikidataConnector initialized")
 
-    def query(self, handler_type, entity_label):
-        method_name = f"handle_{handler_type}"
-        if hasattr(self, method_name):
-            return getattr(self, method_name)(entity_label)
-        return None
+        # Сессия и семафор принадлежат собственному циклу событий коннектора
+        self._session = None
+        self._semaphore = None
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(
+            target=self._loop.run_forever, name='wikidata-loop', daemon=True
+        )
+        self._loop_thread.start()
+        self.logger.info(f"WikidataConnector initialized ({self.endpoint})")
+
+    def query(self, handler_type, entity_label, timeout=None):
+        return self.run_sync(self.aquery(handler_type, entity_label), timeout)
+
+    async def aquery(self, handler_type, entity_label):
+        if self._spec(handler_type) is None:
+            return None
+        return await self._alookup(handler_type, entity_label)
+
+    def submit(self, coro):
+        """Запускает корутину в цикле коннектора и возвращает concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def run_sync(self, coro, timeout=None):
+        """Выполняет корутину в цикле коннектора и ждет результат"""
+        return self.submit(coro).result(timeout)
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+        if self._session is not None:
+            self.run_sync(self._session.close())
+            self._session = None
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop_thread.join()
+        self._loop.close()
 
     # Основные методы запросов
-    def handle_get_definition(self, entity_label):
-        query = f"""
-        SELECT ?item ?description WHERE {{
-          ?item rdfs:label "{entity_label}"@ru.
-          OPTIONAL {{ ?item schema:description ?description. FILTER(LANG(?description) = "ru") }}
-          SERVICE wikibase:label {{ bd:serviceParam wikibase:language "ru". }}
-        }}
-        LIMIT 1
-        """
-        results = self._execute_query(query)
-        if results and 'description' in results[0]:
-            return results[0]['description']['value']
-        return None
-
-    def handle_get_subclasses(self, entity_label):
-        query = f"""
-        SELECT ?subclass ?subclassLabel WHERE {{
-          ?item rdfs:label "{entity_label}"@ru.
-          ?subclass wdt:P279 ?item.
-          SERVICE wikibase:label {{ 
-            bd:serviceParam wikibase:language "ru". 
-            ?subclass rdfs:label ?subclassLabel.
-          }}
-        }}
-        """
-        results = self._execute_query(query)
-        return [res['subclassLabel']['value'] for res in results] if results else []
-
-    def handle_get_superclasses(self, entity_label):
-        query = f"""
-        SELECT ?superclass ?superclassLabel WHERE {{
-          ?item rdfs:label "{entity_label}"@ru.
-          ?item wdt:P279 ?superclass.
-          SERVICE wikibase:label {{ 
-            bd:serviceParam wikibase:language "ru". 
-            ?superclass rdfs:label ?superclassLabel.
-          }}
-        }}
-        """
-        results = self._execute_query(query)
-        return [res['superclassLabel']['value'] for res in results] if results else []
-
-    def handle_get_synonyms(self, entity_label):
-        query = f"""
-        SELECT ?altLabel WHERE {{
-          ?item rdfs:label "{entity_label}"@ru.
-          ?item skos:altLabel ?altLabel.
-          FILTER(LANG(?altLabel) = "ru")
-        }}
-        """
-        results = self._execute_query(query)
-        return [res['altLabel']['value'] for res in results] if results else []
-
-    def handle_get_formula(self, entity_label):
-        query = f"""
-        SELECT ?formula WHERE {{
-          ?item rdfs:label "{entity_label}"@ru.
-          OPTIONAL {{ ?item wdt:P2534 ?formula. }}
-          SERVICE wikibase:label {{ bd:serviceParam wikibase:language "ru". }}
-        }}
-        LIMIT 1
-        """
-        results = self._execute_query(query)
-        return results[0]['formula']['value'] if results and 'formula' in results[0] else None
-
-    def handle_get_algorithm_steps(self, entity_label):
-        # Для алгоритмов используем описание
-        return self.handle_get_definition(entity_label)
-
-    def handle_get_applications(self, entity_label):
-        query = f"""
-        SELECT ?application ?applicationLabel WHERE {{
-          ?item rdfs:label "{entity_label}"@ru.
-          {{ ?item wdt:P1535 ?application. }} UNION {{ ?item wdt:P2820 ?application. }}
-          SERVICE wikibase:label {{ 
-            bd:serviceParam wikibase:language "ru". 
-            ?application rdfs:label ?applicationLabel.
-          }}
-        }}
-        """
-        results = self._execute_query(query)
-        return [res['applicationLabel']['value'] for res in results] if results else []
-
-    def handle_get_authors(self, entity_label):
-        query = f"""
-        SELECT ?author ?authorLabel WHERE {{
-          ?item rdfs:label "{entity_label}"@ru.
-          {{ ?item wdt:P61 ?author. }} UNION {{ ?item wdt:P57 ?author. }}  # Автор или режиссер
-          SERVICE wikibase:label {{ 
-            bd:serviceParam wikibase:language "ru". 
-            ?author rdfs:label ?authorLabel.
-          }}
-        }}
-        """
-        results = self._execute_query(query)
-        return [res['authorLabel']['value'] for res in results] if results else []
-
-    def handle_get_complexity(self, entity_label):
-        query = f"""
-        SELECT ?complexity ?complexityLabel WHERE {{
-          ?item rdfs:label "{entity_label}"@ru.
-          OPTIONAL {{ ?item wdt:P6802 ?complexity. }}
-          SERVICE wikibase:label {{ 
-            bd:serviceParam wikibase:language "ru". 
-            ?complexity rdfs:label ?complexityLabel.
-          }}
-        }}
-        LIMIT 1
-        """
-        results = self._execute_query(query)
-        return results[0]['complexityLabel']['value'] if results and 'complexityLabel' in results[0] else None
-
-    def handle_get_visualization(self, entity_label):
-        query = f"""
-        SELECT ?image ?imageDescription WHERE {{
-          ?item rdfs:label "{entity_label}"@ru.
-          ?item wdt:P18 ?image.
-          OPTIONAL {{ ?item wdt:P2093 ?imageDescription. FILTER(LANG(?imageDescription) = "ru") }}
-          SERVICE wikibase:label {{ bd:serviceParam wikibase:language "ru". }}
-        }}
-        LIMIT 1
-        """
-        results = self._execute_query(query)
-        if results and 'image' in results[0]:
-            image_url = results[0]['image']['value']
-            description = results[0].get('imageDescription', {}).get('value', '')
-            return image_url, description
-        return None, None
-
-    def handle_get_disciplines(self, entity_label):
-        query = f"""
-        SELECT ?discipline ?disciplineLabel WHERE {{
-          ?item rdfs:label "{entity_label}"@ru.
-          {{ ?item wdt:P2579 ?discipline. }} UNION {{ ?item wdt:P2578 ?discipline. }}
-          SERVICE wikibase:label {{ 
-            bd:serviceParam wikibase:language "ru". 
-            ?discipline rdfs:label ?disciplineLabel.
-          }}
-        }}
-        """
-        results = self._execute_query(query)
-        return [res['disciplineLabel']['value'] for res in results] if results else []
-
-    def handle_get_notation(self, entity_label):
-        query = f"""
-        SELECT ?notation WHERE {{
-          ?item rdfs:label "{entity_label}"@ru.
-          OPTIONAL {{ ?item wdt:P1552 ?notation. }}
-          SERVICE wikibase:label {{ bd:serviceParam wikibase:language "ru". }}
-        }}
-        LIMIT 1
-        """
-        results = self._execute_query(query)
-        return results[0]['notation']['value'] if results and 'notation' in results[0] else None
-
-    def handle_get_tex_command(self, entity_label):
-        # Часто совпадает с обозначением
-        return self.handle_get_notation(entity_label)
-
-    def handle_get_etymology(self, entity_label):
-        query = f"""
-        SELECT ?namedAfter ?namedAfterLabel WHERE {{
-          ?item rdfs:label "{entity_label}"@ru.
-          ?item wdt:P138 ?namedAfter.
-          SERVICE wikibase:label {{ 
-            bd:serviceParam wikibase:language "ru". 
-            ?namedAfter rdfs:label ?namedAfterLabel.
-          }}
-        }}
-        LIMIT 1
-        """
-        results = self._execute_query(query)
-        return results[0]['namedAfterLabel']['value'] if results else None
-
-    def handle_get_numeric_value(self, entity_label):
-        query = f"""
-        SELECT ?value WHERE {{
-          ?item rdfs:label "{entity_label}"@ru.
-          ?item wdt:P1181 ?value.
-        }}
-        LIMIT 1
-        """
-        results = self._execute_query(query)
-        return results[0]['value']['value'] if results else None
-
-    def handle_get_examples(self, entity_label):
-        query = f"""
-        SELECT ?example ?exampleLabel WHERE {{
-          ?item rdfs:label "{entity_label}"@ru.
-          ?item wdt:P828 ?example.
-          SERVICE wikibase:label {{ 
-            bd:serviceParam wikibase:language "ru". 
-            ?example rdfs:label ?exampleLabel.
-          }}
-        }}
-        """
-        results = self._execute_query(query)
-        return [res['exampleLabel']['value'] for res in results] if results else []
-
-    def handle_get_history(self, entity_label):
-        query = f"""
-        SELECT ?inception WHERE {{
-          ?item rdfs:label "{entity_label}"@ru.
-          ?item wdt:P580 ?inception.
-        }}
-        LIMIT 1
-        """
-        results = self._execute_query(query)
-        return results[0]['inception']['value'] if results else None
-
-    def handle_get_optimizations(self, entity_label):
-        query = f"""
-        SELECT ?optimization ?optimizationLabel WHERE {{
-          ?item rdfs:label "{entity_label}"@ru.
-          ?item wdt:P8864 ?optimization.
-          SERVICE wikibase:label {{ 
-            bd:serviceParam wikibase:language "ru". 
-            ?optimization rdfs:label ?optimizationLabel.
-          }}
-        }}
-        """
-        results = self._execute_query(query)
-        return [res['optimizationLabel']['value'] for res in results] if results else []
-
-    def handle_get_limitations(self, entity_label):
-        # Используем свойство "отличительный признак" для ограничений
-        query = f"""
-        SELECT ?limitation ?limitationLabel WHERE {{
-          ?item rdfs:label "{entity_label}"@ru.
-          ?item wdt:P1552 ?limitation.
-          SERVICE wikibase:label {{ 
-            bd:serviceParam wikibase:language "ru". 
-            ?limitation rdfs:label ?limitationLabel.
-          }}
-        }}
-        """
-        results = self._execute_query(query)
-        return [res['limitationLabel']['value'] for res in results] if results else []
-
-    def handle_get_properties(self, entity_label):
-        query = f"""
-        SELECT ?property ?propertyLabel WHERE {{
-          ?item rdfs:label "{entity_label}"@ru.
-          ?item wdt:P1552 ?property.
-          SERVICE wikibase:label {{ 
-            bd:serviceParam wikibase:language "ru". 
-            ?property rdfs:label ?propertyLabel.
-          }}
-        }}
+    @staticmethod
+    def _literal(label):
+        escaped = label.replace('\\', '\\\\').replace('"', '\\"')
+        return f'"{escaped}"@ru'
+
+    def _spec(self, handler_type):
+        return self.QUERIES.get(self.QUERY_ALIASES.get(handler_type, handler_type))
+
+    def _where(self, spec):
+        where = spec['where']
+        if 'label_service' in spec:
+            where += '\n  ' + self.LABEL_SERVICE.format(spec['label_service'])
+        return where
+
+    def build_query(self, handler_type, entity_label):
+        """Текст SPARQL-запроса обработчика для одной метки"""
+        spec = self._spec(handler_type)
+        query = (
+            f"SELECT {spec['select']} WHERE {{\n"
+            f"  ?item rdfs:label {self._literal(entity_label)}.\n"
+            f"  {self._where(spec)}\n"
+            f"}}"
+        )
+        if spec.get('limit'):
+            query += f"\nLIMIT {spec['limit']}"
+        return query
+
+    def build_batch_query(self, handler_type, entity_labels):
+        """Текст SPARQL-запроса обработчика для нескольких меток через VALUES"""
+        spec = self._spec(handler_type)
+        values = ' '.join(self._literal(label) for label in entity_labels)
+        return (
+            f"SELECT ?label {spec['select']} WHERE {{\n"
+            f"  VALUES ?label {{ {values} }}\n"
+            f"  ?item rdfs:label ?label.\n"
+            f"  {self._where(spec)}\n"
+            f"}}"
+        )
+
+    def _extract(self, spec, results):
+        """Преобразует строки результата в ответ обработчика"""
+        if 'fields' in spec:
+            image_field, description_field = spec['fields']
+            if results and image_field in results[0]:
+                return (results[0][image_field]['value'],
+                        results[0].get(description_field, {}).get('value', ''))
+            return None, None
+        field = spec['field']
+        if spec.get('many'):
+            return [res[field]['value'] for res in results if field in res] if results else []
+        return results[0][field]['value'] if results and field in results[0] else None
+
+    async def _alookup(self, handler_type, entity_label):
+        spec = self._spec(handler_type)
+        results = await self._aexecute_query(self.build_query(handler_type, entity_label))
+        return self._extract(spec, results)
+
+    def batch_query(self, handler_type, entity_labels, batch_size=None):
+        return self.run_sync(self.abatch_query(handler_type, entity_labels, batch_size))
+
+    async def abatch_query(self, handler_type, entity_labels, batch_size=None):
+        """Ответы обработчика для списка меток: {метка: результат}
+
+        Метки без записи в кэше запрашиваются пачками по batch_size в одном
+        запросе с VALUES; результаты раскладываются по меткам и сохраняются
+        в кэш под ключами одиночных запросов.
         """
-        results = self._execute_query(query)
-        return [res['propertyLabel']['value'] for res in results] if results else []
+        spec = self._spec(handler_type)
+        if spec is None:
+            return {label: None for label in entity_labels}
+
+        labels = list(dict.fromkeys(entity_labels))
+        rows = {}
+        missing = []
+        for label in labels:
+            cached = self.cache.get(self.build_query(handler_type, label)) if self.cache is not None else None
+            if cached is None:
+                missing.append(label)
+            else:
+                rows[label] = cached
+
+        batch_size = batch_size or self.batch_size
+        chunks = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+        responses = await asyncio.gather(*(
+            self._aexecute_query(self.build_batch_query(handler_type, chunk), use_cache=False)
+            for chunk in chunks
+        ))
+        for chunk, bindings in zip(chunks, responses):
+            if bindings is None:
+                continue
+            grouped = {label: [] for label in chunk}
+            for row in bindings:
+                label = row.get('label', {}).get('value')
+                if label in grouped:
+                    grouped[label].append({k: v for k, v in row.items() if k != 'label'})
+            for label, label_rows in grouped.items():
+                if spec.get('limit'):
+                    label_rows = label_rows[:spec['limit']]
+                rows[label] = label_rows
+                if self.cache is not None:
+                    self.cache.set(self.build_query(handler_type, label), label_rows)
+
+        return {label: self._extract(spec, rows.get(label)) for label in labels}
 
     def _execute_query(self, query):
+        return self.run_sync(self._aexecute_query(query))
+
+    def _get_session(self):
+        if self._session is None:
+            # Пул не меньше лимита одновременных запросов, иначе он и станет лимитом
+            connector = aiohttp.TCPConnector(
+                limit=max(self.POOL_SIZE, self.max_concurrency), keepalive_timeout=self.KEEPALIVE_TIMEOUT
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={
+                    'User-Agent': self.USER_AGENT,
+                    'Accept': 'application/sparql-results+json',
+                },
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def _fetch(self, query):
+        session = self._get_session()
+        async with self._semaphore:
+            if len(quote_plus(query)) > self.MAX_GET_QUERY:
+                request = session.post(self.endpoint, data={'query': query, 'format': 'json'})
+            else:
+                request = session.get(self.endpoint, params={'query': query, 'format': 'json'})
+            async with request as response:
+                response.raise_for_status()
+                results = await response.json(content_type=None)
+        return results['results']['bindings']
+
+    async def _aexecute_query(self, query, use_cache=True):
+        use_cache = use_cache and self.cache is not None
+        if use_cache:
+            cached = self.cache.get(query)
+            if cached is not None:
+                return cached
+
+        # При разомкнутой цепи запрос к Wikidata не выполняется
+        if self.breaker is not None and not self.breaker.allow():
+            return None
+
         try:
-            self.sparql.setQuery(query)
-            results = self.sparql.query().convert()
-            return results['results']['bindings']
+            bindings = await asyncio.wait_for(self._fetch(query), self.timeout)
+            if self.breaker is not None:
+                self.breaker.record_success()
+            if use_cache:
+                self.cache.set(query, bindings)
+            return bindings
+        except asyncio.TimeoutError:
+            self.logger.error(f"SPARQL query timed out after {self.timeout}s")
+            self.logger.debug(f"Query: {query}")
+            self._record_failure()
+            return None
+        except asyncio.CancelledError:
+            self._record_failure()
+            raise
         except Exception as e:
             self.logger.error(f"SPARQL query failed: {str(e)}")
             self.logger.debug(f"Query: {query}")
-            return None
\ No newline at end of file
+            self._record_failure()
+            return None
+
+    def _record_failure(self):
+        if self.breaker is not None:
+            self.breaker.record_failure()
+
+
+def _make_handlers(handler_type):
+    async def async_handler(self, entity_label):
+        return await self._alookup(handler_type, entity_label)
+
+    def sync_handler(self, entity_label):
+        return self.run_sync(self._alookup(handler_type, entity_label))
+
+    async_handler.__name__ = f"ahandle_{handler_type}"
+    sync_handler.__name__ = f"handle_{handler_type}"
+    return async_handler, sync_handler
+
+
+# Методы ahandle_get_* и синхронные обертки handle_get_* для каждого запроса
+for _handler_type in [*WikidataConnector.QUERIES, *WikidataConnector.QUERY_ALIASES]:
+    _async_handler, _sync_handler = _make_handlers(_handler_type)
+    setattr(WikidataConnector, _async_handler.__name__, _async_handler)
+    setattr(WikidataConnector, _sync_handler.__name__, _sync_handler)
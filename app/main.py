@@ -1,6 +1,9 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
 from core.dialog_controller import DialogController
-import os
+from core.metrics import MetricsRegistry
+from settings import BATCH_MAX_QUESTIONS, config_path, ontology_path, settings
+import atexit
+import json
 import logging
 
 app = Flask(__name__)
@@ -10,18 +13,16 @@ app.secret_key = 'your-secret-key-here'
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Пути к файлам
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-ontology_path = os.path.join(BASE_DIR, '..', 'data', 'ontology.rdf')
-config_path = os.path.join(BASE_DIR, '..', 'configs', 'patterns_config.json')
-
-# Инициализация контроллера
+# Инициализация контроллера: компоненты загружаются в фоне, готовность - /ready
 try:
-    controller = DialogController(ontology_path, config_path)
+    controller = DialogController(ontology_path, config_path, settings)
 except Exception as e:
     logger.error(f"Failed to initialize controller: {str(e)}")
     raise
 
+# Запись накопленных обогащений при остановке процесса
+atexit.register(controller.shutdown)
+
 
 @app.route('/')
 def index():
@@ -49,6 +50,109 @@ def ask_question():
         }), 500
 
 
+def ndjson(events):
+    """Потоковый ответ: по одному JSON-объекту в строке"""
+    lines = (json.dumps(event, ensure_ascii=False) + '\n' for event in events)
+    return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+
+
+@app.route('/ask/stream', methods=['POST'])
+def ask_stream():
+    """NDJSON: сразу ответ онтологии, затем уточнение из Wikidata, если оно есть"""
+    question = request.form.get('question', '').strip()
+    if not question:
+        return jsonify({'error': 'Question cannot be empty'}), 400
+
+    def events():
+        try:
+            for event in controller.stream_question(question):
+                yield {'question': question, **event}
+        except Exception as e:
+            logger.error(f"Error streaming question: {str(e)}")
+            yield {'question': question, 'event': 'error', 'error': 'Internal server error'}
+
+    return ndjson(events())
+
+
+@app.route('/ask/batch', methods=['POST'])
+def ask_batch():
+    """JSON {"questions": [...]} -> {"results": [...]} в порядке вопросов
+
+    С параметром ?stream=1 результаты отдаются как NDJSON по мере
+    готовности, каждый с номером вопроса index.
+    """
+    payload = request.get_json(silent=True) or {}
+    questions = payload.get('questions')
+    if not isinstance(questions, list) or not all(isinstance(q, str) for q in questions):
+        return jsonify({'error': 'Expected JSON object with a list of questions'}), 400
+    if len(questions) > BATCH_MAX_QUESTIONS:
+        return jsonify({'error': f'Too many questions, the limit is {BATCH_MAX_QUESTIONS}'}), 413
+
+    questions = [q.strip() for q in questions]
+    logger.info(f"Batch: {len(questions)} questions")
+
+    def results():
+        positions = [i for i, q in enumerate(questions) if q]
+        for i, q in enumerate(questions):
+            if not q:
+                yield i, {'question': q, 'error': 'Question cannot be empty'}
+        for index, result in controller.iter_batch([questions[i] for i in positions]):
+            yield positions[index], result
+
+    if request.args.get('stream') == '1':
+        def events():
+            pending = set(range(len(questions)))
+            try:
+                for index, result in results():
+                    pending.discard(index)
+                    yield {'index': index, **result}
+            except Exception as e:
+                # Заголовки уже отправлены: ошибка сообщается строкой на каждый неотвеченный вопрос
+                logger.error(f"Error streaming batch: {str(e)}")
+                for index in sorted(pending):
+                    yield {'index': index, 'question': questions[index], 'error': 'Internal server error'}
+
+        return ndjson(events())
+
+    try:
+        ordered = [None] * len(questions)
+        for index, result in results():
+            ordered[index] = result
+    except Exception as e:
+        logger.error(f"Error processing batch: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+    return jsonify({'results': ordered})
+
+
+@app.route('/search')
+def search():
+    """Автодополнение: сущности, слово в метке которых начинается с q"""
+    term = request.args.get('q', '').strip()
+    if not term:
+        return jsonify([])
+    limit = min(request.args.get('limit', 10, type=int), 50)
+    prefix = request.args.get('prefix', '1') != '0'
+    return jsonify(controller.ontology.search_entities(term, limit=limit, prefix=prefix))
+
+
+@app.route('/stats')
+def stats():
+    return jsonify(controller.stats())
+
+
+@app.route('/ready')
+def ready():
+    """Готовность к трафику для балансировщика: 503, пока идет прогрев"""
+    readiness = controller.readiness()
+    return jsonify(readiness), 200 if readiness['ready'] else 503
+
+
+@app.route('/metrics')
+def metrics():
+    """Метрики в текстовом формате Prometheus"""
+    return Response(controller.metrics.render(), content_type=MetricsRegistry.CONTENT_TYPE)
+
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
 
@@ -0,0 +1,257 @@
+"""Прогрев кэшей ответами на вопросы обо всех классах онтологии
+
+Для каждого класса (OntologyController.get_all_classes) и каждого
+обработчика вопросов об одном понятии ответ строится по конвейеру:
+онтология, при промахе - Wikidata пакетными запросами. Так заполняются
+кэш ответов (сохраняется в файл и загружается сервером при старте), кэш
+Wikidata (SQLite) и онтология (журнал обогащений), и первый вопрос о
+сущности на свежем узле не идет по холодному пути.
+
+Задания - пачки по --chunk понятий одного обработчика - выполняются в
+пуле процессов, порожденных после загрузки онтологии. Выполненные
+задания отмечаются в контрольном файле после сохранения кэша ответов,
+поэтому прерванный прогрев продолжается с места остановки.
+
+Запуск:
+    python app/prewarm.py --processes 4
+    python app/prewarm.py --handlers get_definition get_synonyms --no-wikidata
+"""
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import time
+
+from core.answer_cache import AnswerCache
+from core.dialog_controller import DialogController
+from core.ontology_snapshot import OntologySnapshot
+from core.response_builder import ResponseBuilder
+from settings import config_path, ontology_path, settings
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_FILE = 'prewarm.checkpoint.jsonl'
+
+# Контроллер процесса: загружается до создания пула и достается воркерам через fork
+_controller = None
+
+
+class Checkpoint:
+    """Выполненные задания прогрева: строка JSON на задание после заголовка
+
+    Отметки действительны для той же версии онтологии и того же размера
+    пачки; иначе прогрев начинается заново.
+    """
+
+    def __init__(self, path, header):
+        self.path = path
+        self.header = header
+
+    def load(self):
+        """Задание -> источники ответов; пусто, если файла нет или он от другой версии"""
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f if line.strip()]
+        if not lines or lines[0] != self.header:
+            logger.info(f"Checkpoint {self.path} is from another ontology version or chunk size, ignored")
+            return {}
+        return {line['task']: line['sources'] for line in lines[1:]}
+
+    def reset(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(self.header) + '\n')
+
+    def mark(self, done):
+        """Отмечает задания; вызывается только после сохранения их ответов"""
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for task, sources in done:
+                f.write(json.dumps({'task': task, 'sources': sources}, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def make_tasks(controller, handlers, chunk):
+    """Задания (id, обработчик, понятия) в детерминированном порядке"""
+    labels = sorted({entity['label'].lower() for entity in controller.ontology.get_all_classes()})
+    tasks = []
+    for handler in handlers:
+        for start in range(0, len(labels), chunk):
+            tasks.append((f'{handler}/{start // chunk}', handler, labels[start:start + chunk]))
+    return tasks, len(labels)
+
+
+def template_fields(controller):
+    """Поля шаблонов ответов ('{definition}'...): ответ с ними собран не полностью"""
+    fields = set()
+    for pattern in controller.question_handler.patterns:
+        for template in pattern['response'].values():
+            fields.update(ResponseBuilder.PLACEHOLDER.findall(template))
+    return {f'{{{field}}}' for field in fields}
+
+
+def init_worker(controller_settings, use_wikidata):
+    global _controller
+    # Прерывание обрабатывает главный процесс: он сохраняет готовое и отменяет остальное
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if _controller is None:
+        # Запуск без fork: каждый воркер загружает онтологию сам
+        _controller = DialogController(ontology_path, config_path, controller_settings, preload=True)
+    # Без Wikidata коннектор и очередь обогащения не нужны
+    if use_wikidata:
+        _controller.start_services()
+
+
+def run_task(task, timeout, use_wikidata):
+    """Ответы пачки; возвращает источники ответов и записи кэша ответов для главного процесса"""
+    task_id, handler, labels = task
+    controller = _controller
+    controller.answer_cache.clear()
+    requests = [controller.question_handler.make_request(handler, label) for label in labels]
+    sources = controller.prewarm(requests, timeout, use_wikidata)
+    # Записи снимаются до записи обогащений: их применение к онтологии
+    # этого процесса сняло бы только что построенные ответы из Wikidata
+    entries = controller.answer_cache.entries()
+    if use_wikidata:
+        controller.enrichment_queue.flush()
+    return task_id, dict(Counter(sources)), entries
+
+
+class Progress:
+    def __init__(self, total_tasks, questions_per_task, interval):
+        self.total = total_tasks
+        self.per_task = questions_per_task
+        self.interval = interval
+        self.started = time.monotonic()
+        self.last = 0.0
+        self.done = 0
+        self.failed = 0
+        self.sources = Counter()
+
+    def update(self, sources=None):
+        self.done += 1
+        if sources is None:
+            self.failed += 1
+        else:
+            self.sources.update(sources)
+        now = time.monotonic()
+        if now - self.last < self.interval and self.done < self.total:
+            return
+        self.last = now
+        elapsed = now - self.started
+        questions = sum(self.sources.values())
+        rate = questions / elapsed if elapsed else 0.0
+        eta = (self.total - self.done) * self.per_task / rate if rate else 0.0
+        by_source = ', '.join(f'{source} {count}' for source, count in sorted(self.sources.items()))
+        failed = f", {self.failed} tasks failed" if self.failed else ''
+        print(f"[{self.done}/{self.total}] {questions} questions ({by_source}){failed}, "
+              f"{rate:.0f} q/s, ETA {eta:.0f} s", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--handlers', nargs='+', help='по умолчанию - все обработчики об одном понятии')
+    parser.add_argument('--chunk', type=int, default=100, help='понятий в одном задании')
+    parser.add_argument('--no-wikidata', action='store_true', help='только ответы из онтологии')
+    parser.add_argument('--timeout', type=float, default=120.0,
+                        help='ожидание пакетных запросов Wikidata одного задания, секунд')
+    parser.add_argument('--cache-size', type=int, help='размер кэша ответов (по умолчанию ANSWER_CACHE_SIZE)')
+    parser.add_argument('--save-every', type=int, default=20, help='сохранять кэш и отметки каждые N заданий')
+    parser.add_argument('--checkpoint', help='контрольный файл; по умолчанию рядом с онтологией')
+    parser.add_argument('--restart', action='store_true', help='начать заново, не читая контрольный файл')
+    parser.add_argument('--progress', type=float, default=5.0, help='интервал отчета о ходе, секунд')
+    parser.add_argument('--no-compact', action='store_true',
+                        help='не сливать журнал обогащений с файлом онтологии после прогрева')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    global _controller
+    controller_settings = dict(settings)
+    if args.cache_size:
+        controller_settings['answer_cache_size'] = args.cache_size
+    # Кэш ответов из прошлого запуска загружается здесь: продолжение дополняет его
+    _controller = controller = DialogController(ontology_path, config_path, controller_settings, preload=True)
+
+    known = controller.question_handler.handlers()
+    handlers = args.handlers or known
+    unknown = sorted(set(handlers) - set(known))
+    if unknown:
+        parser.error(f"unknown or two-concept handlers: {', '.join(unknown)}")
+
+    tasks, labels = make_tasks(controller, handlers, args.chunk)
+    checkpoint = Checkpoint(
+        args.checkpoint or os.path.join(os.path.dirname(os.path.abspath(ontology_path)), CHECKPOINT_FILE),
+        {'ontology': OntologySnapshot(ontology_path).source_signature()['sha1'], 'chunk': args.chunk,
+         'answers': AnswerCache.FORMAT_VERSION},
+    )
+    done = {} if args.restart else checkpoint.load()
+    if not done:
+        checkpoint.reset()
+    pending = [task for task in tasks if task[0] not in done]
+    print(f"{labels} classes x {len(handlers)} handlers: {len(tasks)} tasks, "
+          f"{len(tasks) - len(pending)} already done, {args.processes} processes")
+    if not pending:
+        return
+
+    progress = Progress(len(pending), args.chunk, args.progress)
+    unsaved = []
+    fields = template_fields(controller)
+    incomplete = 0
+    context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+    with ProcessPoolExecutor(args.processes, mp_context=context, initializer=init_worker,
+                             initargs=(controller_settings, not args.no_wikidata)) as pool:
+        futures = [pool.submit(run_task, task, args.timeout, not args.no_wikidata) for task in pending]
+        try:
+            for future in as_completed(futures):
+                try:
+                    task_id, sources, entries = future.result()
+                except Exception as e:
+                    # Задание не отмечается и будет выполнено при продолжении
+                    logger.error(f"Prewarm task failed: {str(e)}")
+                    progress.update()
+                    continue
+                for key, answer, tags in entries:
+                    # Ответ с незаполненным полем шаблона не сохраняется
+                    if any(field in answer for field in fields):
+                        incomplete += 1
+                        continue
+                    controller.answer_cache.put(key, answer, tags)
+                unsaved.append((task_id, sources))
+                progress.update(sources)
+                if len(unsaved) >= args.save_every:
+                    controller.save_answer_cache()
+                    checkpoint.mark(unsaved)
+                    unsaved = []
+        except KeyboardInterrupt:
+            print("Interrupted, saving progress; running tasks will be repeated on resume")
+            for future in futures:
+                future.cancel()
+            interrupted = True
+        else:
+            interrupted = False
+        finally:
+            controller.save_answer_cache()
+            checkpoint.mark(unsaved)
+
+    # Ответы годны и после слияния: оно не меняет содержимое онтологии, а
+    # кэш перезаписывается с новой версией RDF-файла
+    if not interrupted and not args.no_compact:
+        controller.enricher.compact()
+        controller.save_answer_cache()
+
+    stats = controller.answer_cache.stats()
+    print(f"Answer cache: {stats['entries']} entries in {controller.answer_cache_path}")
+    if incomplete:
+        print(f"{incomplete} answers with unfilled template fields skipped")
+    if stats['evictions']:
+        print(f"{stats['evictions']} answers evicted: raise ANSWER_CACHE_SIZE or --cache-size "
+              f"above {stats['max_size']} to keep them all")
+
+
+if __name__ == '__main__':
+    main()
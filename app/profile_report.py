@@ -0,0 +1,144 @@
+"""Сводка по снимкам профилировщика вопросов
+
+Читает каталог снимков (PROFILE_DIR, по умолчанию data/profiles) и
+выводит: число снимков по причинам, среднее время этапов, самые медленные
+вопросы и самые горячие функции - по стекам семплирования (собственное и
+полное время) и по объединенным профилям cProfile.
+
+Запуск:
+    python app/profile_report.py --top 20
+    python app/profile_report.py --reason slow --handler get_definition
+"""
+import argparse
+from collections import Counter
+import json
+import os
+import pstats
+import statistics
+
+from settings import ontology_path, settings
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DIR = settings['profile_dir'] or os.path.join(os.path.dirname(os.path.abspath(ontology_path)), 'profiles')
+
+
+def load_captures(directory, reason=None, handler=None, min_ms=0.0):
+    captures = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, name), encoding='utf-8') as f:
+                capture = json.load(f)
+        except (OSError, ValueError):
+            # Снимок удален ротацией во время чтения
+            continue
+        if reason and capture['reason'] != reason:
+            continue
+        if handler and capture['handler'] != handler:
+            continue
+        if capture['elapsed_ms'] < min_ms:
+            continue
+        captures.append(capture)
+    return captures
+
+
+def short_name(key):
+    """Путь функции относительно репозитория или site-packages"""
+    path, _, rest = key.rpartition(':')
+    if path.startswith(ROOT_DIR):
+        path = os.path.relpath(path, ROOT_DIR)
+    elif 'site-packages' in path:
+        path = path.split('site-packages' + os.sep, 1)[1]
+    return f'{path}:{rest}'
+
+
+def sampled_functions(captures):
+    """Собственное (функция на вершине стека) и полное время функций по стекам, мс"""
+    own, total = Counter(), Counter()
+    for capture in captures:
+        step = capture['interval'] * 1000
+        for stack, count in capture['samples'].items():
+            frames = stack.split(';')
+            own[frames[-1]] += count * step
+            for frame in set(frames):
+                total[frame] += count * step
+    return own, total
+
+
+def profiled_functions(directory, captures):
+    paths = [os.path.join(directory, c['profile']) for c in captures if c.get('profile')]
+    paths = [path for path in paths if os.path.exists(path)]
+    return pstats.Stats(*paths) if paths else None
+
+
+def print_overview(captures):
+    reasons = Counter(c['reason'] for c in captures)
+    elapsed = [c['elapsed_ms'] for c in captures]
+    print(f"{len(captures)} captures: " + ', '.join(f'{n} {r}' for r, n in sorted(reasons.items())))
+    print(f"elapsed ms: p50 {statistics.median(elapsed):.1f}, max {max(elapsed):.1f}")
+
+    print(f"\n{'stage':<12} {'mean ms':>9} {'max ms':>9} {'share':>7}")
+    stages = {}
+    for capture in captures:
+        for stage, ms in capture['stages_ms'].items():
+            stages.setdefault(stage, []).append(ms)
+    total = sum(elapsed)
+    for stage, values in sorted(stages.items(), key=lambda item: -sum(item[1])):
+        print(f"{stage:<12} {sum(values) / len(captures):>9.2f} {max(values):>9.2f} "
+              f"{sum(values) / total:>7.1%}")
+
+
+def print_slowest(captures, top):
+    print(f"\n{'elapsed ms':>10}  {'reason':<8} {'source':<9} {'handler':<22} question")
+    for capture in sorted(captures, key=lambda c: -c['elapsed_ms'])[:top]:
+        print(f"{capture['elapsed_ms']:>10.1f}  {capture['reason']:<8} {capture['source']:<9} "
+              f"{capture['handler']:<22} {capture['question']}")
+
+
+def print_sampled(captures, top):
+    own, total = sampled_functions(captures)
+    if not own:
+        return
+    print(f"\nSampled stacks, {sum(sum(c['samples'].values()) for c in captures)} samples")
+    print(f"{'own ms':>9} {'total ms':>9}  function")
+    for key, ms in own.most_common(top):
+        print(f"{ms:>9.1f} {total[key]:>9.1f}  {short_name(key)}")
+
+
+def print_profiled(stats, count, top):
+    if stats is None:
+        return
+    print(f"\ncProfile, {count} questions")
+    print(f"{'calls':>9} {'own ms':>9} {'cum ms':>9}  function")
+    rows = sorted(stats.stats.items(), key=lambda item: -item[1][2])[:top]
+    for (path, line, name), (_, calls, own, cumulative, _) in rows:
+        print(f"{calls:>9} {own * 1000:>9.1f} {cumulative * 1000:>9.1f}  {short_name(f'{path}:{line}({name})')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dir', default=DEFAULT_DIR, help='каталог снимков')
+    parser.add_argument('--reason', choices=['sampled', 'slow'])
+    parser.add_argument('--handler', help='только вопросы этого обработчика')
+    parser.add_argument('--min-ms', type=float, default=0.0, help='только вопросы не быстрее')
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    # Каталог создается профилировщиком при первом снимке
+    if not os.path.isdir(args.dir):
+        print(f"No captures in {args.dir}")
+        return
+    captures = load_captures(args.dir, args.reason, args.handler, args.min_ms)
+    if not captures:
+        print(f"No captures in {args.dir}")
+        return
+    print_overview(captures)
+    print_slowest(captures, args.top)
+    print_sampled(captures, args.top)
+    profiled = [c for c in captures if c.get('profile')]
+    print_profiled(profiled_functions(args.dir, profiled), len(profiled), args.top)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,289 @@
+"""Асинхронный сервер вопросно-ответной системы на aiohttp.
+
+Маршруты совпадают с app/main.py. Анализ вопроса, онтология и морфология
+выполняются в ограниченном пуле потоков, запросы к Wikidata ожидаются
+асинхронно, поэтому медленный внешний сервис не занимает поток. Число
+одновременно обрабатываемых запросов ограничено; остальные ждут очереди.
+Компоненты контроллера загружаются в фоне после старта; GET /ready
+отвечает 503, пока прогрев не завершен.
+
+С --processes N главный процесс один раз загружает онтологию, индексы и
+кэш морфологии и порождает N воркеров через fork: неизменяемые данные
+остаются в общих страницах памяти. Обогащения каждый воркер пишет в общий
+журнал и подхватывает оттуда записи остальных.
+
+Запуск:
+    python app/server.py --port 8000 --workers 8 --max-requests 256
+    python app/server.py --port 8000 --processes 4
+"""
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import gc
+import json
+import logging
+import os
+import signal
+import socket
+
+from aiohttp import web
+
+from core.dialog_controller import DialogController
+from core.metrics import MetricsRegistry
+from settings import (BATCH_MAX_QUESTIONS, SERVER_MAX_REQUESTS, SERVER_PROCESSES, SERVER_WORKERS,
+                      config_path, ontology_path, settings, templates_dir)
+
+logger = logging.getLogger(__name__)
+
+
+class QAServer:
+    def __init__(self, controller, workers=None, max_requests=None):
+        self.controller = controller
+        self.workers = workers or SERVER_WORKERS
+        self.max_requests = max_requests or SERVER_MAX_REQUESTS
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='qa-worker')
+        self._slots = None
+
+    def make_app(self):
+        app = web.Application(middlewares=[self._limit])
+        app.router.add_get('/', self.index)
+        app.router.add_post('/ask', self.ask)
+        app.router.add_post('/ask/stream', self.ask_stream)
+        app.router.add_post('/ask/batch', self.ask_batch)
+        app.router.add_get('/search', self.search)
+        app.router.add_get('/stats', self.stats)
+        app.router.add_get('/metrics', self.metrics)
+        app.router.add_get('/ready', self.ready)
+        app.on_startup.append(self._on_startup)
+        app.on_cleanup.append(self._on_cleanup)
+        return app
+
+    async def _on_startup(self, app):
+        self._slots = asyncio.Semaphore(self.max_requests)
+        logger.info(f"QA server: {self.workers} workers, {self.max_requests} concurrent requests")
+
+    async def _on_cleanup(self, app):
+        self.executor.shutdown(wait=False)
+        self.controller.shutdown()
+
+    @web.middleware
+    async def _limit(self, request, handler):
+        async with self._slots:
+            return await handler(request)
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def index(self, request):
+        return web.FileResponse(os.path.join(templates_dir, 'index.html'))
+
+    async def ask(self, request):
+        question = (await request.post()).get('question', '').strip()
+        if not question:
+            return web.json_response({'error': 'Question cannot be empty'}, status=400)
+
+        try:
+            response = await self.controller.aprocess_question(question, self.executor)
+            logger.info(f"Q: {question} | A: {response}")
+            return self._json({'question': question, 'response': response})
+        except Exception as e:
+            logger.error(f"Error processing question: {str(e)}")
+            return self._json({'error': 'Internal server error', 'question': question}, status=500)
+
+    async def ask_stream(self, request):
+        question = (await request.post()).get('question', '').strip()
+        if not question:
+            return web.json_response({'error': 'Question cannot be empty'}, status=400)
+
+        response = await self._start_ndjson(request)
+        try:
+            async for event in self.controller.astream_question(question, self.executor):
+                await self._write_line(response, {'question': question, **event})
+        except Exception as e:
+            logger.error(f"Error streaming question: {str(e)}")
+            await self._write_line(response, {'question': question, 'event': 'error',
+                                              'error': 'Internal server error'})
+        await response.write_eof()
+        return response
+
+    async def ask_batch(self, request):
+        try:
+            payload = await request.json()
+        except ValueError:
+            payload = None
+        questions = payload.get('questions') if isinstance(payload, dict) else None
+        if not isinstance(questions, list) or not all(isinstance(q, str) for q in questions):
+            return web.json_response({'error': 'Expected JSON object with a list of questions'}, status=400)
+        if len(questions) > BATCH_MAX_QUESTIONS:
+            return web.json_response(
+                {'error': f'Too many questions, the limit is {BATCH_MAX_QUESTIONS}'}, status=413
+            )
+
+        questions = [q.strip() for q in questions]
+        logger.info(f"Batch: {len(questions)} questions")
+        positions = [i for i, q in enumerate(questions) if q]
+
+        async def results():
+            for i, q in enumerate(questions):
+                if not q:
+                    yield i, {'question': q, 'error': 'Question cannot be empty'}
+            async for index, result in self.controller.aiter_batch(
+                    [questions[i] for i in positions], self.executor):
+                yield positions[index], result
+
+        if request.query.get('stream') == '1':
+            response = await self._start_ndjson(request)
+            pending = set(range(len(questions)))
+            try:
+                async for index, result in results():
+                    pending.discard(index)
+                    await self._write_line(response, {'index': index, **result})
+            except Exception as e:
+                # Заголовки уже отправлены: ошибка сообщается строкой на каждый неотвеченный вопрос
+                logger.error(f"Error streaming batch: {str(e)}")
+                for index in sorted(pending):
+                    await self._write_line(response, {'index': index, 'question': questions[index],
+                                                      'error': 'Internal server error'})
+            await response.write_eof()
+            return response
+
+        try:
+            ordered = [None] * len(questions)
+            async for index, result in results():
+                ordered[index] = result
+        except Exception as e:
+            logger.error(f"Error processing batch: {str(e)}")
+            return web.json_response({'error': 'Internal server error'}, status=500)
+        return self._json({'results': ordered})
+
+    async def search(self, request):
+        term = request.query.get('q', '').strip()
+        if not term:
+            return self._json([])
+        try:
+            limit = min(int(request.query.get('limit', 10)), 50)
+        except ValueError:
+            limit = 10
+        prefix = request.query.get('prefix', '1') != '0'
+        results = await self._run(
+            lambda: self.controller.ontology.search_entities(term, limit=limit, prefix=prefix)
+        )
+        return self._json(results)
+
+    async def stats(self, request):
+        return self._json(self.controller.stats())
+
+    async def ready(self, request):
+        """Готовность к трафику для балансировщика: 503, пока идет прогрев"""
+        readiness = self.controller.readiness()
+        return self._json(readiness, status=200 if readiness['ready'] else 503)
+
+    async def metrics(self, request):
+        return web.Response(body=self.controller.metrics.render().encode('utf-8'),
+                            headers={'Content-Type': MetricsRegistry.CONTENT_TYPE})
+
+    @staticmethod
+    def _json(data, status=200):
+        return web.json_response(data, status=status, dumps=lambda d: json.dumps(d, ensure_ascii=False))
+
+    @staticmethod
+    async def _start_ndjson(request):
+        response = web.StreamResponse(headers={'Content-Type': 'application/x-ndjson; charset=utf-8'})
+        await response.prepare(request)
+        return response
+
+    @staticmethod
+    async def _write_line(response, event):
+        await response.write((json.dumps(event, ensure_ascii=False) + '\n').encode('utf-8'))
+
+
+def serve_forked(host, port, processes, workers=None, max_requests=None):
+    """Предзагрузка в главном процессе, затем fork воркеров на общий сокет
+
+    Упавший воркер перезапускается из той же подготовленной памяти.
+    """
+    controller = DialogController(ontology_path, config_path, settings, preload=True)
+    # Воркеры только дописывают журнал обогащений; слияние - здесь, пока их нет
+    if controller.enricher.needs_compaction():
+        controller.enricher.compact()
+        # Слияние не меняет содержимое онтологии: кэш ответов перезаписывается
+        # с новой версией RDF-файла, иначе при следующем запуске он будет отброшен
+        if os.path.exists(controller.answer_cache_path):
+            controller.save_answer_cache()
+    # Загруженные объекты выводятся из-под сборщика мусора: иначе его обход
+    # пишет в их заголовки и копирование при записи размножает страницы
+    gc.collect()
+    gc.freeze()
+
+    sock = socket.create_server((host, port), backlog=1024)
+    children = set()
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid:
+            children.add(pid)
+            return
+        status = 0
+        try:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            controller.start_services()
+            server = QAServer(controller, workers, max_requests)
+            web.run_app(server.make_app(), sock=sock, access_log=None, print=None)
+        except Exception:
+            logger.exception("Worker failed")
+            status = 1
+        finally:
+            logging.shutdown()
+            os._exit(status)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+
+    for _ in range(processes):
+        spawn()
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    logger.info(f"QA server on http://{host}:{port}: {processes} processes, pids {sorted(children)}")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        children.discard(pid)
+        if not stopping:
+            logger.warning(f"Worker {pid} exited with status {status}, restarting")
+            spawn()
+    sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--processes', type=int, default=SERVER_PROCESSES,
+                        help='процессов-воркеров с общей предзагруженной онтологией (0 - без fork)')
+    parser.add_argument('--workers', type=int, help='потоков для анализа и онтологии')
+    parser.add_argument('--max-requests', type=int, help='одновременно обрабатываемых запросов')
+    args = parser.parse_args()
+
+    if args.processes > 0:
+        if not hasattr(os, 'fork'):
+            parser.error('--processes requires os.fork')
+        logging.basicConfig(level=logging.INFO, format='%(process)d %(levelname)s:%(name)s:%(message)s')
+        serve_forked(args.host, args.port, args.processes, args.workers, args.max_requests)
+        return
+
+    logging.basicConfig(level=logging.INFO)
+    controller = DialogController(ontology_path, config_path, settings)
+    server = QAServer(controller, args.workers, args.max_requests)
+    web.run_app(server.make_app(), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == '__main__':
+    main()
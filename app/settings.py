@@ -0,0 +1,45 @@
+"""Пути к данным и настройки из переменных окружения, общие для серверов"""
+import os
+
+# Пути к файлам
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ontology_path = os.path.join(BASE_DIR, '..', 'data', 'ontology.rdf')
+config_path = os.path.join(BASE_DIR, '..', 'configs', 'patterns_config.json')
+templates_dir = os.path.join(BASE_DIR, 'templates')
+
+
+def env_number(name, cast=float):
+    value = os.environ.get(name)
+    return cast(value) if value else None
+
+
+# Настройки DialogController
+settings = {
+    'wikidata_endpoint': os.environ.get('WIKIDATA_ENDPOINT'),
+    'wikidata_timeout': env_number('WIKIDATA_TIMEOUT'),
+    'wikidata_max_concurrency': env_number('WIKIDATA_MAX_CONCURRENCY', int),
+    'breaker_failure_threshold': env_number('WIKIDATA_BREAKER_THRESHOLD', int),
+    'breaker_reset_timeout': env_number('WIKIDATA_BREAKER_RESET'),
+    'latency_budget': env_number('LATENCY_BUDGET'),
+    'answer_cache_size': env_number('ANSWER_CACHE_SIZE', int),
+    # Файл кэша ответов, заполняемый app/prewarm.py; по умолчанию рядом с онтологией
+    'answer_cache_path': os.environ.get('ANSWER_CACHE_FILE'),
+    # Процессов для сборки индексов онтологии, когда снимка нет или он устарел
+    'ontology_build_workers': env_number('ONTOLOGY_BUILD_WORKERS', int),
+    'wikidata_batch_size': env_number('WIKIDATA_BATCH_SIZE', int),
+    # Профилирование: доля вопросов под cProfile и порог медленного вопроса, секунд
+    'profile_sample_rate': env_number('PROFILE_SAMPLE_RATE'),
+    'profile_slow_threshold': env_number('PROFILE_SLOW_THRESHOLD'),
+    'profile_dir': os.environ.get('PROFILE_DIR'),
+    'profile_max_captures': env_number('PROFILE_MAX_CAPTURES', int),
+    'profile_interval': env_number('PROFILE_INTERVAL'),
+}
+
+# Максимум вопросов в одном запросе /ask/batch
+BATCH_MAX_QUESTIONS = env_number('BATCH_MAX_QUESTIONS', int) or 1000
+
+# Асинхронный сервер: потоки для анализа и онтологии, одновременные запросы
+SERVER_WORKERS = env_number('SERVER_WORKERS', int) or min(8, (os.cpu_count() or 1) + 2)
+SERVER_MAX_REQUESTS = env_number('SERVER_MAX_REQUESTS', int) or 256
+# Процессы-воркеры, разделяющие загруженную до fork онтологию; 0 - один процесс без fork
+SERVER_PROCESSES = env_number('SERVER_PROCESSES', int) or 0
@@ -0,0 +1,133 @@
+"""Методы доступа OntologyController: обход графа rdflib и скомпилированная таблица.
+
+Для каждого метода измеряется среднее время вызова по всем меткам онтологии;
+отдельно - память графа rdflib и таблицы атрибутов (tracemalloc при загрузке
+снимка) и их размер в снимке.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_getters.py --repeat 3
+"""
+import argparse
+import logging
+import os
+import pickle
+import re
+import sys
+import time
+import tracemalloc
+
+from rdflib import Literal
+from rdflib.namespace import RDFS
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'app'))
+
+from core.ontology_controller import OntologyController  # noqa: E402
+
+DEFAULT_ONTOLOGY = os.path.join(ROOT_DIR, 'data', 'ontology.rdf')
+
+
+def rdflib_getters(ontology):
+    """Прежние реализации: поиск URI и обход графа при каждом вызове"""
+    P = ontology.PREDICATES
+
+    def literals(name, key):
+        uri = ontology._find_uri_by_label(name)
+        return ontology._get_ru_literals(uri, P[key]) if uri else []
+
+    def first(name, key):
+        values = literals(name, key)
+        return values[0] if values else None
+
+    def definition(name):
+        uri = ontology._find_uri_by_label(name)
+        if not uri:
+            return None
+        definitions = ontology._get_ru_literals(uri, P['definition'])
+        if definitions:
+            return definitions[0]
+        comment = ontology._get_ru_comment(uri)
+        return re.split(r'[.!?]', comment)[0].strip() if comment else None
+
+    def steps(name):
+        result = []
+        for step in literals(name, 'algorithm'):
+            clean_step = re.sub(r'<!\[CDATA\[(.*?)\]\]>', r'\1', step, flags=re.DOTALL)
+            clean_step = re.sub(r'<[^>]+>', '', clean_step)
+            result.append(clean_step.strip())
+        return result
+
+    def subclasses(name):
+        uri = ontology._find_uri_by_label(name)
+        if not uri:
+            return []
+        labels = (ontology._get_ru_label(s) for s in ontology.graph.subjects(RDFS.subClassOf, uri))
+        return [label for label in labels if label]
+
+    def synonyms(name):
+        uri = ontology._find_uri_by_label(name)
+        if not uri:
+            return []
+        norm = ontology._normalize_label(name)
+        return [
+            str(label) for label in ontology.graph.objects(uri, RDFS.label)
+            if isinstance(label, Literal) and label.language == 'ru'
+            and ontology._normalize_label(str(label)) != norm
+        ]
+
+    return {
+        'get_definition': definition,
+        'get_algorithm_steps': steps,
+        'get_applications': lambda name: literals(name, 'application'),
+        'get_authors': lambda name: literals(name, 'author'),
+        'get_complexity': lambda name: first(name, 'complexity'),
+        'get_subclasses': subclasses,
+        'get_synonyms': synonyms,
+    }
+
+
+def measure(getter, names, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for name in names:
+            getter(name)
+        elapsed = (time.perf_counter() - start) / len(names)
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def traced(factory):
+    tracemalloc.start()
+    value = factory()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return value, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ontology', default=DEFAULT_ONTOLOGY)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    ontology = OntologyController(args.ontology)
+    names = sorted(ontology.label_index.labels())
+
+    print(f"{'method':<22}{'rdflib':>12}{'table':>12}{'speedup':>10}")
+    for method, old in rdflib_getters(ontology).items():
+        new = getattr(ontology, method)
+        old_time, new_time = measure(old, names, args.repeat), measure(new, names, args.repeat)
+        print(f"{method:<22}{old_time * 1e6:>9.1f} us{new_time * 1e6:>9.1f} us{old_time / new_time:>9.1f}x")
+
+    graph_bytes, table_bytes = pickle.dumps(ontology.graph), pickle.dumps(ontology.entities)
+    _, graph_memory = traced(lambda: pickle.loads(graph_bytes))
+    _, table_memory = traced(lambda: pickle.loads(table_bytes))
+    print(f"\n{'':<22}{'memory':>12}{'snapshot':>12}")
+    print(f"{'rdflib graph':<22}{graph_memory / 2 ** 20:>9.1f} MB{len(graph_bytes) / 2 ** 20:>9.1f} MB")
+    print(f"{'entity table':<22}{table_memory / 2 ** 20:>9.1f} MB{len(table_bytes) / 2 ** 20:>9.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
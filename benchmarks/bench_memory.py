@@ -0,0 +1,130 @@
+"""Память воркеров: N независимых процессов против предзагрузки и fork
+
+Для каждого N запускает app/server.py двумя способами, прогоняет по
+несколько вопросов через каждый воркер и читает /proc/<pid>/smaps_rollup:
+RSS (включая общие страницы), USS (только собственные страницы) и PSS
+(общие страницы поделены между процессами; сумма PSS - реальный расход).
+Только Linux.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_memory.py --processes 1 4 16
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER = os.path.join(ROOT, 'app', 'server.py')
+QUESTIONS = ['что такое матрица', 'перечисли подклассы матрицы', 'синонимы аргумента',
+             'что такое квадратная матрица', 'предки нулевой матрицы']
+
+
+def memory(pid):
+    """RSS, PSS и USS процесса в МБ"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return {
+        'rss': values['Rss'],
+        'pss': values['Pss'],
+        'uss': values['Private_Clean'] + values['Private_Dirty'],
+    }
+
+
+def children_of(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(p) for p in f.read().split()]
+
+
+def wait_ready(url, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url + '/stats', timeout=2).read()
+            return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError(f'{url} did not start in {timeout} s')
+
+
+def drive(url, requests):
+    for i in range(requests):
+        data = urllib.parse.urlencode({'question': QUESTIONS[i % len(QUESTIONS)]}).encode()
+        urllib.request.urlopen(url + '/ask', data=data, timeout=30).read()
+
+
+def start(args, port, extra=()):
+    return subprocess.Popen(
+        [sys.executable, SERVER, '--host', '127.0.0.1', '--port', str(port), *extra],
+        cwd=os.path.join(ROOT, 'app'), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def stop(procs):
+    for proc in procs:
+        proc.terminate()
+    for proc in procs:
+        proc.wait(30)
+
+
+def measure_independent(args, n):
+    procs = [start(args, args.port + i) for i in range(n)]
+    try:
+        for i in range(n):
+            wait_ready(f'http://127.0.0.1:{args.port + i}', args.startup_timeout)
+        for i in range(n):
+            drive(f'http://127.0.0.1:{args.port + i}', args.requests)
+        return [memory(proc.pid) for proc in procs], None
+    finally:
+        stop(procs)
+
+
+def measure_forked(args, n):
+    proc = start(args, args.port, ('--processes', str(n)))
+    url = f'http://127.0.0.1:{args.port}'
+    try:
+        wait_ready(url, args.startup_timeout)
+        deadline = time.monotonic() + args.startup_timeout
+        while len(children_of(proc.pid)) < n and time.monotonic() < deadline:
+            time.sleep(0.5)
+        # Соединения распределяет ядро: запросов хватает, чтобы задеть каждый воркер
+        drive(url, args.requests * n)
+        return [memory(pid) for pid in children_of(proc.pid)], memory(proc.pid)
+    finally:
+        stop([proc])
+
+
+def report(mode, n, workers, master):
+    total_pss = sum(w['pss'] for w in workers) + (master['pss'] if master else 0)
+    avg = {key: sum(w[key] for w in workers) / len(workers) for key in ('rss', 'uss', 'pss')}
+    print(f"{mode:<12} {n:>3}  {avg['rss']:>8.1f}  {avg['uss']:>8.1f}  {avg['pss']:>8.1f}  {total_pss:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--requests', type=int, default=20, help='вопросов на воркер до замера')
+    parser.add_argument('--port', type=int, default=8100)
+    parser.add_argument('--startup-timeout', type=float, default=600.0)
+    parser.add_argument('--modes', nargs='+', default=['independent', 'forked'])
+    args = parser.parse_args()
+
+    print(f"{'mode':<12} {'N':>3}  {'RSS/w':>8}  {'USS/w':>8}  {'PSS/w':>8}  {'total MB':>9}")
+    for n in args.processes:
+        if 'independent' in args.modes:
+            workers, master = measure_independent(args, n)
+            report('independent', n, workers, master)
+        if 'forked' in args.modes:
+            workers, master = measure_forked(args, n)
+            report('forked', n, workers, master)
+
+
+if __name__ == '__main__':
+    main()
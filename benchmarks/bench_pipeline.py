@@ -0,0 +1,318 @@
+"""Бенчмарк всех этапов вопросно-ответного конвейера с сохранением и сравнением результатов.
+
+Этапы измеряются по отдельности на корпусе из question_corpus.py:
+    analyze         QuestionHandler.analyze_question
+    ontology        метод OntologyController для обработчика вопроса
+    response        ResponseBuilder.build_response
+    wikidata        запрос WikidataConnector к заглушке с задержкой --latency
+                    (без кэша, все запросы корпуса одновременно)
+    pipeline        DialogController.process_question, пустой кэш ответов
+    pipeline_cached повторный проход: ответы из кэша
+Для каждого этапа - число вызовов, пропускная способность и p50/p95/p99;
+каждая метрика - лучшая из --repeat прогонов. Конвейер каждый раз работает
+с новой копией онтологии во временном каталоге: прогоны не влияют друг на
+друга, обогащения не попадают в data/.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_pipeline.py --save baseline.json
+    # после изменения конфигурации или онтологии
+    python benchmarks/bench_pipeline.py --baseline baseline.json
+Код возврата 1, если у какого-либо этапа p50 или пропускная способность
+хуже базовых больше чем на --threshold; p95/p99 выводятся, но на результат
+не влияют - на коротких этапах они слишком шумные.
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'app'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'benchmarks'))
+
+from core.dialog_controller import DialogController  # noqa: E402
+from core.wikidata_connector import WikidataConnector  # noqa: E402
+from fake_sparql_server import FakeSparqlServer, start_in_thread  # noqa: E402
+from question_corpus import CorpusGenerator, load_corpus  # noqa: E402
+
+DEFAULT_CONFIG = os.path.join(ROOT_DIR, 'configs', 'patterns_config.json')
+DEFAULT_ONTOLOGY = os.path.join(ROOT_DIR, 'data', 'ontology.rdf')
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values, q):
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * q / 100))
+    return sorted_values[index]
+
+
+def summarize(timings, elapsed=None):
+    """Сводка по этапу; elapsed - время прохода, если вызовы шли параллельно"""
+    values = sorted(timings)
+    total = elapsed if elapsed is not None else sum(values)
+    result = {
+        'count': len(values),
+        'throughput': len(values) / total if total else 0.0,
+        'mean_us': sum(values) / len(values) * 1e6,
+    }
+    for q in PERCENTILES:
+        result[f'p{q}_us'] = percentile(values, q) * 1e6
+    return result
+
+
+def best_of(runs):
+    """Лучшее значение каждой метрики по повторам: меньше шума от планировщика и GC"""
+    best = dict(runs[0])
+    for run in runs[1:]:
+        for key, value in run.items():
+            if key == 'throughput':
+                best[key] = max(best[key], value)
+            elif key != 'count':
+                best[key] = min(best[key], value)
+    return best
+
+
+def timed_calls(func, items):
+    gc.collect()
+    timings, results = [], []
+    for item in items:
+        start = time.perf_counter()
+        results.append(func(item))
+        timings.append(time.perf_counter() - start)
+    return timings, results
+
+
+def isolated_copy(ontology_path, directory):
+    """Копия онтологии и ее снимка: конвейер пишет кэш и журнал обогащений рядом с ней"""
+    target = os.path.join(directory, os.path.basename(ontology_path))
+    for suffix in ('', '.snapshot'):
+        if os.path.exists(ontology_path + suffix):
+            shutil.copy2(ontology_path + suffix, target + suffix)
+    return target
+
+
+def make_controller(args, endpoint, directory):
+    # Прогрев морфологии до замеров, а не фоновым потоком во время них
+    controller = DialogController(isolated_copy(args.ontology, directory), args.config,
+                                  {'wikidata_endpoint': endpoint}, preload=True)
+    controller.start_services()
+    return controller
+
+
+def bench_local_stages(controller, corpus, repeat):
+    """analyze, ontology и response на вопросах корпуса"""
+    questions = [item['question'] for item in corpus]
+    # Прогон без замера: кэши морфологии и ленивые индексы заполняются один раз
+    for question in questions:
+        controller.question_handler.analyze_question(question)
+
+    runs = [local_stages(controller, questions) for _ in range(repeat)]
+    return {name: best_of([run[name] for run in runs]) for name in runs[0]}
+
+
+def local_stages(controller, questions):
+    analyze, analyzed = timed_calls(controller.question_handler.analyze_question, questions)
+    answerable = []
+    for handler_data in analyzed:
+        method_name = controller.HANDLER_MAP.get(handler_data['handler'])
+        if method_name:
+            answerable.append((getattr(controller.ontology, method_name), handler_data))
+
+    ontology, data = timed_calls(lambda pair: controller._call_ontology(*pair), answerable)
+    response, _ = timed_calls(
+        lambda pair: controller.response_builder.build_response(*pair),
+        [(handler_data, value) for (_, handler_data), value in zip(answerable, data)],
+    )
+    return {
+        'analyze': summarize(analyze),
+        'ontology': summarize(ontology),
+        'response': summarize(response),
+    }
+
+
+def bench_wikidata(endpoint, corpus, controller, repeat):
+    """Параллельные запросы к заглушке Wikidata без кэша"""
+    handler_data = [
+        controller.question_handler.analyze_question(item['question'])
+        for item in corpus if item['kind'] == 'unknown'
+    ]
+    handler_data = [h for h in handler_data if h['handler'] != 'default']
+    if not handler_data:
+        return None
+    connector = WikidataConnector(endpoint=endpoint, max_concurrency=len(handler_data))
+
+    async def timed(handler, lemma):
+        start = time.perf_counter()
+        await connector.aquery(handler, lemma)
+        return time.perf_counter() - start
+
+    runs = []
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            futures = [connector.submit(timed(h['handler'], h['focus_lemma'])) for h in handler_data]
+            timings = [future.result() for future in futures]
+            runs.append(summarize(timings, time.perf_counter() - start))
+    finally:
+        connector.close()
+    return best_of(runs)
+
+
+def bench_pipeline(args, endpoint, corpus):
+    """Конвейер целиком: новый контроллер на каждый повтор, затем проход по кэшу ответов"""
+    questions = [item['question'] for item in corpus]
+    cold_runs, cached_runs = [], []
+    for _ in range(args.repeat):
+        with tempfile.TemporaryDirectory() as directory:
+            controller = make_controller(args, endpoint, directory)
+            try:
+                cold, _ = timed_calls(controller.process_question, questions)
+                controller.enrichment_queue.flush()
+                cached, _ = timed_calls(controller.process_question, questions)
+            finally:
+                controller.shutdown()
+        cold_runs.append(summarize(cold))
+        cached_runs.append(summarize(cached))
+    return {'pipeline': best_of(cold_runs), 'pipeline_cached': best_of(cached_runs)}
+
+
+def by_type(controller, corpus):
+    """Локальные этапы вместе (анализ, онтология, ответ) по типам вопросов"""
+    groups = {}
+    for item in corpus:
+        groups.setdefault(item['type'] or 'unmatched', []).append(item['question'])
+
+    def local(question):
+        item = controller._resolve_locally(question)
+        if item['answer'] is None:
+            controller.response_builder.build_response(item['handler_data'], item['data'])
+
+    results = {}
+    for name, questions in sorted(groups.items()):
+        controller.answer_cache.clear()
+        timings, _ = timed_calls(local, questions)
+        results[name] = summarize(timings)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_stages(stages):
+    print(f"{'stage':<24}{'count':>7}{'ops/s':>11}{'mean':>10}" + ''.join(f"{'p%d' % q:>10}" for q in PERCENTILES))
+    for name, s in stages.items():
+        print(f"{name:<24}{s['count']:>7}{s['throughput']:>11.1f}{s['mean_us']:>8.0f}us"
+              + ''.join(f"{s[f'p{q}_us']:>8.0f}us" for q in PERCENTILES))
+
+
+def compare(stages, baseline, threshold):
+    """Изменение метрик относительно базового прогона; возвращает список регрессий"""
+    regressions = []
+    print(f"\n{'stage':<24}{'ops/s':>10}{'p50':>10}{'p95':>10}{'p99':>10}   vs {baseline['meta'].get('revision')}")
+    for name, s in stages.items():
+        base = baseline['stages'].get(name)
+        if not base:
+            print(f"{name:<24}{'new':>10}")
+            continue
+        # Для пропускной способности рост - улучшение, для задержек - ухудшение
+        changes = [s['throughput'] / base['throughput'] - 1 if base['throughput'] else 0.0]
+        changes += [s[f'p{q}_us'] / base[f'p{q}_us'] - 1 if base[f'p{q}_us'] else 0.0 for q in PERCENTILES]
+        slower = -changes[0] > threshold or changes[1] > threshold
+        print(f"{name:<24}" + ''.join(f"{c * 100:>+9.1f}%" for c in changes) + ('   REGRESSION' if slower else ''))
+        if slower:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--config', default=DEFAULT_CONFIG)
+    parser.add_argument('--ontology', default=DEFAULT_ONTOLOGY)
+    parser.add_argument('--corpus', help='JSONL-корпус; по умолчанию генерируется')
+    parser.add_argument('--size', type=int, default=1000)
+    parser.add_argument('--unknown-rate', type=float, default=0.15)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency', type=float, default=0.02, help='задержка заглушки Wikidata, секунд')
+    parser.add_argument('--repeat', type=int, default=5, help='прогонов каждого этапа')
+    parser.add_argument('--stages', nargs='+', default=['local', 'wikidata', 'pipeline'],
+                        choices=['local', 'wikidata', 'pipeline'])
+    parser.add_argument('--by-type', action='store_true', help='локальные этапы по типам вопросов')
+    parser.add_argument('--save', help='записать результаты в JSON')
+    parser.add_argument('--baseline', help='сравнить с сохраненными результатами')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='допустимое ухудшение p50 и пропускной способности')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    server = FakeSparqlServer(latency=args.latency, seed=args.seed)
+    endpoint = start_in_thread(server)
+
+    with tempfile.TemporaryDirectory() as directory:
+        controller = make_controller(args, endpoint, directory)
+        try:
+            if args.corpus:
+                corpus = load_corpus(args.corpus)
+            else:
+                generator = CorpusGenerator(args.config, controller.ontology.label_index.labels(), args.seed)
+                corpus = generator.generate(args.size, args.unknown_rate)
+
+            stages = {}
+            if 'local' in args.stages:
+                stages.update(bench_local_stages(controller, corpus, args.repeat))
+            if 'wikidata' in args.stages:
+                wikidata = bench_wikidata(endpoint, corpus, controller, args.repeat)
+                if wikidata:
+                    stages['wikidata'] = wikidata
+            types = by_type(controller, corpus) if args.by_type else None
+        finally:
+            controller.shutdown()
+    if 'pipeline' in args.stages:
+        stages.update(bench_pipeline(args, endpoint, corpus))
+
+    kinds = {kind: sum(1 for item in corpus if item['kind'] == kind) for kind in ('known', 'unknown', 'unmatched')}
+    print(f"corpus: {len(corpus)} questions {kinds}, wikidata latency {args.latency * 1000:.0f} ms\n")
+    print_stages(stages)
+    if types:
+        print()
+        print_stages(types)
+
+    result = {
+        'meta': {
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'corpus': args.corpus or f'generated size={args.size} seed={args.seed}',
+            'questions': len(corpus),
+            'latency': args.latency,
+            'repeat': args.repeat,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'stages': stages,
+        'types': types,
+    }
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\nresults saved to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(stages, baseline, args.threshold)
+        if regressions:
+            print(f"\nslower than baseline by more than {args.threshold * 100:.0f}%: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""Сравнение поиска шаблона вопроса: последовательный перебор и индексы QuestionHandler.
+
+Сравниваются regex-этап (перебор шаблонов и объединенный матчер) и этап
+ключевых слов с нечетким поиском (перебор и KeywordIndex/FuzzyIndex) на
+синтетическом наборе шаблонов с ключевыми словами.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_question_handler.py --questions 20000 --keyword-patterns 500
+"""
+from difflib import get_close_matches
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'app'))
+
+from core.question_handler import QuestionHandler  # noqa: E402
+from core.keyword_index import KeywordIndex, FuzzyIndex  # noqa: E402
+
+DEFAULT_CONFIG = os.path.join(ROOT_DIR, 'configs', 'patterns_config.json')
+TERMS = ['матрица', 'метод гаусса', 'производная', 'интеграл римана', 'теорема пифагора',
+         'ряд фурье', 'градиентный спуск', 'векторное пространство', 'определитель']
+UNMATCHED = ['расскажи анекдот', 'какая сегодня погода', 'привет', 'сколько времени']
+
+
+def build_corpus(handler, size, seed=0):
+    """Вопросы по всем regex-шаблонам конфигурации и доля вопросов без совпадений"""
+    rng = random.Random(seed)
+    templates = [p['regex'].pattern for p in handler.patterns if p['mode'] == 'regex']
+    corpus = []
+    for _ in range(size):
+        if rng.random() < 0.1:
+            corpus.append(rng.choice(UNMATCHED))
+            continue
+        question = rng.choice(templates)
+        while '(.*)' in question:
+            question = question.replace('(.*)', rng.choice(TERMS), 1)
+        corpus.append(question)
+    return [handler._normalize_text(q) for q in corpus]
+
+
+def match_linear(handler, normalized):
+    for pattern in handler.patterns:
+        if pattern['mode'] == 'regex':
+            match = pattern['regex'].match(normalized)
+            if match:
+                return pattern['type'], match.group(1).strip()
+    return None
+
+
+def match_combined(handler, normalized):
+    found = handler._match_pattern(normalized)
+    if found:
+        pattern, focus, _ = found
+        return pattern['type'], focus.strip()
+    return None
+
+
+def keyword_linear(keyword_sets, normalized):
+    for i, keywords in enumerate(keyword_sets):
+        if all(kw in normalized for kw in keywords):
+            return i
+    for i, keywords in enumerate(keyword_sets):
+        if get_close_matches(normalized, [" ".join(keywords)], n=1, cutoff=0.6):
+            return i
+    return None
+
+
+def keyword_indexed(indexes, normalized):
+    keyword_index, fuzzy_index = indexes
+    index = keyword_index.first_match(normalized)
+    return index if index is not None else fuzzy_index.first_match(normalized)
+
+
+def build_keyword_sets(handler, count, seed=0):
+    """Наборы ключевых слов из слов regex-шаблонов и терминов"""
+    rng = random.Random(seed)
+    vocabulary = sorted({
+        word for p in handler.patterns if p['mode'] == 'regex'
+        for word in re.findall(r'\w+', p['regex'].pattern)
+    } | {word for term in TERMS for word in term.split()})
+    return [rng.sample(vocabulary, rng.randint(1, 3)) for _ in range(count)]
+
+
+def timed(func, handler, corpus):
+    start = time.perf_counter()
+    results = [func(handler, q) for q in corpus]
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--config', default=DEFAULT_CONFIG)
+    parser.add_argument('--questions', type=int, default=20000)
+    parser.add_argument('--keyword-patterns', type=int, default=500)
+    args = parser.parse_args()
+
+    handler = QuestionHandler(args.config)
+    corpus = build_corpus(handler, args.questions)
+    regex_count = sum(1 for p in handler.patterns if p['mode'] == 'regex')
+
+    linear_time, linear = timed(match_linear, handler, corpus)
+    combined_time, combined = timed(match_combined, handler, corpus)
+    mismatches = sum(1 for a, b in zip(linear, combined) if a != b)
+
+    print(f"patterns: {regex_count}, questions: {len(corpus)}")
+    print(f"linear     {linear_time / len(corpus) * 1e6:8.2f} us/question")
+    print(f"combined   {combined_time / len(corpus) * 1e6:8.2f} us/question")
+    print(f"speedup    x{linear_time / combined_time:.1f}, mismatches: {mismatches}")
+
+    # Этап ключевых слов: вопросы без совпадения regex - медленный путь
+    keyword_sets = build_keyword_sets(handler, args.keyword_patterns)
+    indexes = (KeywordIndex(keyword_sets), FuzzyIndex([" ".join(k) for k in keyword_sets]))
+    misses = [q for q, r in zip(corpus, combined) if r is None][:2000]
+    misses += [" ".join(k) for k in keyword_sets[:200]]
+    linear_time, linear = timed(keyword_linear, keyword_sets, misses)
+    indexed_time, indexed = timed(keyword_indexed, indexes, misses)
+    mismatches = sum(1 for a, b in zip(linear, indexed) if a != b)
+
+    print(f"keyword patterns: {len(keyword_sets)}, questions: {len(misses)}")
+    print(f"linear     {linear_time / len(misses) * 1e6:8.2f} us/question")
+    print(f"indexed    {indexed_time / len(misses) * 1e6:8.2f} us/question")
+    print(f"speedup    x{linear_time / indexed_time:.1f}, mismatches: {mismatches}")
+
+    # Стоимость полного промаха: вопрос не подходит ни под один шаблон
+    full_misses = [q for q, r in zip(misses, linear) if r is None] or misses
+    linear_time, _ = timed(keyword_linear, keyword_sets, full_misses)
+    indexed_time, _ = timed(keyword_indexed, indexes, full_misses)
+    print(f"full miss  linear {linear_time / len(full_misses) * 1e6:.2f} us, "
+          f"indexed {indexed_time / len(full_misses) * 1e6:.2f} us ({len(full_misses)} questions)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Сравнение поиска сущностей: полный перебор меток и SearchIndex.
+
+Запросы - префиксы разной длины от случайных меток онтологии, как при
+наборе в поле автодополнения.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_search.py --queries 500 --limit 10
+"""
+import argparse
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+
+from rdflib.namespace import RDF, OWL
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'app'))
+
+from core.ontology_controller import OntologyController  # noqa: E402
+
+DEFAULT_ONTOLOGY = os.path.join(ROOT_DIR, 'data', 'ontology.rdf')
+
+
+def search_linear(ontology, search_term):
+    """Прежняя реализация search_entities: перебор всех ключей индекса меток"""
+    search_term = search_term.lower()
+    results = []
+    for norm_label, uris in ontology.label_index.items():
+        if search_term in norm_label:
+            for uri in uris:
+                label = ontology._get_ru_label(uri)
+                if label:
+                    results.append({
+                        'uri': str(uri),
+                        'label': label,
+                        'type': 'Class' if (uri, RDF.type, OWL.Class) in ontology.graph else 'Property'
+                    })
+    return results
+
+
+def make_queries(ontology, count, seed):
+    rng = random.Random(seed)
+    labels = sorted(ontology.label_index.labels())
+    queries = []
+    for _ in range(count):
+        label = rng.choice(labels)
+        queries.append(label[:rng.randint(1, min(len(label), 12))].strip())
+    return queries
+
+
+def measure(search, queries):
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(name, timings):
+    timings = sorted(timings)
+    p99 = timings[int(len(timings) * 0.99) - 1]
+    print(f"{name:<16} median={statistics.median(timings) * 1e6:9.1f} us  "
+          f"p99={p99 * 1e6:9.1f} us  max={timings[-1] * 1e6:9.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ontology', default=DEFAULT_ONTOLOGY)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    ontology = OntologyController(args.ontology)
+    start = time.perf_counter()
+    size = len(ontology.search_index)
+    print(f"index build      {(time.perf_counter() - start) * 1000:.1f} ms, {size} labels")
+
+    queries = make_queries(ontology, args.queries, args.seed)
+
+    mismatches = sum(
+        {r['uri'] for r in search_linear(ontology, q)} != {r['uri'] for r in ontology.search_entities(q)}
+        for q in queries
+    )
+    print(f"mismatches       {mismatches}")
+
+    linear = measure(lambda q: search_linear(ontology, q), queries)
+    indexed = measure(lambda q: ontology.search_entities(q), queries)
+    top_k = measure(lambda q: ontology.search_entities(q, limit=args.limit), queries)
+    prefix = measure(lambda q: ontology.search_entities(q, limit=args.limit, prefix=True), queries)
+
+    report('linear', linear)
+    report('indexed', indexed)
+    report(f'indexed top-{args.limit}', top_k)
+    report(f'prefix top-{args.limit}', prefix)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""Сравнение времени холодного старта OntologyController: разбор RDF/XML и загрузка снимка.
+
+С --workers дополнительно измеряется сборка индексов без снимка при разном
+числе процессов, с --controller - холодный старт DialogController: импорт,
+конструктор, готовность (is_ready) и первый ответ из онтологии в режимах
+lazy, background (по умолчанию у серверов) и preload. Каждый такой замер -
+отдельный процесс: кэши морфологии и загруженные словари не переходят из
+одного замера в другой.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_startup.py --repeat 5
+    python benchmarks/bench_startup.py --repeat 3 --workers 1 2 4 8
+    python benchmarks/bench_startup.py --repeat 5 --controller
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'app'))
+
+DEFAULT_ONTOLOGY = os.path.join(ROOT_DIR, 'data', 'ontology.rdf')
+DEFAULT_CONFIG = os.path.join(ROOT_DIR, 'configs', 'patterns_config.json')
+CONTROLLER_MODES = ('lazy', 'background', 'preload')
+# Ответ из онтологии: первый вопрос не идет в Wikidata
+FIRST_QUESTION = 'что такое метод жордана'
+
+
+def measure(factory, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        factory()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(name, timings):
+    print(f"{name:<12} median={statistics.median(timings) * 1000:8.1f} ms  "
+          f"min={min(timings) * 1000:8.1f} ms  max={max(timings) * 1000:8.1f} ms")
+
+
+def build_once(ontology, workers):
+    """Сборка без снимка в этом процессе: время этапов в JSON на stdout"""
+    from core.ontology_controller import OntologyController
+
+    start = time.perf_counter()
+    controller = OntologyController(ontology, use_snapshot=False, build_workers=workers)
+    controller.build_secondary_indexes()
+    timings = dict(controller.load_timings, total=time.perf_counter() - start)
+    print(json.dumps(timings))
+
+
+def measure_build(ontology, workers, repeat):
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--ontology', ontology, '--build-once', str(workers)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        runs.append(json.loads(output.splitlines()[-1]))
+    return {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+
+def controller_once(ontology, mode):
+    """Холодный старт DialogController в этом процессе: время этапов в JSON на stdout"""
+    started = time.perf_counter()
+    from core.dialog_controller import DialogController
+    timings = {'import': time.perf_counter() - started}
+    # Только импорт, без обращения к Wikidata: aiohttp загружается лениво
+    timings['aiohttp_imported'] = 'aiohttp' in sys.modules
+
+    started = time.perf_counter()
+    controller = DialogController(ontology, DEFAULT_CONFIG, preload=mode == 'preload', lazy=mode == 'lazy')
+    timings['init'] = time.perf_counter() - started
+    if mode != 'lazy':
+        controller.wait_ready()
+        timings['ready'] = time.perf_counter() - started
+
+    first = time.perf_counter()
+    controller.process_question(FIRST_QUESTION)
+    timings['first_answer'] = time.perf_counter() - first
+    print(json.dumps(timings))
+    # Фоновые потоки и соединения не нужны: замер окончен
+    os._exit(0)
+
+
+def measure_controller(ontology, mode, repeat):
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--ontology', ontology, '--controller-once', mode],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        runs.append(json.loads(output.splitlines()[-1]))
+    return {key: statistics.median(run.get(key, 0) for run in runs) for key in ('import', 'init', 'ready',
+                                                                               'first_answer')}, runs[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ontology', default=DEFAULT_ONTOLOGY)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--workers', type=int, nargs='+', help='процессов для сборки индексов без снимка')
+    parser.add_argument('--controller', action='store_true', help='холодный старт DialogController')
+    parser.add_argument('--build-once', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--controller-once', choices=CONTROLLER_MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.build_once:
+        build_once(args.ontology, args.build_once)
+        return
+    if args.controller_once:
+        controller_once(args.ontology, args.controller_once)
+        return
+
+    # Импорт здесь, а не в начале модуля: --controller-once замеряет его сам
+    from core.ontology_controller import OntologyController
+
+    # Прогрев: гарантирует наличие актуального снимка
+    OntologyController(args.ontology)
+
+    parse = measure(lambda: OntologyController(args.ontology, use_snapshot=False), args.repeat)
+    snapshot = measure(lambda: OntologyController(args.ontology), args.repeat)
+
+    report('rdf/xml', parse)
+    report('snapshot', snapshot)
+    print(f"speedup      x{statistics.median(parse) / statistics.median(snapshot):.1f}")
+
+    if args.workers:
+        print(f"\nBuild without snapshot, median of {args.repeat} processes (cpu count {os.cpu_count()}), ms")
+        stages = ('parse', 'indexes', 'hierarchy', 'search_index', 'total')
+        print(f"{'workers':>7}  " + '  '.join(f'{stage:>12}' for stage in stages))
+        for workers in args.workers:
+            timings = measure_build(args.ontology, workers, args.repeat)
+            print(f"{workers:>7}  " + '  '.join(f'{timings[stage] * 1000:>12.1f}' for stage in stages))
+
+    if args.controller:
+        print(f"\nDialogController cold start, median of {args.repeat} processes, ms")
+        stages = ('import', 'init', 'ready', 'first_answer')
+        print(f"{'mode':>10}  " + '  '.join(f'{stage:>12}' for stage in stages) + '  aiohttp on import')
+        for mode in CONTROLLER_MODES:
+            timings, sample = measure_controller(args.ontology, mode, args.repeat)
+            print(f"{mode:>10}  " + '  '.join(f'{timings[stage] * 1000:>12.1f}' for stage in stages)
+                  + f"  {'yes' if sample['aiohttp_imported'] else 'no':>17}")
+
+
+if __name__ == '__main__':
+    main()
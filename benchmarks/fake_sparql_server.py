@@ -0,0 +1,122 @@
+"""Локальная замена SPARQL-endpoint Wikidata для тестов и бенчмарков.
+
+Отвечает заготовленным JSON в формате SPARQL results: для каждой переменной
+из SELECT возвращается значение вида "<переменная> <метка>", для пакетных
+запросов с VALUES ?label - по строке на каждую метку. Задержка, доля пустых
+ответов и доля ошибок настраиваются.
+
+Запуск:
+    python benchmarks/fake_sparql_server.py --port 8890 --latency 0.2
+    WIKIDATA_ENDPOINT=http://127.0.0.1:8890/sparql python app/main.py
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import threading
+
+from aiohttp import web
+
+SELECT_RE = re.compile(r'SELECT\s+(.*?)\s+WHERE', re.IGNORECASE | re.DOTALL)
+LABEL_RE = re.compile(r'rdfs:label\s+"([^"]*)"@ru')
+VALUES_RE = re.compile(r'VALUES\s+\?label\s*\{(.*?)\}', re.DOTALL)
+VALUE_LABEL_RE = re.compile(r'"([^"]*)"@ru')
+
+
+class FakeSparqlServer:
+    def __init__(self, latency=0.0, jitter=0.0, empty_rate=0.0, error_rate=0.0,
+                 responses=None, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.empty_rate = empty_rate
+        self.error_rate = error_rate
+        self.responses = responses or {}  # метка -> готовый список bindings
+        self.random = random.Random(seed)
+        self.requests = 0
+
+    def _bindings(self, query):
+        match = SELECT_RE.search(query)
+        variables = re.findall(r'\?(\w+)', match.group(1)) if match else []
+        values = VALUES_RE.search(query)
+        labels = VALUE_LABEL_RE.findall(values.group(1)) if values else LABEL_RE.findall(query)[:1]
+
+        bindings = []
+        for label in labels:
+            if label in self.responses:
+                bindings.extend(self.responses[label])
+                continue
+            if self.random.random() < self.empty_rate:
+                continue
+            row = {var: {'type': 'literal', 'value': f"{var} {label}"} for var in variables}
+            if values:
+                row['label'] = {'type': 'literal', 'value': label, 'xml:lang': 'ru'}
+            bindings.append(row)
+        return variables, bindings
+
+    async def handle(self, request):
+        self.requests += 1
+        if request.method == 'POST':
+            query = (await request.post()).get('query', '')
+        else:
+            query = request.query.get('query', '')
+
+        delay = self.latency + self.random.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.random.random() < self.error_rate:
+            return web.Response(status=503, text='Service Unavailable')
+
+        variables, bindings = self._bindings(query)
+        body = {'head': {'vars': variables}, 'results': {'bindings': bindings}}
+        return web.Response(text=json.dumps(body, ensure_ascii=False),
+                            content_type='application/sparql-results+json')
+
+    def make_app(self):
+        app = web.Application()
+        app.router.add_route('*', '/sparql', self.handle)
+        return app
+
+
+def start_in_thread(server, host='127.0.0.1', port=0):
+    """Запускает сервер в фоновом потоке и возвращает URL endpoint"""
+    ready = threading.Event()
+    state = {}
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        runner = web.AppRunner(server.make_app(), access_log=None)
+        loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, host, port)
+        loop.run_until_complete(site.start())
+        state['port'] = site._server.sockets[0].getsockname()[1]
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, name='fake-sparql', daemon=True).start()
+    ready.wait()
+    return f"http://{host}:{state['port']}/sparql"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8890)
+    parser.add_argument('--latency', type=float, default=0.0, help='задержка ответа, секунд')
+    parser.add_argument('--jitter', type=float, default=0.0, help='случайная добавка к задержке')
+    parser.add_argument('--empty-rate', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--responses', help='JSON-файл: метка -> список bindings')
+    args = parser.parse_args()
+
+    responses = None
+    if args.responses:
+        with open(args.responses, encoding='utf-8') as f:
+            responses = json.load(f)
+    server = FakeSparqlServer(args.latency, args.jitter, args.empty_rate, args.error_rate, responses)
+    web.run_app(server.make_app(), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Нагрузочный тест /ask: пропускная способность и задержки под параллельной нагрузкой.
+
+Вопросы - смесь известных онтологии понятий и выдуманных терминов,
+ответ на которые требует обращения к Wikidata (удобно направить сервер на
+benchmarks/fake_sparql_server.py с заданной задержкой).
+
+Запуск из корня репозитория:
+    python benchmarks/fake_sparql_server.py --port 8890 --latency 0.3 &
+    WIKIDATA_ENDPOINT=http://127.0.0.1:8890/sparql python app/server.py --port 8000 &
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --requests 2000 --concurrency 64
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import aiohttp
+
+KNOWN = ['матрица', 'квадратная матрица', 'аргумент', 'аббревиатура', 'вектор-строка', 'нулевая матрица']
+TEMPLATES = ['что такое {}', 'перечисли подклассы {}', 'синонимы {}', 'определение {}']
+
+
+def make_questions(count, miss_rate, seed):
+    rng = random.Random(seed)
+    questions = []
+    for i in range(count):
+        term = f"термин{rng.randrange(10 ** 6)}" if rng.random() < miss_rate else rng.choice(KNOWN)
+        questions.append(rng.choice(TEMPLATES).format(term))
+    return questions
+
+
+async def run(url, questions, concurrency, timeout):
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for question in questions:
+        queue.put_nowait(question)
+
+    async def worker(session):
+        nonlocal errors
+        while not queue.empty():
+            question = queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                async with session.post(url + '/ask', data={'question': question}) as response:
+                    await response.read()
+                    if response.status != 200:
+                        errors += 1
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--miss-rate', type=float, default=0.3, help='доля вопросов с обращением к Wikidata')
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    questions = make_questions(args.requests, args.miss_rate, args.seed)
+    latencies, errors, elapsed = asyncio.run(run(args.url, questions, args.concurrency, args.timeout))
+
+    print(f"requests     {len(latencies)} ({errors} errors), concurrency {args.concurrency}")
+    print(f"throughput   {len(latencies) / elapsed:.1f} req/s")
+    print(f"latency      p50={statistics.median(latencies) * 1000:.1f} ms  "
+          f"p95={percentile(latencies, 0.95) * 1000:.1f} ms  p99={percentile(latencies, 0.99) * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
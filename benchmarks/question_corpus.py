@@ -0,0 +1,160 @@
+"""Генератор корпуса вопросов на русском языке для бенчмарков.
+
+Вопросы строятся по шаблонам всех типов из patterns_config.json: место
+(.*) заполняется меткой онтологии в падеже, которого требует слово перед
+ним (после существительного - родительный, после предлога - по предлогу,
+после «и» - как у предыдущего понятия). Доля вопросов о понятиях, которых
+нет в онтологии (ответ из Wikidata), и вопросов вне шаблонов задается.
+Корпус детерминирован при одинаковых seed, конфигурации и онтологии.
+
+Запуск из корня репозитория:
+    python benchmarks/question_corpus.py --size 2000 --output corpus.jsonl
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'app'))
+
+from core.morphology import get_morphology  # noqa: E402
+
+DEFAULT_CONFIG = os.path.join(ROOT_DIR, 'configs', 'patterns_config.json')
+DEFAULT_ONTOLOGY = os.path.join(ROOT_DIR, 'data', 'ontology.rdf')
+
+# Понятия, которых заведомо нет в онтологии: ответ только из Wikidata
+UNKNOWN_TERMS = [
+    'гиперболическая сеть', 'квантовый отжиг', 'тензорная сеть', 'сплайн акимы',
+    'алгоритм гровера', 'функция аккермана', 'число грэма', 'перколяционный кластер',
+    'решето аткина', 'метод монте-карло', 'фрактальная размерность', 'эллиптическая кривая',
+    'преобразование хафа', 'двойственный граф', 'матроид', 'гомотопическая группа',
+]
+UNMATCHED = [
+    'расскажи анекдот', 'какая сегодня погода', 'привет', 'сколько времени',
+    'как дела', 'спасибо за помощь', 'что ты умеешь', 'посоветуй книгу',
+]
+PREPOSITION_CASES = {
+    'для': 'gent', 'от': 'gent', 'из': 'gent', 'у': 'gent', 'до': 'gent', 'без': 'gent',
+    'о': 'loct', 'об': 'loct', 'при': 'loct', 'с': 'ablt', 'между': 'ablt', 'над': 'ablt',
+    'к': 'datv', 'по': 'datv', 'в': 'accs', 'на': 'accs', 'про': 'accs',
+}
+SLOT = '(.*)'
+
+
+class CorpusGenerator:
+    def __init__(self, config_path, labels, seed=0):
+        with open(config_path, encoding='utf-8') as f:
+            self.patterns = json.load(f)
+        self.morphology = get_morphology()
+        self.random = random.Random(seed)
+        # Короткие метки без скобок и цифр - похожи на формулировки пользователей
+        self.labels = sorted(
+            label for label in labels
+            if 1 <= len(label.split()) <= 3 and re.fullmatch(r'[а-яё\- ]+', label.lower())
+        )
+        known = {label.lower() for label in labels}
+        self.unknown = [term for term in UNKNOWN_TERMS if term not in known]
+
+    def _slot_cases(self, template):
+        """Падеж для каждого (.*) шаблона по слову перед ним"""
+        cases = []
+        for prefix in template.split(SLOT)[:-1]:
+            words = re.findall(r'[а-яё\-]+', prefix.lower())
+            if not words:
+                cases.append('nomn')
+                continue
+            last = words[-1]
+            if last in PREPOSITION_CASES:
+                cases.append(PREPOSITION_CASES[last])
+            elif last in ('и', 'или') and cases:
+                cases.append(cases[-1])
+            elif self.morphology.parse(last).tag.POS == 'NOUN':
+                cases.append('gent')
+            else:
+                cases.append('nomn')
+        return cases
+
+    def inflect(self, term, case):
+        """Склоняет слова понятия до первого существительного включительно"""
+        if case == 'nomn':
+            return term
+        words = []
+        inflecting = True
+        for word in term.split():
+            if inflecting:
+                parsed = self.morphology.parse(word)
+                inflected = parsed.inflect({case})
+                words.append(inflected.word if inflected else word)
+                inflecting = parsed.tag.POS not in ('NOUN', None)
+            else:
+                words.append(word)
+        return ' '.join(words)
+
+    def question(self, kind):
+        """Один вопрос: kind - known (онтология), unknown (Wikidata) или unmatched"""
+        if kind == 'unmatched':
+            return {'question': self.random.choice(UNMATCHED), 'type': None, 'kind': kind, 'terms': []}
+        pattern = self.random.choice(self.patterns)
+        template = self.random.choice([p for p in pattern['patterns'] if SLOT in p])
+        template = re.sub(r'\s+', ' ', template)
+        pool = self.unknown if kind == 'unknown' and self.unknown else self.labels
+        terms = [self.random.choice(pool) for _ in range(template.count(SLOT))]
+        question = template
+        for term, case in zip(terms, self._slot_cases(template)):
+            question = question.replace(SLOT, self.inflect(term, case), 1)
+        return {'question': question, 'type': pattern['handler'], 'kind': kind, 'terms': terms}
+
+    def generate(self, size, unknown_rate=0.15, unmatched_rate=0.05):
+        corpus = []
+        for _ in range(size):
+            roll = self.random.random()
+            kind = 'unmatched' if roll < unmatched_rate else (
+                'unknown' if roll < unmatched_rate + unknown_rate else 'known')
+            corpus.append(self.question(kind))
+        return corpus
+
+
+def load_labels(ontology_path):
+    from core.ontology_controller import OntologyController
+    return list(OntologyController(ontology_path).label_index.labels())
+
+
+def save_corpus(corpus, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        for item in corpus:
+            f.write(json.dumps(item, ensure_ascii=False) + '\n')
+
+
+def load_corpus(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--config', default=DEFAULT_CONFIG)
+    parser.add_argument('--ontology', default=DEFAULT_ONTOLOGY)
+    parser.add_argument('--size', type=int, default=2000)
+    parser.add_argument('--unknown-rate', type=float, default=0.15, help='доля понятий не из онтологии')
+    parser.add_argument('--unmatched-rate', type=float, default=0.05, help='доля вопросов вне шаблонов')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='JSONL-файл; по умолчанию - вывод примеров')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    generator = CorpusGenerator(args.config, load_labels(args.ontology), args.seed)
+    corpus = generator.generate(args.size, args.unknown_rate, args.unmatched_rate)
+    if args.output:
+        save_corpus(corpus, args.output)
+        print(f"{len(corpus)} questions written to {args.output}")
+    else:
+        for item in corpus[:20]:
+            print(f"{item['kind']:<10} {item['type'] or '-':<22} {item['question']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+"""Общие фикстуры: онтология data/ontology.rdf и ее копии для тестов, которые пишут рядом с ней"""
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'app'))
+
+from core.ontology_controller import OntologyController  # noqa: E402
+
+ONTOLOGY_PATH = os.path.join(ROOT_DIR, 'data', 'ontology.rdf')
+CONFIG_PATH = os.path.join(ROOT_DIR, 'configs', 'patterns_config.json')
+
+
+def copy_ontology(directory):
+    """Копия онтологии и ее снимка: обогащения и кэши пишутся рядом с ней"""
+    target = os.path.join(directory, os.path.basename(ONTOLOGY_PATH))
+    for suffix in ('', '.snapshot'):
+        if os.path.exists(ONTOLOGY_PATH + suffix):
+            shutil.copy2(ONTOLOGY_PATH + suffix, target + suffix)
+    return target
+
+
+@pytest.fixture(scope='session')
+def ontology():
+    """Загруженная онтология только для чтения"""
+    return OntologyController(ONTOLOGY_PATH)
+
+
+@pytest.fixture
+def ontology_copy(tmp_path):
+    """Путь к копии онтологии во временном каталоге"""
+    return copy_ontology(str(tmp_path))
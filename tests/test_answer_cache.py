@@ -0,0 +1,41 @@
+from rdflib import Literal
+
+from conftest import CONFIG_PATH
+from core.answer_cache import AnswerCache
+from core.dialog_controller import DialogController
+from core.ontology_controller import OntologyController
+
+AUTHOR = OntologyController.PREDICATES['author']
+
+
+def test_invalidate_by_tag():
+    cache = AnswerCache()
+    cache.put(('get_authors', 'матрица', ''), 'ответ 1', {'матрица', 'omp2#E1'}, 'кем разработан матрица')
+    cache.put(('get_authors', 'вектор', ''), 'ответ 2', {'вектор'})
+    cache.invalidate({'omp2#E1'})
+    assert cache.get(('get_authors', 'матрица', '')) is None
+    assert cache.get_by_question('кем разработан матрица') is None
+    assert cache.get(('get_authors', 'вектор', '')) == 'ответ 2'
+
+
+def test_answers_are_invalidated_after_add_triples(ontology_copy):
+    # Все ответы теста есть в онтологии, Wikidata не запрашивается
+    controller = DialogController(ontology_copy, CONFIG_PATH)
+    ontology = controller.ontology
+    matrix = ontology.label_index.find('матрица')
+
+    ontology.add_triples([(matrix, AUTHOR, Literal('Джеймс Сильвестр', 'ru'))])
+    question = 'кем разработан матрица'
+    assert 'Джеймс Сильвестр' in controller.process_question(question)
+    other = controller.process_question('перечисли подклассы вектор')
+    hits = controller.answer_cache.stats()['question_hits']
+    assert 'Джеймс Сильвестр' in controller.process_question(question)
+    assert controller.answer_cache.stats()['question_hits'] == hits + 1
+
+    # Обогащение снимает ответы о матрице, но не о других сущностях
+    ontology.add_triples([(matrix, AUTHOR, Literal('Артур Кэли', 'ru'))])
+    answer = controller.process_question(question)
+    assert 'Джеймс Сильвестр' in answer and 'Артур Кэли' in answer
+    hits = controller.answer_cache.stats()['question_hits']
+    assert controller.process_question('перечисли подклассы вектор') == other
+    assert controller.answer_cache.stats()['question_hits'] == hits + 1
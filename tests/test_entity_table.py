@@ -0,0 +1,145 @@
+"""Таблица атрибутов против прежних методов доступа, обходивших граф rdflib"""
+import re
+
+import pytest
+from rdflib import Literal, RDF, RDFS, OWL, XSD
+
+from core.ontology_controller import OntologyController
+
+P = OntologyController.PREDICATES
+
+
+def ru_literals(graph, uri, predicate):
+    return [str(lit) for lit in graph.objects(uri, predicate) if isinstance(lit, Literal) and lit.language == 'ru']
+
+
+def definitions(graph, uri):
+    values = ru_literals(graph, uri, P['definition'])
+    if values:
+        return values
+    # Первое предложение комментария; пустое таблица хранит как отсутствие значения
+    return [re.split(r'[.!?]', comment)[0].strip() or None for comment in ru_literals(graph, uri, RDFS.comment)]
+
+
+def steps(graph, uri):
+    result = []
+    for step in ru_literals(graph, uri, P['algorithm']):
+        clean_step = re.sub(r'<!\[CDATA\[(.*?)\]\]>', r'\1', step, flags=re.DOTALL)
+        clean_step = re.sub(r'<[^>]+>', '', clean_step)
+        result.append(clean_step.strip())
+    return result
+
+
+def numeric_values(graph, uri):
+    return [str(lit) for lit in graph.objects(uri, P['value'])
+            if isinstance(lit, Literal) and lit.datatype in (XSD.decimal, XSD.float, XSD.double)]
+
+
+# Порядок объектов в хранилище rdflib зависит от хэширования строк и
+# различается между процессами, поэтому списки сравниваются без учета
+# порядка, а «первое значение» (и первая метка) - с множеством возможных
+
+# Метод контроллера -> все значения по прежнему обходу графа
+LIST_GETTERS = {
+    'get_algorithm_steps': steps,
+    'get_applications': lambda g, u: ru_literals(g, u, P['application']),
+    'get_authors': lambda g, u: ru_literals(g, u, P['author']),
+    'get_examples': lambda g, u: ru_literals(g, u, P['example']),
+    'get_optimizations': lambda g, u: ru_literals(g, u, P['optimization']),
+    'get_limitations': lambda g, u: ru_literals(g, u, P['limitation']),
+}
+
+# Метод контроллера -> значения, первое из которых возвращал прежний метод
+SINGLE_GETTERS = {
+    'get_definition': definitions,
+    'get_complexity': lambda g, u: ru_literals(g, u, P['complexity']),
+    'get_formula': lambda g, u: ru_literals(g, u, P['formula']),
+    'get_notation': lambda g, u: ru_literals(g, u, P['notation']),
+    'get_tex_command': lambda g, u: ru_literals(g, u, P['tex']),
+    'get_etymology': lambda g, u: ru_literals(g, u, P['etymology']),
+    'get_numeric_value': numeric_values,
+    'get_history': lambda g, u: ru_literals(g, u, P['history']),
+}
+
+
+def named_entities(ontology):
+    """(метка, URI) для сущностей, которые находятся по своей метке"""
+    for uri in ontology.label_index.uris:
+        label = next((label for label in ontology.entity_labels(uri) if ontology.label_index.find(label) == uri), None)
+        if label:
+            yield label, uri
+
+
+@pytest.mark.parametrize('getter', sorted(LIST_GETTERS))
+def test_list_getters_match_rdflib(ontology, getter):
+    for label, uri in named_entities(ontology):
+        expected = LIST_GETTERS[getter](ontology.graph, uri)
+        assert sorted(getattr(ontology, getter)(label)) == sorted(expected), (getter, label)
+
+
+def one_per_class(names, label_sets):
+    """Можно ли сопоставить каждому имени свой класс с такой меткой (паросочетание Куна)"""
+    owner = {}  # номер класса -> номер имени
+
+    def assign(i, seen):
+        for j, labels in enumerate(label_sets):
+            if names[i] in labels and j not in seen:
+                seen.add(j)
+                if j not in owner or assign(owner[j], seen):
+                    owner[j] = i
+                    return True
+        return False
+
+    return all(assign(i, set()) for i in range(len(names)))
+
+
+@pytest.mark.parametrize('getter, related', [
+    ('get_subclasses', lambda g, u: g.subjects(RDFS.subClassOf, u)),
+    ('get_superclasses', lambda g, u: g.objects(u, RDFS.subClassOf)),
+])
+def test_hierarchy_getters_match_rdflib(ontology, getter, related):
+    for label, uri in named_entities(ontology):
+        # Метки каждого связанного класса; в ответе - по одной от каждого
+        label_sets = [labels for labels in (set(ru_literals(ontology.graph, r, RDFS.label))
+                                            for r in related(ontology.graph, uri)) if labels]
+        found = getattr(ontology, getter)(label)
+        assert len(found) == len(label_sets) and one_per_class(found, label_sets), (getter, label)
+
+
+@pytest.mark.parametrize('getter', sorted(SINGLE_GETTERS))
+def test_single_getters_match_rdflib(ontology, getter):
+    for label, uri in named_entities(ontology):
+        candidates = SINGLE_GETTERS[getter](ontology.graph, uri) or [None]
+        assert getattr(ontology, getter)(label) in candidates, (getter, label)
+
+
+def test_visualization_matches_rdflib(ontology):
+    graph = ontology.graph
+    for label, uri in named_entities(ontology):
+        images = [str(lit) for lit in graph.objects(uri, P['image'])
+                  if isinstance(lit, Literal) and lit.datatype == XSD.anyURI]
+        image, description = ontology.get_visualization(label)
+        if not images:
+            assert (image, description) == (None, None)
+        else:
+            assert image in images
+            assert description in (ru_literals(graph, uri, OntologyController.NS_OMP.hasImageDescription) or [""])
+
+
+def test_row_is_recompiled_after_add_triples(ontology_copy):
+    ontology = OntologyController(ontology_copy)
+    parent = ontology.label_index.find('матрица')
+    assert ontology.get_authors('матрица') == []
+
+    uri = OntologyController.NS_OMP['test_table_entity']
+    ontology.add_triples([
+        (parent, P['author'], Literal('Джеймс Сильвестр', 'ru')),
+        (parent, P['formula'], Literal('A = (a_{ij})', 'ru')),
+        (uri, RDF.type, OWL.Class),
+        (uri, RDFS.label, Literal('тестовая подматрица', 'ru')),
+        (uri, RDFS.subClassOf, parent),
+    ])
+    assert ontology.get_authors('матрица') == ['Джеймс Сильвестр']
+    assert ontology.get_formula('матрица') == 'A = (a_{ij})'
+    assert 'тестовая подматрица' in ontology.get_subclasses('матрица')
+    assert ontology.get_superclasses('тестовая подматрица')[0] in ontology.entity_labels(parent)
@@ -0,0 +1,80 @@
+"""HierarchyIndex против обхода subClassOf средствами rdflib на data/ontology.rdf"""
+from itertools import islice
+
+from rdflib import Literal, RDF, RDFS, OWL, URIRef
+
+from core.hierarchy_index import HierarchyIndex
+from core.ontology_controller import OntologyController
+
+
+# Надклассы-ограничения OWL (пустые узлы) в иерархию не входят
+def closure_up(graph, uri):
+    return {o for o in graph.transitive_objects(uri, RDFS.subClassOf) if o != uri and isinstance(o, URIRef)}
+
+
+def closure_down(graph, uri):
+    return {s for s in graph.transitive_subjects(RDFS.subClassOf, uri) if s != uri}
+
+
+def test_closure_matches_rdflib(ontology):
+    graph, hierarchy = ontology.graph, ontology.hierarchy
+    for uri in hierarchy.nodes:
+        ancestors = closure_up(graph, uri)
+        assert set(hierarchy.get_ancestors(uri)) == ancestors, uri
+        assert set(hierarchy.get_descendants(uri)) == closure_down(graph, uri), uri
+        parents = closure_up(graph, uri) & set(graph.objects(uri, RDFS.subClassOf))
+        assert set(hierarchy.get_ancestors(uri, max_depth=1)) == parents
+        assert all(hierarchy.is_a(uri, ancestor) for ancestor in ancestors)
+
+
+def test_ancestors_are_ordered_nearest_first(ontology):
+    hierarchy = ontology.hierarchy
+    for uri in hierarchy.nodes[::50]:
+        ancestors = hierarchy.get_ancestors(uri)
+        # Надкласс идет раньше своих собственных надклассов (кроме узлов
+        # одного цикла, которые являются надклассами друг друга)
+        for i, ancestor in enumerate(ancestors):
+            above = {a for a in hierarchy.get_ancestors(ancestor) if not hierarchy.is_a(a, ancestor)}
+            assert not above & set(ancestors[:i]), uri
+
+
+def test_lowest_common_ancestors_match_rdflib(ontology):
+    graph, hierarchy = ontology.graph, ontology.hierarchy
+    nodes = hierarchy.nodes[::37]
+    for first, second in islice(zip(nodes, reversed(nodes)), 60):
+        common = (closure_up(graph, first) | {first}) & (closure_up(graph, second) | {second})
+        # Подклассы из того же цикла, что и n, не делают его «не нижним»
+        lowest = {n for n in common if not (closure_down(graph, n) - closure_up(graph, n)) & common}
+        assert set(hierarchy.lowest_common_ancestors(first, second)) == lowest, (first, second)
+
+
+def test_lowest_common_ancestors_through_a_cycle(ontology):
+    hierarchy = HierarchyIndex([('A', 'C'), ('B', 'D'), ('C', 'D'), ('D', 'C'), ('C', 'R'), ('D', 'R')])
+    assert set(hierarchy.get_ancestors('A')) == {'C', 'D', 'R'}
+    assert set(hierarchy.lowest_common_ancestors('A', 'B')) == {'C', 'D'}
+    assert set(hierarchy.lowest_common_ancestors('A', 'C')) == {'C', 'D'}
+    assert hierarchy.lowest_common_ancestors('A', 'R') == ['R']
+
+    # В онтологии общие надклассы этих понятий - только цикл у корня иерархии
+    ns = OntologyController.NS_OMP
+    cycle = {label for uri in (ns.E34, ns.E1660, ns.E2844) for label in ontology.entity_labels(uri)}
+    first, second = ontology.entity_labels(ns.E2845)[0], ontology.entity_labels(ns.E847)[0]
+    common = ontology.get_common_ancestors(first, second)
+    assert len(common) == 3 and set(common) <= cycle
+
+
+def test_hierarchy_is_rebuilt_after_add_triples(ontology_copy):
+    ontology = OntologyController(ontology_copy)
+    parent = ontology.label_index.find('матрица')
+    ancestors = ontology.get_ancestors('матрица')
+    assert ontology.hierarchy.is_a(parent, parent)
+
+    uri = OntologyController.NS_OMP['test_hierarchy_entity']
+    ontology.add_triples([
+        (uri, RDF.type, OWL.Class),
+        (uri, RDFS.label, Literal('тестовая подматрица', 'ru')),
+        (uri, RDFS.subClassOf, parent),
+    ])
+    assert 'тестовая подматрица' in ontology.get_descendants('матрица')
+    assert ontology.get_ancestors('тестовая подматрица') == [ontology.entity_labels(parent)[0]] + ancestors
+    assert ontology.is_subclass_of('тестовая подматрица', 'матрица')
@@ -0,0 +1,74 @@
+"""KeywordIndex и FuzzyIndex против прежних переборов шаблонов с ключевыми словами"""
+from difflib import get_close_matches
+import random
+
+from core.keyword_index import FuzzyIndex, KeywordIndex
+
+KEYWORD_SETS = [
+    ['определение', 'матрица'],
+    ['автор', 'метод'],
+    ['сложность', 'алгоритм'],
+    ['формула'],
+    ['пример', 'применение', 'теорема'],
+    ['история', 'метод', 'гаусс'],
+    ['ab'],
+    ['abcdef'],
+    [],
+]
+QUESTIONS = [
+    'определение матрица', 'кто автор метод гаусса', 'сложность алгоритма дейкстры', 'формула герона',
+    'пример применение теорема', 'история метод гаусс', 'abxcdyef', 'ab', 'опрделение матрицы',
+    'автр метода', 'сложнсть алгоритм', 'фрмула', 'история метода гауса', 'что-то совсем другое', '',
+]
+
+
+def typos(text, rng, count=5):
+    """Вопрос с пропусками, заменами, вставками и перестановками символов"""
+    result = []
+    for _ in range(count):
+        chars = list(text)
+        for _ in range(rng.randint(1, 3)):
+            if not chars:
+                break
+            i = rng.randrange(len(chars))
+            operation = rng.choice('dsit')
+            if operation == 'd':
+                del chars[i]
+            elif operation == 's':
+                chars[i] = rng.choice('абвгдеиклмнорстxyz ')
+            elif operation == 'i':
+                chars.insert(i, rng.choice('абвгдеиклмнорстxyz '))
+            elif i + 1 < len(chars):
+                chars[i], chars[i + 1] = chars[i + 1], chars[i]
+        result.append(''.join(chars))
+    return result
+
+
+def questions():
+    rng = random.Random(9)
+    joined = [' '.join(kws) for kws in KEYWORD_SETS]
+    return QUESTIONS + [typo for text in QUESTIONS + joined for typo in typos(text, rng)]
+
+
+def test_keyword_index_matches_substring_scan():
+    index = KeywordIndex(KEYWORD_SETS)
+    for question in questions():
+        expected = next((i for i, kws in enumerate(KEYWORD_SETS) if all(kw in question for kw in kws)), None)
+        assert index.first_match(question) == expected, question
+
+
+def test_fuzzy_index_matches_get_close_matches():
+    candidates = [' '.join(kws) for kws in KEYWORD_SETS]
+    index = FuzzyIndex(candidates)
+    for question in questions():
+        expected = next((i for i, c in enumerate(candidates) if get_close_matches(question, [c], n=1, cutoff=0.6)),
+                        None)
+        assert index.first_match(question) == expected, question
+
+
+def test_match_without_shared_trigram():
+    # Сходство 0.857 без единой общей триграммы
+    assert get_close_matches('abxcdyef', ['abcdef'], cutoff=0.6)
+    assert FuzzyIndex(['abcdef']).first_match('abxcdyef') == 0
+    # Более ранняя строка без общих триграмм побеждает позднюю с общей
+    assert FuzzyIndex(['abcdef', 'abxcdyez']).first_match('abxcdyef') == 0
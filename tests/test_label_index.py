@@ -0,0 +1,19 @@
+from core.label_index import LabelIndex
+
+
+def test_inflected_forms_resolve_to_the_same_entity(ontology):
+    uri = ontology.label_index.find('матрица')
+    assert uri is not None
+    assert ontology.label_index.find('матрицы') == uri
+    assert ontology.label_index.find('Матрица!') == uri
+
+
+def test_keys_are_surface_form_and_lemma():
+    assert LabelIndex.keys('Квадратные матрицы') == ('квадратные матрицы', 'квадратный матрица')
+
+
+def test_synonyms_exclude_the_term_at_key_level(ontology):
+    for term in ('матрица', 'матрицы', 'Матрица', 'квадратные матрицы'):
+        assert ontology.get_synonyms(term) == [], term
+    assert ontology.get_synonyms('банаховы пространства') == ['B-пространство']
+    assert ontology.get_synonyms('эйри функции') == ['Функции Эйри', 'Частные решения уравнения Эйри']
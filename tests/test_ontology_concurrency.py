@@ -0,0 +1,47 @@
+import threading
+
+from rdflib import Literal, RDF, RDFS, OWL
+
+from core.ontology_controller import OntologyController
+
+
+def test_enrichment_does_not_break_concurrent_readers(ontology_copy):
+    ontology = OntologyController(ontology_copy)
+    ns = OntologyController.NS_OMP
+    parent = ontology.label_index.find('матрица')
+    errors = []
+    done = threading.Event()
+
+    def write():
+        try:
+            for i in range(30):
+                uri = ns[f'test_entity_{i}']
+                ontology.add_triples([
+                    (uri, RDF.type, OWL.Class),
+                    (uri, RDFS.label, Literal(f'тестовая сущность {i}', 'ru')),
+                    (uri, RDFS.subClassOf, parent),
+                ])
+        except Exception as e:
+            errors.append(e)
+        finally:
+            done.set()
+
+    def read():
+        try:
+            while not done.is_set():
+                ontology.search_entities('тестовая', limit=5)
+                ontology.get_descendants('матрица', max_depth=1)
+                ontology.get_all_classes()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write)] + [threading.Thread(target=read) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(120)
+
+    assert not errors
+    # Индексы после всех пакетов согласованы с графом
+    assert 'тестовая сущность 29' in ontology.get_descendants('матрица', max_depth=1)
+    assert ontology.search_entities('тестовая сущность 29')[0]['label'] == 'тестовая сущность 29'
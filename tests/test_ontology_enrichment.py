@@ -0,0 +1,59 @@
+from rdflib import Literal, RDFS
+
+from core.ontology_controller import OntologyController
+from core.ontology_enrichment import OntologyEnrichment
+from core.wikidata_connector import WikidataConnector
+
+
+def request(handler, focus, lemma=None):
+    return {'handler': handler, 'focus_original': focus, 'focus_lemma': lemma or focus}
+
+
+def test_enrichment_goes_to_existing_entity(ontology_copy):
+    ontology = OntologyController(ontology_copy)
+    enricher = OntologyEnrichment(ontology_copy, ontology)
+    uri = ontology.label_index.find('матрица')
+    assert uri is not None
+
+    triples = enricher.build_triples(request('get_authors', 'матрицы', 'матрица'), ['Джеймс Сильвестр'])
+    assert {s for s, _, _ in triples} == {uri}
+    # Словоформа из вопроса не становится меткой существующей сущности
+    assert not any(p == RDFS.label for _, p, _ in triples)
+
+    enricher.enrich_batch([(request('get_authors', 'матрицы', 'матрица'), ['Джеймс Сильвестр'])])
+    assert ontology.get_authors('матрица') == ['Джеймс Сильвестр']
+
+    # Журнал воспроизводится при следующей загрузке
+    reloaded = OntologyController(ontology_copy)
+    OntologyEnrichment(ontology_copy, reloaded)
+    assert reloaded.get_authors('матрица') == ['Джеймс Сильвестр']
+
+
+def test_enrichment_creates_entity_for_unknown_focus(ontology_copy):
+    ontology = OntologyController(ontology_copy)
+    enricher = OntologyEnrichment(ontology_copy, ontology)
+    assert ontology.label_index.find('квазиматрица') is None
+
+    enricher.enrich_batch([(request('get_definition', 'квазиматрица'), 'обобщение матрицы')])
+    uri = ontology.label_index.find('квазиматрица')
+    assert uri == OntologyEnrichment.NS_OMP['квазиматрица']
+    assert (uri, RDFS.label, Literal('квазиматрица', 'ru')) in ontology.graph
+    assert ontology.get_definition('квазиматрица') == 'обобщение матрицы'
+
+
+def test_wikidata_rows_map_to_values():
+    """В ответ и в триплеты попадает значение привязки, а не ее имя"""
+    rows = [
+        {'author': {'type': 'uri', 'value': 'http://www.wikidata.org/entity/Q312904'},
+         'authorLabel': {'type': 'literal', 'value': 'Джеймс Джозеф Сильвестр', 'xml:lang': 'ru'}},
+        {'author': {'type': 'uri', 'value': 'http://www.wikidata.org/entity/Q7398'},
+         'authorLabel': {'type': 'literal', 'value': 'Артур Кэли', 'xml:lang': 'ru'}},
+    ]
+    spec = WikidataConnector.QUERIES['get_authors']
+    authors = WikidataConnector._extract(None, spec, rows)
+    assert authors == ['Джеймс Джозеф Сильвестр', 'Артур Кэли']
+
+    enricher = OntologyEnrichment('/nonexistent/ontology.rdf')
+    values = {str(o) for _, p, o in enricher.build_triples(request('get_authors', 'квазиматрица'), authors)
+              if p == OntologyController.PREDICATES['author']}
+    assert values == set(authors)
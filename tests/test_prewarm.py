@@ -0,0 +1,19 @@
+from conftest import CONFIG_PATH
+from core.dialog_controller import DialogController
+from prewarm import template_fields
+
+
+def test_prewarm_caches_only_filled_answers(ontology_copy):
+    controller = DialogController(ontology_copy, CONFIG_PATH)
+    fields = template_fields(controller)
+    assert {'{definition}', '{authors}', '{formula}'} <= fields
+
+    labels = ['матрица', 'квазиматрица', 'банахово пространство']
+    requests = [controller.question_handler.make_request(handler, label)
+                for handler in controller.question_handler.handlers() for label in labels]
+    controller.prewarm(requests, use_wikidata=False)
+
+    entries = controller.answer_cache.entries()
+    assert entries
+    for _, answer, _ in entries:
+        assert not any(field in answer for field in fields), answer
@@ -0,0 +1,10 @@
+import sys
+
+import profile_report
+
+
+def test_missing_directory_reports_no_captures(tmp_path, monkeypatch, capsys):
+    directory = str(tmp_path / 'profiles')
+    monkeypatch.setattr(sys, 'argv', ['profile_report.py', '--dir', directory])
+    profile_report.main()
+    assert capsys.readouterr().out == f"No captures in {directory}\n"
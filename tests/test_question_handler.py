@@ -0,0 +1,27 @@
+import pytest
+
+from conftest import CONFIG_PATH
+from core.question_handler import QuestionHandler
+
+QUESTIONS = ['Что такое матрица?', 'кем разработан метод Гаусса', 'синонимы матрицы', 'как дела']
+
+
+@pytest.fixture(scope='module')
+def handler():
+    return QuestionHandler(CONFIG_PATH)
+
+
+def test_normalized_text_gives_the_same_analysis(handler):
+    for question in QUESTIONS:
+        normalized = handler.normalize_question(question)
+        assert handler.analyze_question(question, normalized=normalized) == handler.analyze_question(question)
+
+
+def test_question_is_normalized_once(handler, monkeypatch):
+    calls = []
+    normalize = handler._normalize_text
+    monkeypatch.setattr(handler, '_normalize_text', lambda text: calls.append(text) or normalize(text))
+
+    normalized = handler.normalize_question('Что такое матрица?')
+    handler.analyze_question('Что такое матрица?', normalized=normalized)
+    assert calls == ['Что такое матрица?']
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from conftest import CONFIG_PATH
+from core.response_builder import ResponseBuilder
+
+with open(CONFIG_PATH, encoding='utf-8') as f:
+    PATTERNS = json.load(f)
+
+
+@pytest.fixture(scope='module')
+def builder():
+    return ResponseBuilder()
+
+
+def handler_data(handler, focus='матрица'):
+    pattern = next(p for p in PATTERNS if p['handler'] == handler)
+    return {'handler': handler, 'response_templates': pattern['response_templates'],
+            'focus_original': focus, 'focus_lemma': focus, 'focus_secondary': 'вектор'}
+
+
+def sample(handler):
+    if handler == 'get_visualization':
+        return ('https://example.org/matrix.png', 'матрица 3x3')
+    if handler == 'is_subclass_of':
+        return True
+    return ['первое значение', 'второе значение']
+
+
+@pytest.mark.parametrize('handler', sorted({p['handler'] for p in PATTERNS}))
+def test_every_template_field_is_filled(builder, handler):
+    data = sample(handler)
+    for value in (data, data[:1] if isinstance(data, list) else data, None):
+        answer, complete = builder.render(handler_data(handler), value)
+        assert not ResponseBuilder.PLACEHOLDER.search(answer), (handler, answer)
+        if value is not None and handler != 'compare_methods':
+            assert complete
+
+
+def test_data_goes_to_named_fields(builder):
+    assert builder.build_response(handler_data('get_definition'), 'прямоугольная таблица чисел') == \
+        'матрица — это прямоугольная таблица чисел'
+    assert 'Артур Кэли' in builder.build_response(handler_data('get_authors'), ['Артур Кэли'])
+    assert 'O(n^3)' in builder.build_response(handler_data('get_complexity'), 'O(n^3)')
+    # Фигурные скобки в самих данных не принимаются за поля шаблона
+    answer, complete = builder.render(handler_data('get_formula'), r'\frac{a}{b}')
+    assert complete and answer.endswith(r'\frac{a}{b}')
+
+
+def test_unfilled_template_is_not_complete(builder):
+    # Одним значением нельзя заполнить несколько полей шаблона сравнения
+    answer, complete = builder.render(handler_data('compare_methods'), 'таблица')
+    assert (answer, complete) == ('таблица', False)
+    answer, complete = builder.render(handler_data('compare_methods'), None)
+    assert (answer, complete) == (ResponseBuilder.NOT_FOUND, False)
+    answer, complete = builder.render(handler_data('get_definition'), None)
+    assert (answer, complete) == (ResponseBuilder.NOT_FOUND, False)
@@ -0,0 +1,69 @@
+"""SearchIndex против прежнего перебора меток онтологии data/ontology.rdf"""
+import pytest
+from rdflib import Literal, RDF, RDFS, OWL, URIRef
+
+from core.label_index import LabelIndex
+from core.ontology_controller import OntologyController
+
+TERMS = ['м', 'ма', 'матр', 'матрица', 'уравнение', 'теорема коши', 'пространство', 'эйри', 'нет такой метки']
+
+
+@pytest.fixture(scope='module')
+def labels(ontology):
+    """Нормализованная метка -> URI, как в прежнем индексе меток"""
+    index = {}
+    for s, label in ontology.graph.subject_objects(RDFS.label):
+        if isinstance(label, Literal) and label.language == 'ru':
+            index.setdefault(LabelIndex.normalize(str(label)), []).append(s)
+    return index
+
+
+def brute_force(ontology, labels, term, prefix=False):
+    """Прежний поиск перебором: URI -> лучший ключ ранжирования SearchIndex среди его меток"""
+    ranks = {}
+    for norm_label, uris in labels.items():
+        if prefix:
+            # Начало одного из слов метки и продолжение до ее конца
+            starts = [0] + [i + 1 for i, char in enumerate(norm_label) if char == ' ']
+            if not any(norm_label.startswith(term, start) for start in starts):
+                continue
+        elif term not in norm_label:
+            continue
+        rank = (norm_label != term, not norm_label.startswith(term), len(norm_label), norm_label)
+        for uri in uris:
+            if ontology._get_ru_label(uri):
+                ranks[str(uri)] = min(rank, ranks.get(str(uri), rank))
+    return ranks
+
+
+def record(ontology, uri):
+    uri = URIRef(uri)
+    entity_type = 'Class' if (uri, RDF.type, OWL.Class) in ontology.graph else 'Property'
+    return {'uri': str(uri), 'label': ontology._get_ru_label(uri), 'type': entity_type}
+
+
+@pytest.mark.parametrize('prefix', [False, True])
+@pytest.mark.parametrize('term', TERMS)
+def test_search_matches_brute_force(ontology, labels, term, prefix):
+    ranks = brute_force(ontology, labels, term, prefix)
+    found = ontology.search_entities(term, prefix=prefix)
+    assert sorted(r['uri'] for r in found) == sorted(ranks)
+    # Порядок - по релевантности; сущности с одинаковой меткой идут в любом порядке
+    order = [ranks[r['uri']] for r in found]
+    assert order == sorted(order)
+    assert found == [record(ontology, r['uri']) for r in found]
+    assert ontology.search_entities(term, limit=5, prefix=prefix) == found[:5]
+
+
+def test_exact_label_ranks_first(ontology):
+    assert ontology.search_entities('Матрица', limit=1)[0]['label'] == 'Матрица'
+
+
+def test_search_index_is_rebuilt_after_add_triples(ontology_copy):
+    ontology = OntologyController(ontology_copy)
+    assert ontology.search_entities('тестоматр') == []
+
+    uri = OntologyController.NS_OMP['test_search_entity']
+    ontology.add_triples([(uri, RDF.type, OWL.Class), (uri, RDFS.label, Literal('Тестоматрица Зета', 'ru'))])
+    assert ontology.search_entities('тестоматр') == [{'uri': str(uri), 'label': 'Тестоматрица Зета', 'type': 'Class'}]
+    assert ontology.search_entities('зет', prefix=True)[0]['uri'] == str(uri)